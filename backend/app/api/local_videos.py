@@ -2,9 +2,11 @@
 本地视频管理API
 """
 
-from fastapi import APIRouter, HTTPException, BackgroundTasks
-from fastapi.responses import FileResponse
-from typing import List, Dict, Any
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Query, Request, Response
+from fastapi.responses import FileResponse, JSONResponse
+from typing import List, Dict, Any, Optional
+import asyncio
+import json
 import logging
 import traceback
 import torch
@@ -13,17 +15,34 @@ from datetime import datetime, timedelta
 
 from app.core.config import settings
 from app.services.local_video_scanner import get_scanner
-from app.core.database import get_db, Video, Transcript, SessionLocal
+from app.services.scan_index import scan_index
+from app.services.file_index import file_index, AmbiguousFileName
+from app.services.library_snapshot import library_snapshot
+from app.services.model_selection import validate_model_name
+from app.core.database import get_db, Video, Transcript, TranscriptPreview, TranscriptQualityFlag, SessionLocal, ReconciliationRun
 from sqlalchemy.orm import Session
 from fastapi import Depends
 import os
 
 # 导入Celery相关
-from app.tasks.video_tasks import process_video_task, batch_process_videos, get_task_status
+from app.tasks.video_tasks import process_video_task, preview_video_task, batch_process_videos, get_task_status, reconcile_library_task
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+def _find_video_file(video_name: str, relative_path: Optional[str] = None) -> Optional[Path]:
+    """通过文件名索引查找监控目录中的文件，未找到返回 None
+
+    同名文件不止一个时需要 relative_path（相对监控目录的路径）区分，否则返回409和候选列表
+    """
+    try:
+        return file_index.lookup(settings.LOCAL_VIDEO_DIR, video_name, relative_path)
+    except AmbiguousFileName as e:
+        raise HTTPException(status_code=409, detail={
+            "message": f"存在多个同名文件，请通过 relative_path 指定: {video_name}",
+            "candidates": e.candidates
+        })
+
 @router.post("/scan")
 async def scan_local_videos(background_tasks: BackgroundTasks):
     """扫描本地视频文件夹"""
@@ -39,13 +58,17 @@ async def scan_local_videos(background_tasks: BackgroundTasks):
         video_files = await scanner.scan_existing_videos()
         logger.info(f"扫描完成，发现 {len(video_files)} 个视频文件")
         
+        # 未开启文件监控时，扫描后同时刷新文件名索引和视频库快照
+        if not (scanner.observer and scanner.observer.is_alive()):
+            await asyncio.get_running_loop().run_in_executor(None, library_snapshot.build, settings.LOCAL_VIDEO_DIR)
+        
         # 记录发现的视频文件
         for i, video_file in enumerate(video_files, 1):
             logger.info(f"  {i}. {video_file}")
         
-        # 后台处理发现的视频
+        # 提交到导入工作线程处理（不防抖，受并发上限约束）
         for video_file in video_files:
-            background_tasks.add_task(scanner.process_new_video, video_file)
+            scanner.ingest_worker.submit(video_file, debounce=0)
         
         return {
             "message": f"扫描完成，发现 {len(video_files)} 个新视频",
@@ -89,74 +112,39 @@ async def stop_watching():
         raise HTTPException(status_code=500, detail=f"停止监控失败: {str(e)}")
 
 @router.get("/list")
-async def list_local_videos(db: Session = Depends(get_db)):
-    """获取本地视频文件列表（与数据库状态同步）"""
+async def list_local_videos(
+    request: Request,
+    sort: str = "modified_time",
+    order: str = "desc",
+    status: Optional[str] = None,
+    search: Optional[str] = None,
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=1000)
+):
+    """获取本地视频文件列表（内存快照，与数据库状态增量同步）
+
+    sort: modified_time/name/size/status，order: asc/desc，status 按处理状态筛选，search 按文件名筛选，
+    不传 limit 时返回全部；响应带 ETag，If-None-Match 未变化时返回 304
+    """
     try:
-        logger.info("开始获取本地视频列表")
         watch_dir = Path(settings.LOCAL_VIDEO_DIR)
         if not watch_dir.exists():
             return {"videos": [], "message": "监控目录不存在"}
         
-        video_extensions = {'.mp4', '.avi', '.mov', '.mkv', '.flv', '.wmv', '.webm', '.m4v'}
-        videos = []
-        
-        # 获取数据库中的视频记录
-        db_videos = {}
-        for video in db.query(Video).filter(Video.platform == "local").all():
-            if video.local_path:
-                file_name = Path(video.local_path).name
-                db_videos[file_name] = {
-                    "id": video.id,
-                    "status": video.status,
-                    "title": video.title,
-                    "url": video.url
-                }
-        
-        for file_path in watch_dir.rglob('*'):
-            if (file_path.is_file() and 
-                file_path.suffix.lower() in video_extensions and
-                not file_path.name.startswith('._') and  # 过滤macOS元数据文件
-                not file_path.name.startswith('.DS_Store')):
-                stat = file_path.stat()
-                file_name = file_path.name
-                
-                # 从数据库获取状态信息
-                db_info = db_videos.get(file_name, {})
-                processing_status = "unprocessed"
-                if db_info:
-                    # 映射数据库状态到前端状态
-                    status_mapping = {
-                        "pending": "unprocessed",
-                        "processing": "processing", 
-                        "completed": "completed",
-                        "failed": "failed"
-                    }
-                    processing_status = status_mapping.get(db_info["status"], "unprocessed")
-                
-                videos.append({
-                    "name": file_name,
-                    "title": db_info.get("title", file_path.stem),
-                    "path": str(file_path),
-                    "size": stat.st_size,
-                    "size_mb": round(stat.st_size / (1024 * 1024), 2),
-                    "modified_time": stat.st_mtime,
-                    "extension": file_path.suffix.lower(),
-                    "relative_path": str(file_path.relative_to(watch_dir)),
-                    "processing_status": processing_status,
-                    "progress": 100 if processing_status == "completed" else (None if processing_status == "processing" else 0),
-                    "estimated_time": None,
-                    "video_id": db_info.get("id"),
-                    "db_status": db_info.get("status")
-                })
-        
-        # 按修改时间排序（最新的在前）
-        videos.sort(key=lambda x: x['modified_time'], reverse=True)
-        
-        return {
-            "videos": videos,
-            "total_count": len(videos),
-            "watch_directory": str(settings.LOCAL_VIDEO_DIR)
-        }
+        scanner = get_scanner()
+        watching = bool(scanner and scanner.observer and scanner.observer.is_alive())
+        loop = asyncio.get_running_loop()
+        etag, result = await loop.run_in_executor(None, lambda: library_snapshot.query(
+            str(watch_dir), watching=watching, sort=sort, order=order, status=status,
+            search=search, offset=offset, limit=limit
+        ))
+        
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers=headers)
+        
+        result["watch_directory"] = str(settings.LOCAL_VIDEO_DIR)
+        return JSONResponse(result, headers=headers)
     except Exception as e:
         import traceback
         error_detail = f"获取本地视频列表失败: {str(e)}"
@@ -174,7 +162,10 @@ async def get_scan_status():
             "watch_directory": str(settings.LOCAL_VIDEO_DIR),
             "directory_exists": watch_dir.exists(),
             "is_watching": scanner is not None and scanner.observer and scanner.observer.is_alive() if scanner else False,
-            "processed_count": len(scanner.processed_files) if scanner else 0
+            "processed_count": scanner.processed_count if scanner else 0,
+            "last_scan": scan_index.last_scan,
+            "file_index": file_index.stats(),
+            "ingest": scanner.ingest_worker.metrics() if scanner else None
         }
     except Exception as e:
         logger.error(f"获取扫描状态失败: {e}")
@@ -187,7 +178,7 @@ async def get_scan_status():
         }
 
 @router.post("/debug-process/{video_name}")
-async def debug_process_video(video_name: str, db: Session = Depends(get_db)):
+async def debug_process_video(video_name: str, relative_path: Optional[str] = None, db: Session = Depends(get_db)):
     """Debug模式处理视频 - 返回详细步骤信息"""
     debug_steps = []
     video_path = None
@@ -205,13 +196,7 @@ async def debug_process_video(video_name: str, db: Session = Depends(get_db)):
         # 步骤1: 文件定位
         add_debug_step("1_file_location", "running", "正在定位视频文件...")
         
-        watch_dir = Path(settings.LOCAL_VIDEO_DIR)
-        video_file = None
-        
-        for file_path in watch_dir.rglob('*'):
-            if file_path.name == video_name:
-                video_file = file_path
-                break
+        video_file = _find_video_file(video_name, relative_path)
         
         if not video_file:
             add_debug_step("1_file_location", "error", f"视频文件不存在: {video_name}")
@@ -285,7 +270,7 @@ async def debug_process_video(video_name: str, db: Session = Depends(get_db)):
                 "transcription_length": len(result.get("original_text", "")),
                 "language": result.get("language", "unknown"),
                 "confidence_score": result.get("confidence_score", 0),
-                "segments_count": len(result.get("segments", [])),
+                "segments_count": result.get("segment_count", len(result.get("segments", []))),
                 "has_summary": bool(result.get("summary")),
                 "has_tags": bool(result.get("tags"))
             }
@@ -319,19 +304,18 @@ async def debug_process_video(video_name: str, db: Session = Depends(get_db)):
         return {"video_name": video_name, "video_path": video_path, "debug_steps": debug_steps}
 
 @router.post("/process/{video_name}")
-async def process_local_video(video_name: str, db: Session = Depends(get_db)):
-    """提交指定的本地视频到Celery队列处理"""
+async def process_local_video(video_name: str, model_name: Optional[str] = None, relative_path: Optional[str] = None, db: Session = Depends(get_db)):
+    """提交指定的本地视频到Celery队列处理（model_name 可指定本次使用的模型）"""
+    if model_name:
+        try:
+            validate_model_name(model_name)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
     try:
         logger.info(f"📤 提交视频处理请求: {video_name}")
         
         # 查找视频文件
-        watch_dir = Path(settings.LOCAL_VIDEO_DIR)
-        video_file = None
-        
-        for file_path in watch_dir.rglob('*'):
-            if file_path.name == video_name:
-                video_file = file_path
-                break
+        video_file = _find_video_file(video_name, relative_path)
         
         if not video_file:
             raise HTTPException(status_code=404, detail="视频文件不存在")
@@ -369,8 +353,11 @@ async def process_local_video(video_name: str, db: Session = Depends(get_db)):
             db.commit()
             logger.info(f"🔄 重置视频记录状态: ID={video_record.id}")
         
-        # 提交到Celery队列
-        task = process_video_task.delay(video_record.id)
+        # 提交到Celery队列（启用预览时先在高优先级队列转录开头部分，再由预览任务排入完整转录）
+        if settings.PREVIEW_ENABLED:
+            task = preview_video_task.delay(video_record.id, model_name)
+        else:
+            task = process_video_task.delay(video_record.id, model_name)
         
         # 更新任务ID
         video_record.task_id = task.id
@@ -383,7 +370,8 @@ async def process_local_video(video_name: str, db: Session = Depends(get_db)):
             "video_name": video_name,
             "video_id": video_record.id,
             "task_id": task.id,
-            "status": "pending"
+            "status": "pending",
+            "preview": settings.PREVIEW_ENABLED
         }
         
     except HTTPException:
@@ -409,6 +397,9 @@ async def get_model_status():
             "gpu_count": torch.cuda.device_count() if torch.cuda.is_available() else 0
         }
         
+        from app.services.model_registry import model_registry
+        status_info["registry"] = model_registry.status()
+        
         # 尝试获取模型路径信息
         try:
             model_path_or_name = ai_service._get_model_path_or_name()
@@ -462,17 +453,11 @@ async def get_processing_status(db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/quick-debug/{video_name}")
-async def quick_debug_video(video_name: str):
+async def quick_debug_video(video_name: str, relative_path: Optional[str] = None):
     """快速debug接口 - 只检查基础信息"""
     try:
         # 文件检查
-        watch_dir = Path(settings.LOCAL_VIDEO_DIR)
-        video_file = None
-        
-        for file_path in watch_dir.rglob('*'):
-            if file_path.name == video_name:
-                video_file = file_path
-                break
+        video_file = _find_video_file(video_name, relative_path)
         
         if not video_file:
             return {"error": f"视频文件不存在: {video_name}"}
@@ -502,7 +487,7 @@ async def quick_debug_video(video_name: str):
         }
 
 @router.post("/deep-debug/{video_name}")
-async def deep_debug_whisper(video_name: str):
+async def deep_debug_whisper(video_name: str, relative_path: Optional[str] = None):
     """深度debug faster-whisper音频维度问题"""
     try:
         from app.services.ai_service import ai_service
@@ -510,12 +495,7 @@ async def deep_debug_whisper(video_name: str):
         from pathlib import Path
         
         # 文件检查
-        watch_dir = Path(settings.LOCAL_VIDEO_DIR)
-        video_file = None
-        for file_path in watch_dir.rglob('*'):
-            if file_path.name == video_name:
-                video_file = file_path
-                break
+        video_file = _find_video_file(video_name, relative_path)
         
         if not video_file:
             return {"error": f"视频文件不存在: {video_name}"}
@@ -551,7 +531,24 @@ async def deep_debug_whisper(video_name: str):
             })
             return debug_info
         
-        # 步骤3: 测试不同参数的转录
+        # 步骤3: 解码音频（读取解码缓存，重复调试不再重新解码）
+        try:
+            from app.services.audio_cache import audio_cache
+            audio = audio_cache.load(video_path)
+            debug_info["steps"].append({
+                "step": "audio_decoded",
+                "status": "success",
+                "duration": round(audio.shape[0] / 16000, 2)
+            })
+        except Exception as e:
+            debug_info["steps"].append({
+                "step": "audio_decode_failed",
+                "status": "error",
+                "error": str(e)
+            })
+            return debug_info
+        
+        # 步骤4: 测试不同参数的转录
         test_params = [
             {"name": "default", "params": {"language": "zh", "task": "transcribe"}},
             {"name": "auto_detect", "params": {"task": "transcribe"}},
@@ -561,7 +558,7 @@ async def deep_debug_whisper(video_name: str):
         
         for test in test_params:
             try:
-                segments, info = ai_service.model.transcribe(video_path, **test["params"])
+                segments, info = ai_service.model.transcribe(audio, **test["params"])
                 
                 # 收集一些结果
                 segment_count = 0
@@ -660,23 +657,18 @@ async def deep_debug_whisper(video_name: str):
         raise HTTPException(status_code=500, detail=f"获取状态失败: {str(e)}")
 
 @router.delete("/delete/{video_name}")
-async def delete_local_video(video_name: str):
+async def delete_local_video(video_name: str, relative_path: Optional[str] = None):
     """删除本地视频文件"""
     try:
-        watch_dir = Path(settings.LOCAL_VIDEO_DIR)
-        video_file = None
-        
-        # 查找视频文件
-        for file_path in watch_dir.rglob('*'):
-            if file_path.name == video_name:
-                video_file = file_path
-                break
+        video_file = _find_video_file(video_name, relative_path)
         
         if not video_file:
             raise HTTPException(status_code=404, detail="视频文件不存在")
         
         # 删除文件
         video_file.unlink()
+        file_index.remove(str(video_file))
+        library_snapshot.remove_path(str(video_file))
         logger.info(f"已删除本地视频文件: {video_file}")
         
         return {
@@ -684,6 +676,8 @@ async def delete_local_video(video_name: str):
             "deleted_file": str(video_file)
         }
         
+    except HTTPException:
+        raise
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="文件不存在")
     except PermissionError:
@@ -693,17 +687,10 @@ async def delete_local_video(video_name: str):
         raise HTTPException(status_code=500, detail=f"删除失败: {str(e)}")
 
 @router.get("/file/{file_name}")
-async def serve_video_file(file_name: str):
+async def serve_video_file(file_name: str, relative_path: Optional[str] = None):
     """提供本地视频文件的HTTP访问"""
     try:
-        watch_dir = Path(settings.LOCAL_VIDEO_DIR)
-        video_file = None
-        
-        # 查找视频文件
-        for file_path in watch_dir.rglob('*'):
-            if file_path.name == file_name:
-                video_file = file_path
-                break
+        video_file = _find_video_file(file_name, relative_path)
         
         if not video_file or not video_file.exists():
             raise HTTPException(status_code=404, detail="视频文件不存在")
@@ -726,6 +713,16 @@ async def serve_video_file(file_name: str):
         logger.error(f"提供视频文件失败: {e}")
         raise HTTPException(status_code=500, detail=f"文件服务失败: {str(e)}")
 
+@router.get("/thumbnail/{video_id}")
+async def serve_thumbnail(video_id: int):
+    """提供导入时生成的关键帧缩略图"""
+    from app.services.media_ingest import thumbnail_path_for
+    
+    thumbnail = Path(thumbnail_path_for(video_id))
+    if not thumbnail.exists():
+        raise HTTPException(status_code=404, detail="缩略图不存在")
+    return FileResponse(path=str(thumbnail), media_type="image/jpeg")
+
 @router.get("/video-detail/{video_id}")
 async def get_video_detail(video_id: int, db: Session = Depends(get_db)):
     """获取视频处理详情"""
@@ -735,8 +732,14 @@ async def get_video_detail(video_id: int, db: Session = Depends(get_db)):
         if not video:
             raise HTTPException(status_code=404, detail="视频不存在")
         
-        # 查找字幕记录
+        # 查找字幕记录（完整字幕生成前返回预览字幕）
         transcript = db.query(Transcript).filter(Transcript.video_id == video_id).first()
+        quality_flags = db.query(TranscriptQualityFlag).filter(
+            TranscriptQualityFlag.video_id == video_id
+        ).order_by(TranscriptQualityFlag.start).all()
+        preview = None
+        if not transcript:
+            preview = db.query(TranscriptPreview).filter(TranscriptPreview.video_id == video_id).first()
         
         return {
             "video": {
@@ -764,7 +767,21 @@ async def get_video_detail(video_id: int, db: Session = Depends(get_db)):
                 "processing_time": transcript.processing_time if transcript else None,
                 "created_at": transcript.created_at if transcript else None
             } if transcript else None,
-            "has_transcript": transcript is not None
+            "has_transcript": transcript is not None,
+            "quality_flags": [
+                {"kind": flag.kind, "start": flag.start, "end": flag.end, "detail": flag.detail}
+                for flag in quality_flags
+            ],
+            "preview": {
+                "preview_seconds": preview.preview_seconds,
+                "original_text": preview.original_text,
+                "summary": preview.summary,
+                "tags": preview.tags,
+                "language": preview.language,
+                "confidence_score": preview.confidence_score,
+                "processing_time": preview.processing_time,
+                "created_at": preview.created_at
+            } if preview else None
         }
         
     except HTTPException:
@@ -773,6 +790,52 @@ async def get_video_detail(video_id: int, db: Session = Depends(get_db)):
         logger.error(f"获取视频详情失败: {e}")
         raise HTTPException(status_code=500, detail=f"获取视频详情失败: {str(e)}")
 
+def _reconciliation_info(run: ReconciliationRun) -> Dict[str, Any]:
+    return {
+        "run_id": run.id,
+        "dry_run": run.dry_run,
+        "status": run.status,
+        "phase": run.phase,
+        "task_id": run.task_id,
+        "report": json.loads(run.report) if run.report else None,
+        "error_message": run.error_message,
+        "created_at": run.created_at,
+        "updated_at": run.updated_at,
+        "finished_at": run.finished_at
+    }
+
+@router.post("/reconcile")
+async def start_reconciliation(dry_run: bool = True, db: Session = Depends(get_db)):
+    """启动文件系统/数据库对账（默认 dry_run 只生成报告），同一时间只运行一个"""
+    stale_before = datetime.utcnow() - timedelta(hours=1)
+    active = db.query(ReconciliationRun).filter(
+        ReconciliationRun.status.in_(["pending", "running"]),
+        ReconciliationRun.updated_at >= stale_before  # 超过1小时没有进度的视为已中断
+    ).first()
+    if active:
+        raise HTTPException(status_code=409, detail={
+            "message": "已有对账任务在运行",
+            "run_id": active.id
+        })
+    
+    run = ReconciliationRun(dry_run=dry_run, status="pending", phase="scan", cursor=0)
+    db.add(run)
+    db.commit()
+    task = reconcile_library_task.delay(run.id)
+    run.task_id = task.id
+    db.commit()
+    
+    logger.info(f"🧾 对账任务已提交: run_id={run.id}, dry_run={dry_run}")
+    return _reconciliation_info(run)
+
+@router.get("/reconcile/{run_id}")
+async def get_reconciliation(run_id: int, db: Session = Depends(get_db)):
+    """获取对账进度和报告"""
+    run = db.query(ReconciliationRun).filter(ReconciliationRun.id == run_id).first()
+    if not run:
+        raise HTTPException(status_code=404, detail="对账记录不存在")
+    return _reconciliation_info(run)
+
 @router.post("/reset-failed")
 async def reset_failed_videos(db: Session = Depends(get_db)):
     """重置所有失败的视频状态，允许重新处理"""
@@ -803,17 +866,10 @@ async def reset_failed_videos(db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"重置失败: {str(e)}")
 
 @router.post("/reset-video/{video_name}")
-async def reset_single_video(video_name: str, db: Session = Depends(get_db)):
+async def reset_single_video(video_name: str, relative_path: Optional[str] = None, db: Session = Depends(get_db)):
     """重置单个视频的失败状态"""
     try:
-        watch_dir = Path(settings.LOCAL_VIDEO_DIR)
-        video_file = None
-        
-        # 查找视频文件
-        for file_path in watch_dir.rglob('*'):
-            if file_path.name == video_name:
-                video_file = file_path
-                break
+        video_file = _find_video_file(video_name, relative_path)
         
         if not video_file:
             raise HTTPException(status_code=404, detail="视频文件不存在")
@@ -933,7 +989,6 @@ async def batch_process_videos_api(video_names: List[str], db: Session = Depends
         logger.info(f"📦 批量处理请求: {len(video_names)} 个视频")
         
         video_ids = []
-        watch_dir = Path(settings.LOCAL_VIDEO_DIR)
         
         # 验证所有视频文件存在并创建记录
         for video_name in video_names:
@@ -942,12 +997,12 @@ async def batch_process_videos_api(video_names: List[str], db: Session = Depends
                 logger.warning(f"⚠️ 跳过macOS元数据文件: {video_name}")
                 continue
                 
-            # 查找视频文件
-            video_file = None
-            for file_path in watch_dir.rglob('*'):
-                if file_path.name == video_name:
-                    video_file = file_path
-                    break
+            # 查找视频文件（名称中含路径分隔符时按相对路径查找）
+            try:
+                video_file = _find_video_file(Path(video_name).name, video_name if '/' in video_name else None)
+            except HTTPException as e:
+                logger.warning(f"⚠️ 存在多个同名文件，跳过: {video_name}, 候选: {e.detail['candidates']}")
+                continue
             
             if not video_file:
                 logger.warning(f"⚠️ 视频文件不存在: {video_name}")
@@ -1139,7 +1194,9 @@ async def clear_gpu_memory():
             torch.cuda.empty_cache()
             torch.cuda.ipc_collect()
             
-        # 重新初始化模型
+        # 卸载注册表中的全部模型，下次使用时重新加载
+        from app.services.model_registry import model_registry
+        model_registry.clear()
         ai_service.model = None
         
         memory_info = {}
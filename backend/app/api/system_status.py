@@ -6,6 +6,8 @@ from fastapi import APIRouter, HTTPException
 from typing import Dict, Any
 from app.utils.system_monitor import system_monitor
 from app.services.ai_service import ai_service
+from app.services.transcription_cache import transcription_cache
+from app.services.audio_cache import audio_cache
 from app.core.config import settings
 import logging
 
@@ -84,24 +86,200 @@ async def set_transcription_mode(mode: str) -> Dict[str, str]:
 async def toggle_force_cpu(force: bool) -> Dict[str, Any]:
     """切换强制CPU模式"""
     try:
+        previous_key = ai_service._model_key()
         settings.FORCE_CPU_MODE = force
         
-        # 如果有已加载的模型，需要重新加载以应用新设置
-        if hasattr(ai_service, 'model') and ai_service.model is not None:
-            logger.info("🔄 检测到设备模式变更，将在下次转录时重新加载模型")
-            ai_service.model = None  # 重置模型，下次使用时会重新加载
+        # 已加载过模型时在后台加载新设备上的模型，加载完成前旧模型继续服务
+        swapping = False
+        if ai_service.model is not None:
+            swapping = ai_service.swap_model_async(previous_key)
+            if swapping:
+                logger.info("🔄 检测到设备模式变更，正在后台加载新模型，完成后自动切换")
         
         logger.info(f"🔧 强制CPU模式已{'启用' if force else '禁用'}")
         
         return {
             "message": f"强制CPU模式已{'启用' if force else '禁用'}",
             "force_cpu": force,
-            "will_reload_model": True
+            "will_reload_model": swapping
         }
     except Exception as e:
         logger.error(f"切换强制CPU模式失败: {e}")
         raise HTTPException(status_code=500, detail=f"切换强制CPU模式失败: {str(e)}")
 
+@router.get("/system/transcription-cache")
+async def get_transcription_cache_stats() -> Dict[str, Any]:
+    """获取转录结果缓存统计（命中率、占用空间、淘汰次数）"""
+    try:
+        return transcription_cache.stats()
+    except Exception as e:
+        logger.error(f"获取转录缓存统计失败: {e}")
+        raise HTTPException(status_code=500, detail=f"获取转录缓存统计失败: {str(e)}")
+
+@router.delete("/system/transcription-cache")
+async def clear_transcription_cache() -> Dict[str, Any]:
+    """清空转录结果缓存"""
+    try:
+        deleted = transcription_cache.clear()
+        logger.info(f"🧹 已清空转录缓存: {deleted} 个条目")
+        return {"message": "转录缓存已清空", "deleted": deleted}
+    except Exception as e:
+        logger.error(f"清空转录缓存失败: {e}")
+        raise HTTPException(status_code=500, detail=f"清空转录缓存失败: {str(e)}")
+
+@router.get("/system/audio-cache")
+async def get_audio_cache_stats() -> Dict[str, Any]:
+    """获取解码音频缓存统计"""
+    try:
+        return audio_cache.stats()
+    except Exception as e:
+        logger.error(f"获取音频缓存统计失败: {e}")
+        raise HTTPException(status_code=500, detail=f"获取音频缓存统计失败: {str(e)}")
+
+@router.delete("/system/audio-cache")
+async def clear_audio_cache() -> Dict[str, Any]:
+    """清空解码音频缓存"""
+    try:
+        removed = audio_cache.clear()
+        logger.info(f"🧹 已清空音频缓存: {removed} 个文件")
+        return {"message": "音频缓存已清空", "deleted": removed}
+    except Exception as e:
+        logger.error(f"清空音频缓存失败: {e}")
+        raise HTTPException(status_code=500, detail=f"清空音频缓存失败: {str(e)}")
+
+@router.get("/system/model-server")
+async def get_model_server_health() -> Dict[str, Any]:
+    """获取常驻模型服务的健康状态"""
+    if not settings.MODEL_SERVER_ENABLED:
+        return {"enabled": False}
+    
+    from app.services.model_server import RemoteWhisperModel
+    try:
+        health = RemoteWhisperModel(settings.WHISPER_MODEL).health()
+        return {"enabled": True, "available": True, **health}
+    except Exception as e:
+        logger.warning(f"模型服务不可用: {e}")
+        return {"enabled": True, "available": False, "error": str(e)}
+
+@router.get("/system/models")
+async def get_loaded_models() -> Dict[str, Any]:
+    """获取模型注册表状态（已驻留的模型、正在加载的模型、内存预算）"""
+    from app.services.model_registry import model_registry
+    
+    return {
+        "default_model": ai_service.model_name,
+        "default_key": list(ai_service._model_key()),
+        **model_registry.status()
+    }
+
+@router.post("/system/models/swap")
+async def swap_default_model(model_name: str) -> Dict[str, Any]:
+    """切换默认模型：后台加载新模型，加载完成前旧模型继续服务
+    
+    同时通知模型服务后台加载，并发布到 Redis，各 worker 子进程在执行下一个任务前切换
+    """
+    from app.services.model_selection import publish_default_model, validate_model_name
+    
+    try:
+        validate_model_name(model_name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        previous_key = ai_service._model_key()
+        settings.WHISPER_MODEL = model_name
+        ai_service.model_name = model_name
+        swapping = ai_service.swap_model_async(previous_key)
+        
+        model_server = None
+        if settings.MODEL_SERVER_ENABLED:
+            from app.services.model_server import RemoteWhisperModel
+            try:
+                model_server = RemoteWhisperModel(model_name).preload()
+            except Exception as e:
+                logger.warning(f"⚠️ 通知模型服务切换模型失败: {e}")
+                model_server = {"type": "error", "error": str(e)}
+        workers_notified = publish_default_model(model_name)
+        
+        logger.info(f"🔁 默认模型切换为 {model_name}{'，正在后台加载' if swapping else ''}")
+        return {
+            "message": f"默认模型已切换为 {model_name}",
+            "model_name": model_name,
+            "loading_in_background": swapping,
+            "workers_notified": workers_notified,
+            "model_server": model_server
+        }
+    except Exception as e:
+        logger.error(f"切换模型失败: {e}")
+        raise HTTPException(status_code=500, detail=f"切换模型失败: {str(e)}")
+
+@router.get("/system/readiness")
+async def get_model_readiness() -> Dict[str, Any]:
+    """获取API进程和各worker子进程的模型就绪状态（是否已加载、是否已预热、耗时）"""
+    from app.services.worker_readiness import load_worker_readiness
+    
+    workers = load_worker_readiness() if settings.MODEL_WARMUP_ENABLED else []
+    return {
+        "warmup_enabled": settings.MODEL_WARMUP_ENABLED,
+        "api": ai_service.readiness,
+        "workers": workers,
+        "warm_workers": sum(1 for worker in workers if worker.get("warmed")),
+        "cold_workers": sum(1 for worker in workers if not worker.get("warmed"))
+    }
+
+@router.get("/system/vad-stats")
+async def get_vad_stats() -> Dict[str, Any]:
+    """VAD统计：已转录视频的总时长、语音时长和节省的推理比例"""
+    from sqlalchemy import func
+    from app.core.database import SessionLocal, TranscriptionStats
+    
+    db = SessionLocal()
+    try:
+        count, audio_seconds, speech_seconds = db.query(
+            func.count(TranscriptionStats.id),
+            func.coalesce(func.sum(TranscriptionStats.audio_seconds), 0.0),
+            func.coalesce(func.sum(TranscriptionStats.speech_seconds), 0.0)
+        ).one()
+        return {
+            "vad_enabled": settings.VAD_ENABLED,
+            "videos": count,
+            "audio_hours": round(audio_seconds / 3600, 2),
+            "speech_hours": round(speech_seconds / 3600, 2),
+            "speech_ratio": round(speech_seconds / audio_seconds, 4) if audio_seconds else 0.0,
+            "compute_saved_ratio": round(1 - speech_seconds / audio_seconds, 4) if audio_seconds else 0.0
+        }
+    finally:
+        db.close()
+
+@router.get("/system/cascade-stats")
+async def get_cascade_stats() -> Dict[str, Any]:
+    """级联转录统计：大模型实际复核的音频比例和两级推理耗时"""
+    from sqlalchemy import func
+    from app.core.database import SessionLocal, CascadeStats
+    
+    db = SessionLocal()
+    try:
+        count, audio_seconds, refined_seconds, draft_inference, refine_inference = db.query(
+            func.count(CascadeStats.id),
+            func.coalesce(func.sum(CascadeStats.audio_seconds), 0.0),
+            func.coalesce(func.sum(CascadeStats.refined_audio_seconds), 0.0),
+            func.coalesce(func.sum(CascadeStats.draft_inference_seconds), 0.0),
+            func.coalesce(func.sum(CascadeStats.refine_inference_seconds), 0.0)
+        ).one()
+        return {
+            "cascade_enabled": settings.CASCADE_ENABLED,
+            "draft_model": settings.CASCADE_DRAFT_MODEL,
+            "refine_model": settings.WHISPER_MODEL,
+            "videos": count,
+            "audio_hours": round(audio_seconds / 3600, 2),
+            "refined_hours": round(refined_seconds / 3600, 2),
+            "refined_ratio": round(refined_seconds / audio_seconds, 4) if audio_seconds else 0.0,
+            "draft_inference_hours": round(draft_inference / 3600, 2),
+            "refine_inference_hours": round(refine_inference / 3600, 2)
+        }
+    finally:
+        db.close()
+
 @router.get("/system/performance-tips")
 async def get_performance_tips() -> Dict[str, Any]:
     """获取性能优化建议"""
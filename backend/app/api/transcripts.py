@@ -1,7 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from app.core.database import get_db, Transcript
-from app.models.schemas import TranscriptResponse, TranscriptUpdate
+from typing import List
+import asyncio
+import json
+from app.core.database import get_db, SessionLocal, Transcript, Video
+from app.core.config import settings
+from app.models.schemas import TranscriptResponse, TranscriptUpdate, TranscriptSegmentResponse, TranscriptRangeRequest
+from app.services.model_selection import validate_model_name
+from app.services.segment_store import has_segments, load_segments
 
 router = APIRouter()
 
@@ -15,6 +22,105 @@ async def get_transcript(video_id: int, db: Session = Depends(get_db)):
     
     return transcript
 
+@router.get("/{video_id}/segments", response_model=List[TranscriptSegmentResponse])
+async def get_transcript_segments(
+    video_id: int,
+    after: int = -1,
+    limit: int = 500,
+    db: Session = Depends(get_db)
+):
+    """获取已落库的转录片段（转录进行中也可读取，after为上次拿到的最后一个片段序号）"""
+    
+    return load_segments(db, video_id, after_index=after, limit=min(max(limit, 1), 2000))
+
+@router.post("/{video_id}/range")
+async def transcribe_range(video_id: int, request: TranscriptRangeRequest, db: Session = Depends(get_db)):
+    """转录视频的指定时间范围（只解码该范围），可选择用结果修补已有字幕；通过任务状态接口获取结果"""
+    from app.tasks.video_tasks import transcribe_range_task
+    
+    if request.end <= request.start:
+        raise HTTPException(status_code=400, detail="结束时间必须大于起始时间")
+    if request.end - request.start > settings.RANGE_TRANSCRIBE_MAX_SECONDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"时间范围不能超过 {settings.RANGE_TRANSCRIBE_MAX_SECONDS} 秒，请使用完整转录"
+        )
+    
+    if request.model_name:
+        try:
+            validate_model_name(request.model_name)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    video = db.query(Video).filter(Video.id == video_id).first()
+    if not video or not video.local_path:
+        raise HTTPException(status_code=404, detail="视频不存在")
+    if request.patch:
+        if video.status != "completed" or not db.query(Transcript.id).filter(Transcript.video_id == video_id).first():
+            raise HTTPException(status_code=409, detail="视频没有完整字幕，无法修补")
+        if not has_segments(db, video_id):
+            raise HTTPException(status_code=409, detail="该字幕没有保存时间片段（早期转录），无法按时间范围修补，请重新完整转录")
+    
+    task = transcribe_range_task.delay(video_id, request.start, request.end, request.patch, request.model_name)
+    return {
+        "task_id": task.id,
+        "video_id": video_id,
+        "start": request.start,
+        "end": request.end,
+        "patch": request.patch
+    }
+
+@router.get("/{video_id}/stream")
+async def stream_transcript(video_id: int, after: int = -1, poll_interval: float = 1.0):
+    """以SSE推送转录片段，转录进行中时实时推送新增片段，处理结束后发送done事件"""
+    
+    db = SessionLocal()
+    try:
+        if not db.query(Video.id).filter(Video.id == video_id).first():
+            raise HTTPException(status_code=404, detail="视频不存在")
+    finally:
+        db.close()
+    
+    poll_interval = min(max(poll_interval, 0.2), 10.0)
+    
+    async def event_stream():
+        last_index = after
+        while True:
+            db = SessionLocal()
+            try:
+                segments = load_segments(db, video_id, after_index=last_index, limit=200)
+                video = db.query(Video).filter(Video.id == video_id).first()
+                status = video.status if video else "deleted"
+            finally:
+                db.close()
+            
+            for segment in segments:
+                last_index = segment.segment_index
+                payload = {
+                    "segment_index": segment.segment_index,
+                    "start": segment.start,
+                    "end": segment.end,
+                    "text": segment.text
+                }
+                yield f"id: {segment.segment_index}\nevent: segment\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+            
+            if segments:
+                continue
+            
+            if status not in ("pending", "processing", "downloading"):
+                yield f"event: done\ndata: {json.dumps({'status': status, 'last_index': last_index})}\n\n"
+                break
+            
+            # 保持连接，避免代理超时断开
+            yield ": keep-alive\n\n"
+            await asyncio.sleep(poll_interval)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.put("/{video_id}", response_model=TranscriptResponse)
 async def update_transcript(
     video_id: int,
@@ -40,4 +146,4 @@ async def update_transcript(
     db.commit()
     db.refresh(transcript)
     
-    return transcript
\ No newline at end of file
+    return transcript
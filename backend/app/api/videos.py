@@ -8,7 +8,11 @@ from app.models.schemas import (
     VideoListResponse, VideoProcessRequest, LearningRecordCreate
 )
 from pydantic import BaseModel
+from app.core.config import settings
 from app.services.ai_service import ai_service
+from app.services.media_ingest import ingest_video
+from app.services.file_identity import resolve_fingerprint
+from app.services.video_cleanup import delete_video_records, remove_video_files
 import asyncio
 import logging
 
@@ -78,11 +82,16 @@ async def process_video_background(video_id: int, url: str, db: Session):
         video.status = "processing"
         db.commit()
         
-        # 提取音频
-        audio_path = await ai_service.extract_audio(video_path)
+        # 单次导入：PCM 写入解码音频缓存，同时补齐元数据和缩略图（平台提供的缩略图保留）
+        # 缓存键使用完整哈希确认后的指纹（抽样碰撞的文件不会共用音频缓存和结果缓存）
+        fingerprint = None
+        if settings.AUDIO_CACHE_ENABLED or settings.TRANSCRIPTION_CACHE_ENABLED:
+            fingerprint, _ = resolve_fingerprint(db, video_path, exclude_video_id=video.id)
+        if settings.INGEST_ENABLED:
+            await asyncio.get_running_loop().run_in_executor(None, ingest_video, db, video, fingerprint)
         
-        # 转录字幕
-        transcript_data = await ai_service.transcribe_audio(audio_path)
+        # 转录字幕（从解码音频缓存读取，不再单独提取 WAV 文件）
+        transcript_data = await ai_service.transcribe_video(video_path, fingerprint=fingerprint)
         
         # 保存字幕到数据库
         from app.core.database import Transcript
@@ -122,7 +131,7 @@ async def process_local_video_background(video_id: int, video_path: str, db: Ses
         db.commit()
         
         # 直接转录本地视频
-        transcript_data = await ai_service.transcribe_video(video_path)
+        transcript_data = await ai_service.transcribe_video(video_path, fingerprint=video.file_fingerprint)
         
         # 保存字幕到数据库
         from app.core.database import Transcript
@@ -270,15 +279,8 @@ async def delete_video(video_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="视频不存在")
     
     try:
-        # 先删除相关的学习记录
-        learning_records = db.query(LearningRecord).filter(LearningRecord.video_id == video_id).all()
-        for record in learning_records:
-            db.delete(record)
-        
-        # 删除相关的字幕记录
-        transcripts = db.query(Transcript).filter(Transcript.video_id == video_id).all()
-        for transcript in transcripts:
-            db.delete(transcript)
+        # 先删除全部关联记录（学习记录、字幕、片段、检查点、统计、媒体信息、指纹等）
+        delete_video_records(db, video_id)
         
         # 清理文件
         await ai_service.cleanup_files(video_id)
@@ -286,6 +288,7 @@ async def delete_video(video_id: int, db: Session = Depends(get_db)):
         # 最后删除视频记录
         db.delete(video)
         db.commit()
+        remove_video_files(video_id)
         
         return {"message": "视频删除成功"}
         
@@ -353,6 +356,7 @@ async def batch_delete_videos(request: BatchDeleteRequest, db: Session = Depends
     deleted_count = 0
     failed_count = 0
     failed_videos = []
+    deleted_ids = []
     
     for video_id in request.video_ids:
         try:
@@ -362,15 +366,8 @@ async def batch_delete_videos(request: BatchDeleteRequest, db: Session = Depends
                 failed_videos.append({"id": video_id, "error": "视频不存在"})
                 continue
             
-            # 先删除相关的学习记录
-            learning_records = db.query(LearningRecord).filter(LearningRecord.video_id == video_id).all()
-            for record in learning_records:
-                db.delete(record)
-            
-            # 删除相关的字幕记录
-            transcripts = db.query(Transcript).filter(Transcript.video_id == video_id).all()
-            for transcript in transcripts:
-                db.delete(transcript)
+            # 先删除全部关联记录（学习记录、字幕、片段、检查点、统计、媒体信息、指纹等）
+            delete_video_records(db, video_id)
             
             # 清理文件
             try:
@@ -381,6 +378,7 @@ async def batch_delete_videos(request: BatchDeleteRequest, db: Session = Depends
             # 最后删除视频记录
             db.delete(video)
             deleted_count += 1
+            deleted_ids.append(video_id)
             
         except Exception as e:
             failed_count += 1
@@ -389,6 +387,8 @@ async def batch_delete_videos(request: BatchDeleteRequest, db: Session = Depends
     
     try:
         db.commit()
+        for video_id in deleted_ids:
+            remove_video_files(video_id)
         return {
             "message": f"批量删除完成",
             "deleted_count": deleted_count,
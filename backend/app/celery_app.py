@@ -4,6 +4,7 @@ Celery应用配置
 """
 
 from celery import Celery
+from celery.signals import worker_process_init, worker_process_shutdown
 from app.core.config import settings
 import logging
 
@@ -32,6 +33,8 @@ celery_app.conf.update(
     worker_prefetch_multiplier=1,  # 每个worker一次只预取一个任务，避免GPU资源争抢
     task_acks_late=True,  # 任务完成后才确认，保证不丢失任务
     worker_max_tasks_per_child=10,  # 每个worker最多处理10个任务后重启，防止内存泄漏
+    # 子进程初始化（含模型预热）完成前主进程不会向其分发任务，启用预热时放宽初始化超时
+    worker_proc_alive_timeout=settings.MODEL_WARMUP_TIMEOUT if settings.MODEL_WARMUP_ENABLED else 4.0,
     
     # 任务配置
     task_soft_time_limit=3600,  # 软超时1小时
@@ -46,6 +49,14 @@ celery_app.conf.update(
     task_routes={
         'app.tasks.video_tasks.process_video_task': {'queue': 'video_processing'},
         'app.tasks.video_tasks.batch_process_videos': {'queue': 'video_processing'},
+        'app.tasks.video_tasks.batch_transcribe_videos': {'queue': 'video_processing'},
+        'app.tasks.video_tasks.pipeline_transcribe_videos': {'queue': 'video_processing'},
+        'app.tasks.video_tasks.reconcile_library_task': {'queue': 'video_processing'},
+        'app.tasks.video_tasks.backfill_fingerprints_task': {'queue': 'video_processing'},
+        'app.tasks.video_tasks.preview_video_task': {'queue': 'video_preview'},
+        # 时间范围转录可能指定任意模型，走使用模型服务的处理队列（在模型服务中以高优先级排队），
+        # 不在预览 worker 中再加载一份大模型
+        'app.tasks.video_tasks.transcribe_range_task': {'queue': 'video_processing'},
     },
     
     # 队列配置
@@ -54,6 +65,11 @@ celery_app.conf.update(
         'video_processing': {
             'exchange': 'video_processing',
             'routing_key': 'video_processing',
+        },
+        # 预览队列由独立的worker消费，不会排在完整转录任务之后
+        'video_preview': {
+            'exchange': 'video_preview',
+            'routing_key': 'video_preview',
         }
     }
 )
@@ -69,6 +85,26 @@ def setup_periodic_tasks(sender, **kwargs):
         name='cleanup GPU memory every 30 minutes'
     )
 
+@worker_process_init.connect
+def warm_up_worker_model(**kwargs):
+    """子进程启动时预加载并预热模型，避免回收重启后的第一个任务承担冷启动延迟"""
+    if not settings.MODEL_WARMUP_ENABLED:
+        return
+    
+    from app.tasks.video_tasks import get_worker_ai_service
+    from app.services.worker_readiness import publish_worker_readiness
+    
+    logger.info("🔥 worker子进程开始预热模型")
+    readiness = get_worker_ai_service().warm_up()
+    publish_worker_readiness(readiness)
+
+@worker_process_shutdown.connect
+def clear_worker_readiness(**kwargs):
+    """子进程退出时删除其就绪状态"""
+    if settings.MODEL_WARMUP_ENABLED:
+        from app.services.worker_readiness import remove_worker_readiness
+        remove_worker_readiness()
+
 @celery_app.task
 def cleanup_gpu_memory():
     """定期清理GPU内存"""
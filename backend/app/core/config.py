@@ -21,6 +21,16 @@ class Settings(BaseSettings):
     AUDIO_DIR: str = "/var/video-learning-manager/audios"
     THUMBNAIL_DIR: str = "/var/video-learning-manager/thumbnails"
     
+    # 文件指纹配置 - 抽样指纹用于去重，完整哈希只在抽样指纹相同时计算
+    FINGERPRINT_IO_WORKERS: int = 2  # 计算完整哈希的后台I/O线程数（限制同时进行的全文件读取）
+    FINGERPRINT_BACKFILL_CHUNK: int = 200  # 升级前的完整指纹改为抽样指纹时，每个任务处理的视频数量
+    FINGERPRINT_BACKFILL_LEASE_SECONDS: int = 1800  # 回填任务链的租约时长，任务链每批续约；超时未续约（如进程崩溃）后才允许重新启动
+    
+    # 单次导入配置 - 一次读取文件同时得到 PCM、元数据和关键帧缩略图
+    INGEST_ENABLED: bool = True
+    THUMBNAIL_AT_SECONDS: float = 5.0  # 取该时间点之后的第一个关键帧作为缩略图，跳过片头黑屏
+    THUMBNAIL_WIDTH: int = 480
+    
     # AI转录配置
     TRANSCRIPTION_MODE: str = "local"  # local, auto
     FORCE_CPU_MODE: bool = False  # 强制CPU模式（开发环境）
@@ -46,6 +56,10 @@ class Settings(BaseSettings):
     # 任务队列配置
     CELERY_BROKER_URL: str = "redis://localhost:6379/0"
     CELERY_RESULT_BACKEND: str = "redis://localhost:6379/0"
+    CELERY_WORKER_CONCURRENCY: int = Field(
+        default=1,
+        description="转录 worker 的子进程数（与启动命令的 --concurrency 一致），用于平分长视频分块转录的CPU核数"
+    )
     
     # 视频处理配置
     MAX_VIDEO_SIZE: int = 500 * 1024 * 1024  # 500MB
@@ -62,9 +76,173 @@ class Settings(BaseSettings):
         description="转录队列大小，避免大量视频上传时系统过载"
     )
     
+    # 批量推理配置 - 多个短视频共享前向计算
+    BATCH_INFERENCE_ENABLED: bool = False
+    BATCH_INFERENCE_SIZE: int = Field(
+        default=8,
+        description="单次前向计算打包的音频片段数量"
+    )
+    BATCH_INFERENCE_MAX_VIDEOS: int = Field(
+        default=16,
+        description="单个批量推理任务最多包含的视频数量"
+    )
+    BATCH_INFERENCE_MAX_CLIP_SECONDS: int = Field(
+        default=300,
+        description="参与批量推理的视频最大时长，超过则走单视频任务"
+    )
+    
+    # 长视频分块并行转录配置
+    LONG_VIDEO_MODE_ENABLED: bool = False
+    LONG_VIDEO_MIN_SECONDS: int = Field(
+        default=1200,
+        description="达到该时长的视频启用分块并行转录"
+    )
+    LONG_VIDEO_CHUNK_SECONDS: int = 300  # 目标分块时长，实际切分点落在附近的静音处
+    LONG_VIDEO_OVERLAP_SECONDS: float = 2.0  # 相邻分块的重叠时长
+    LONG_VIDEO_WORKERS: int = Field(
+        default=0,
+        description="分块转录的并行推理实例数，0表示按CPU核数和 CELERY_WORKER_CONCURRENCY 自动计算"
+    )
+    LONG_VIDEO_THREADS_PER_WORKER: int = 2
+    
+    # VAD 配置 - 基于能量检测语音区间，只把语音送入模型
+    VAD_ENABLED: bool = False
+    VAD_THRESHOLD_DB: Optional[float] = Field(
+        default=None,
+        description="语音能量阈值（dBFS），为空时按底噪自适应"
+    )
+    VAD_MIN_SPEECH_MS: int = 250  # 短于该时长的语音段视为噪声
+    VAD_MIN_SILENCE_MS: int = 500  # 短于该时长的静音不切开
+    VAD_PAD_MS: int = 200  # 语音区间两侧保留的余量
+    VAD_MAX_SPEECH_RATIO: float = 0.95  # 语音占比高于该值时不裁剪，直接使用原音频
+    VAD_MIN_SPEECH_RATIO: float = 0.1  # 检测到的语音占比低于该值时（噪声大或通篇语音时自适应阈值会失效）不裁剪，直接使用原音频
+    VAD_SILENCE_FLOOR_DB: float = -60.0  # 最响的帧也低于该电平（dBFS）时才视为完全静音，跳过模型推理
+    
+    # 幻觉循环检测配置 - 检测到重复/无语音连串时停止解码，跳过坏区后继续转录
+    LOOP_GUARD_ENABLED: bool = False  # 默认关闭，阈值在真实数据上调优后再开启
+    LOOP_GUARD_WINDOW: int = 8  # 滑动窗口片段数（片段延迟该数量后才产出）
+    LOOP_GUARD_MAX_REPEATS: int = 4  # 同一文本连续出现该次数视为循环
+    LOOP_GUARD_COMPRESSION_RATIO: float = Field(
+        default=3.5,
+        description="窗口内文本的压缩比超过该值视为循环（正常中文约 1.2~1.6）"
+    )
+    LOOP_GUARD_NO_SPEECH_STREAK: int = 8  # 连续多少个高无语音概率的片段视为幻觉
+    LOOP_GUARD_NO_SPEECH_PROB: float = 0.6
+    LOOP_GUARD_SKIP_SECONDS: float = 30.0  # 检测到循环后跳过的时长，从之后重新解码
+    LOOP_GUARD_MAX_RESTARTS: int = 20  # 单次转录最多跳过坏区重启解码的次数，之后剩余音频不再检测
+    
+    # 两级模型级联配置 - 小模型草稿，大模型只复核低置信度区间
+    CASCADE_ENABLED: bool = False
+    CASCADE_DRAFT_MODEL: str = "small"  # 草稿模型，复核使用默认模型 WHISPER_MODEL
+    CASCADE_DRAFT_COMPUTE_TYPE: str = "int8"  # 草稿模型计算类型，auto 时与默认模型一致
+    CASCADE_LOGPROB_THRESHOLD: float = Field(
+        default=-0.8,
+        description="片段平均对数概率低于该值时交给大模型复核"
+    )
+    CASCADE_NO_SPEECH_THRESHOLD: float = 0.6  # 无语音概率高于该值却输出了文字时复核
+    CASCADE_COMPRESSION_RATIO_THRESHOLD: float = 2.4  # 压缩比高于该值（疑似重复/幻觉）时复核
+    CASCADE_SPAN_PADDING: float = 0.5  # 复核区间两侧附带的上下文音频（秒）
+    CASCADE_MAX_GAP: float = 1.0  # 间隔小于该秒数的低置信度片段合并为一个复核区间
+    CASCADE_MAX_REFINE_RATIO: float = Field(
+        default=0.6,
+        description="需要复核的时长占比超过该值时，直接用大模型转录整段"
+    )
+    
+    # 快速预览配置 - 新提交的视频先在高优先级队列转录开头部分，完整转录随后正常排队
+    PREVIEW_ENABLED: bool = False
+    PREVIEW_SECONDS: int = Field(
+        default=90,
+        description="预览转录的开头时长（秒）"
+    )
+    PREVIEW_MODEL: str = ""  # 预览使用的模型，为空时使用默认模型
+    RANGE_TRANSCRIBE_MAX_SECONDS: int = 600  # 时间范围转录（片段抽查/修正）允许的最大时长
+    
+    # 流水线转录配置 - 解码/推理/后处理分阶段重叠执行
+    PIPELINE_ENABLED: bool = False
+    PIPELINE_PREFETCH: int = Field(
+        default=2,
+        description="解码阶段最多提前解码的文件数（有界队列长度，控制内存占用）"
+    )
+    PIPELINE_POSTPROCESS_QUEUE: int = 4  # 等待后处理的结果队列长度
+    PIPELINE_MAX_VIDEOS: int = 8  # 单个流水线任务最多包含的视频数量
+    
+    # 转录片段流式落库配置
+    SEGMENT_FLUSH_BATCH: int = 10  # 每累计多少个片段写一次数据库
+    SEGMENT_FLUSH_INTERVAL: float = 5.0  # 距上次写入超过该秒数也会写入
+    SEGMENT_BUFFER_MAX: int = 500  # 数据库持续写入失败时缓冲片段的上限，超过时中止本次转录
+    
+    # 转录结果缓存配置 - 相同文件、模型和参数直接复用结果
+    TRANSCRIPTION_CACHE_ENABLED: bool = True
+    TRANSCRIPTION_CACHE_MAX_ENTRIES: int = 5000
+    TRANSCRIPTION_CACHE_MAX_BYTES: int = 512 * 1024 * 1024  # 512MB
+    
+    # 解码音频缓存配置 - 以内存映射的 .npy 文件保存解码后的 PCM
+    # 默认关闭；开启时各服务（API、worker、模型服务）应指向同一个持久化的共享目录
+    AUDIO_CACHE_ENABLED: bool = False
+    AUDIO_CACHE_DIR: str = "/var/video-learning-manager/audios/pcm-cache"
+    AUDIO_CACHE_MAX_BYTES: int = 20 * 1024 * 1024 * 1024  # 20GB
+    AUDIO_CACHE_DTYPE: str = Field(
+        default="float32",
+        description="缓存的PCM格式：float32 可零拷贝送入模型，int16 占用一半磁盘但读取时需转换"
+    )
+    
+    # 模型预热配置 - worker子进程和API启动时预加载模型并做一次合成音频推理
+    MODEL_WARMUP_ENABLED: bool = False
+    MODEL_WARMUP_SECONDS: float = 2.0  # 预热用合成音频时长
+    MODEL_WARMUP_TIMEOUT: float = Field(
+        default=600.0,
+        description="worker子进程初始化（含模型加载和预热）的超时秒数，超时的子进程会被重启"
+    )
+    
+    # 模型注册表配置 - 进程内可同时驻留多个模型，按最近使用淘汰
+    MODEL_REGISTRY_MAX_BYTES: int = Field(
+        default=8 * 1024 * 1024 * 1024,
+        description="驻留模型的内存/显存预算（按参数量估算），超出时淘汰最久未使用的模型"
+    )
+    MODEL_REGISTRY_MAX_MODELS: int = 2  # 同时驻留的模型数量上限
+    WHISPER_ALLOWED_MODELS: str = Field(
+        default="tiny,base,small,medium,large,large-v2,large-v3",
+        description="允许按任务指定或热切换的模型名，逗号分隔（WHISPER_MODEL 始终允许）"
+    )
+    
+    # 常驻模型服务配置 - 所有worker共享同一份已加载的模型
+    MODEL_SERVER_ENABLED: bool = False
+    MODEL_SERVER_SOCKET: str = "/var/video-learning-manager/model-server.sock"
+    MODEL_SERVER_AUTHKEY: str = Field(
+        default="",
+        description="模型服务 socket 的认证密钥，必须通过环境变量设置；未设置时模型服务拒绝启动，worker 回退到进程内加载模型"
+    )
+    MODEL_SERVER_PRELOAD: str = Field(
+        default="",
+        description="模型服务启动时预加载的模型，逗号分隔，为空时加载 WHISPER_MODEL"
+    )
+    MODEL_SERVER_MAX_QUEUE: int = 32  # 排队等待的转录请求上限，超过时直接拒绝
+    
     # 本地视频监控配置
     LOCAL_VIDEO_DIR: str = "/Users/user/Documents/AI-MCP-Store/video-learning-manager/local-videos"
     ENABLE_LOCAL_SCAN: bool = True
+    WATCH_QUEUE_MAX: int = 5000  # 等待处理的文件事件上限，超过时丢弃（之后的扫描会补上）
+    WATCH_DEBOUNCE_SECONDS: float = 2.0  # 同一文件的事件合并，最后一次事件后等待该秒数再处理
+    WATCH_CONCURRENCY: int = 4  # 同时处理的新文件数量
+    WATCH_HASH_CONCURRENCY: int = 2  # 同时计算文件指纹的数量
+    WATCH_CLOSE_WRITE_ENABLED: bool = True  # Linux 下以 inotify 关闭写入事件判断文件写入完成，收到事件立即处理
+    WATCH_COMPLETE_FALLBACK_SECONDS: float = 30.0  # 新文件未收到关闭写入事件时，重新检查的间隔
+    WATCH_CLOSE_WRITE_MAX_WAIT: float = Field(
+        default=3600.0,
+        description="收到创建事件后等待关闭写入事件的最长秒数，超过后（视为事件丢失）才按修改时间和打开的写入句柄判断完成"
+    )
+    WATCH_STABLE_SECONDS: float = 3.0  # 轮询兜底：文件超过该秒数未修改视为写入完成
+    WATCH_OPEN_HANDLE_CHECK: bool = False  # 轮询兜底时额外检查是否仍有进程以写入方式打开文件（/proc）
+    SCAN_WALK_WORKERS: int = 8  # 遍历监控目录的并行线程数（NFS 等高延迟存储上并行列出目录）
+    SCAN_MAX_IOPS: int = 0  # 扫描时每秒目录列出/stat 次数上限，0 表示不限制
+    SCAN_MAX_BYTES_PER_SECOND: int = 0  # 扫描时计算指纹每秒读取字节数上限，0 表示不限制
+    
+    # 文件系统/数据库对账配置 - 分块处理，每个任务处理若干块后提交续跑任务，不长时间占用worker
+    RECONCILE_CHUNK_SIZE: int = 500  # 每块处理的记录数（每块提交一次）
+    RECONCILE_CHUNKS_PER_TASK: int = 20  # 单个任务处理的块数
+    RECONCILE_REPORT_SAMPLES: int = 50  # 报告中每类列出的示例路径数量
+    LIBRARY_SNAPSHOT_SYNC_SECONDS: float = 2.0  # 列表请求同步数据库状态变化的最短间隔
+    LIBRARY_SNAPSHOT_REFRESH_SECONDS: int = 60  # 未开启文件监控时，快照超过该秒数后在后台重建
     
     class Config:
         env_file = ".env"
@@ -77,4 +255,6 @@ settings = Settings()
 os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
 os.makedirs(settings.VIDEO_DIR, exist_ok=True)
 os.makedirs(settings.AUDIO_DIR, exist_ok=True)
-os.makedirs(settings.THUMBNAIL_DIR, exist_ok=True)
\ No newline at end of file
+os.makedirs(settings.THUMBNAIL_DIR, exist_ok=True)
+if settings.AUDIO_CACHE_ENABLED:
+    os.makedirs(settings.AUDIO_CACHE_DIR, exist_ok=True)
\ No newline at end of file
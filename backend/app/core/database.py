@@ -29,7 +29,7 @@ class Video(Base):
     duration = Column(Integer)  # 秒
     file_size = Column(Integer)  # 字节
     local_path = Column(String(300))
-    file_fingerprint = Column(String(64), unique=True, index=True)  # SHA256哈希值
+    file_fingerprint = Column(String(64), unique=True, index=True)  # 内容指纹：抽样SHA256，抽样碰撞时为完整SHA256
     status = Column(String(20), default="pending", index=True)
     retry_count = Column(Integer, default=0)  # 重试次数，用于队列重试机制
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -40,6 +40,70 @@ class Video(Base):
     learning_record = relationship("LearningRecord", back_populates="video", uselist=False)
     tasks = relationship("Task", back_populates="video")
 
+class ScanDirectory(Base):
+    __tablename__ = "scan_directories"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    path = Column(String(1000), unique=True, nullable=False, index=True)
+    parent = Column(String(1000), index=True)  # 父目录路径，扫描根目录为空
+    mtime = Column(Float)  # 上次扫描时的目录 mtime，未变化时不再列出目录内容
+    last_scanned = Column(DateTime, default=datetime.utcnow)
+
+class ScanIndexEntry(Base):
+    __tablename__ = "scan_index"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    path = Column(String(1000), unique=True, nullable=False, index=True)
+    directory = Column(String(1000), nullable=False, index=True)
+    inode = Column(Integer, index=True)  # 用于识别移动/重命名的文件
+    size = Column(Integer)
+    mtime = Column(Float)
+    fingerprint = Column(String(64), index=True)
+    video_id = Column(Integer, ForeignKey("videos.id"), index=True)
+    processed = Column(Boolean, default=False, index=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class ReconciliationRun(Base):
+    __tablename__ = "reconciliation_runs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    dry_run = Column(Boolean, default=True)  # 只生成报告，不修改视频记录
+    status = Column(String(20), default="pending", index=True)  # pending, running, completed, failed
+    phase = Column(String(20))  # scan, new_files, videos
+    cursor = Column(Integer, default=0)  # 当前阶段已处理到的记录ID，分块续跑
+    report = Column(Text)  # JSON格式
+    error_message = Column(Text)
+    task_id = Column(String(50))
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = Column(DateTime)
+
+class FileContentHash(Base):
+    __tablename__ = "file_content_hashes"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    video_id = Column(Integer, ForeignKey("videos.id"), unique=True, nullable=False, index=True)
+    full_fingerprint = Column(String(64), nullable=False, index=True)  # 完整SHA256，抽样指纹相同时才计算
+    file_size = Column(Integer)
+    computed_at = Column(DateTime, default=datetime.utcnow)
+
+class VideoMediaInfo(Base):
+    __tablename__ = "video_media_info"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    video_id = Column(Integer, ForeignKey("videos.id"), unique=True, nullable=False, index=True)
+    container = Column(String(50))  # 容器格式
+    duration = Column(Float)  # 秒
+    bit_rate = Column(Integer)
+    audio_codec = Column(String(50))
+    sample_rate = Column(Integer)
+    channels = Column(Integer)
+    video_codec = Column(String(50))
+    width = Column(Integer)
+    height = Column(Integer)
+    fps = Column(Float)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 class Transcript(Base):
     __tablename__ = "transcripts"
     
@@ -60,6 +124,102 @@ class Transcript(Base):
     # 关系
     video = relationship("Video", back_populates="transcript")
 
+class TranscriptPreview(Base):
+    __tablename__ = "transcript_previews"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    video_id = Column(Integer, ForeignKey("videos.id"), unique=True, nullable=False, index=True)
+    preview_seconds = Column(Float)  # 预览覆盖的开头时长（秒）
+    original_text = Column(Text)
+    summary = Column(Text)
+    tags = Column(String(200))
+    language = Column(String(10), default="zh")
+    confidence_score = Column(Float)
+    processing_time = Column(Float)  # 秒
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class TranscriptSegment(Base):
+    __tablename__ = "transcript_segments"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    video_id = Column(Integer, ForeignKey("videos.id"), nullable=False, index=True)
+    segment_index = Column(Integer, nullable=False)  # 片段序号，从0开始
+    start = Column(Float, nullable=False)  # 秒
+    end = Column(Float, nullable=False)  # 秒
+    text = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class TranscriptQualityFlag(Base):
+    __tablename__ = "transcript_quality_flags"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    video_id = Column(Integer, ForeignKey("videos.id"), nullable=False, index=True)
+    kind = Column(String(20), nullable=False)  # repeat / compression / no_speech
+    start = Column(Float)  # 坏区起始时间（秒）
+    end = Column(Float)  # 检测到循环时的解码位置（秒）
+    detail = Column(String(200))
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class TranscriptionCheckpoint(Base):
+    __tablename__ = "transcription_checkpoints"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    video_id = Column(Integer, ForeignKey("videos.id"), unique=True, nullable=False, index=True)
+    resume_offset = Column(Float, default=0.0)  # 最后一个已落库片段的结束时间（秒）
+    segment_count = Column(Integer, default=0)  # 已落库片段数量
+    model_name = Column(String(100))  # 生成这些片段的模型，换模型后不续传
+    file_size = Column(Integer)  # 文件大小，文件变化后不续传
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class TranscriptionStats(Base):
+    __tablename__ = "transcription_stats"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    video_id = Column(Integer, ForeignKey("videos.id"), unique=True, nullable=False, index=True)
+    audio_seconds = Column(Float)  # 音频总时长（秒）
+    speech_seconds = Column(Float)  # VAD 检测到的语音时长（秒），实际送入模型的时长
+    speech_ratio = Column(Float)  # 语音占比，1 - speech_ratio 即节省的推理量
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class CascadeStats(Base):
+    __tablename__ = "cascade_stats"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    video_id = Column(Integer, ForeignKey("videos.id"), unique=True, nullable=False, index=True)
+    draft_model = Column(String(100))  # 草稿模型
+    refine_model = Column(String(100))  # 复核模型
+    audio_seconds = Column(Float)  # 草稿模型转录的音频时长（秒）
+    refined_audio_seconds = Column(Float)  # 交给大模型复核的音频时长（秒）
+    draft_segments = Column(Integer)
+    low_confidence_segments = Column(Integer)
+    draft_inference_seconds = Column(Float)  # 草稿推理耗时
+    refine_inference_seconds = Column(Float)  # 复核推理耗时
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class TranscriptionCacheEntry(Base):
+    __tablename__ = "transcription_cache"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    cache_key = Column(String(64), unique=True, nullable=False, index=True)  # 指纹+模型+参数的SHA256
+    file_fingerprint = Column(String(64), nullable=False, index=True)
+    model_name = Column(String(100))
+    compute_type = Column(String(20))
+    language = Column(String(10))
+    decode_options = Column(Text)  # JSON格式
+    result = Column(Text, nullable=False)  # JSON格式的转录结果
+    size_bytes = Column(Integer, default=0)
+    hit_count = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_accessed_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+class TranscriptionCacheStats(Base):
+    __tablename__ = "transcription_cache_stats"
+    
+    id = Column(Integer, primary_key=True)  # 单行统计，id固定为1
+    hits = Column(Integer, default=0)
+    misses = Column(Integer, default=0)
+    evictions = Column(Integer, default=0)
+
 class LearningRecord(Base):
     __tablename__ = "learning_records"
     
@@ -1,11 +1,14 @@
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 import uvicorn
 import logging
 import sys
 from pathlib import Path
 from app.core.database import init_db
+from app.core.config import settings
 from app.api import videos, transcripts, learning, local_videos, system, system_status, gpu_monitor, system_monitor
 
 # 配置详细日志
@@ -53,6 +56,25 @@ async def lifespan(app: FastAPI):
     logging.info("📋 视频处理已切换到Celery队列模式")
     logging.info("🔧 可通过API手动提交视频处理任务")
     
+    # 后台建立监控目录的文件名索引和视频库快照，本地视频接口查找文件和列表时使用
+    from app.services.library_snapshot import library_snapshot
+    asyncio.get_running_loop().run_in_executor(None, library_snapshot.build, settings.LOCAL_VIDEO_DIR)
+    
+    # 升级前保存的完整指纹在后台分批改为抽样指纹（已完成时不再提交）
+    from app.tasks.video_tasks import start_fingerprint_backfill
+    if start_fingerprint_backfill():
+        logging.info("🔁 已提交抽样指纹回填任务")
+    
+    # 跟随 /system/models/swap 发布的默认模型（API 重启后与 worker 使用同一模型）
+    from app.services.ai_service import ai_service
+    from app.services.model_selection import sync_default_model
+    sync_default_model(ai_service)
+    
+    # 可选：后台预加载并预热模型，不阻塞服务启动，就绪状态见 /ready
+    if settings.MODEL_WARMUP_ENABLED:
+        asyncio.get_running_loop().run_in_executor(None, ai_service.warm_up)
+        logging.info("🔥 已开始后台预热模型")
+    
     yield
     
     # 关闭时清理资源
@@ -92,5 +114,17 @@ async def root():
 async def health_check():
     return {"status": "ok"}
 
+@app.get("/ready")
+async def readiness_check():
+    """就绪检查：启用模型预热时，模型预热完成前返回503"""
+    if not settings.MODEL_WARMUP_ENABLED:
+        return {"status": "ready", "warmup_enabled": False}
+    
+    from app.services.ai_service import ai_service
+    readiness = ai_service.readiness
+    if not readiness["warmed"]:
+        return JSONResponse(status_code=503, content={"status": "warming", **readiness})
+    return {"status": "ready", **readiness}
+
 if __name__ == "__main__":
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
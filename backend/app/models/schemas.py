@@ -82,6 +82,21 @@ class TranscriptResponse(TranscriptBase):
     class Config:
         from_attributes = True
 
+class TranscriptSegmentResponse(BaseModel):
+    segment_index: int
+    start: float
+    end: float
+    text: str
+    
+    class Config:
+        from_attributes = True
+
+class TranscriptRangeRequest(BaseModel):
+    start: float = Field(..., ge=0, description="起始时间（秒）")
+    end: float = Field(..., gt=0, description="结束时间（秒）")
+    patch: bool = False  # 是否用转录结果替换已有字幕中对应时间范围的片段
+    model_name: Optional[str] = None
+
 # 学习记录模型
 class LearningRecordBase(BaseModel):
     learning_status: LearningStatus = LearningStatus.TODO
@@ -2,19 +2,32 @@ import asyncio
 import os
 import re
 import platform
-from typing import Dict, Tuple, Optional, List
+from typing import Callable, Dict, Iterator, Tuple, Optional, List
 from pathlib import Path
 import subprocess
 import json
-from faster_whisper import WhisperModel
+import time
+import traceback
+import numpy as np
+from faster_whisper import WhisperModel, decode_audio
 from app.core.config import settings
 from app.utils.system_monitor import system_monitor
+from app.utils.audio import load_audio
+from app.utils.vad import SpeechTimeline, build_speech_audio, detect_speech_intervals, is_silent
+from app.utils.loop_detector import LoopGuard
+from app.services.model_selection import validate_model_name
+from app.services.transcription_cache import transcription_cache, make_cache_key
+from app.services.audio_cache import audio_cache
+from app.services.model_registry import model_registry
 import logging
 
 # 本地转录专用，移除第三方API依赖
 
 logger = logging.getLogger(__name__)
 
+# Whisper模型要求的音频采样率
+SAMPLE_RATE = 16000
+
 # 信号量将在运行时创建，避免事件循环绑定问题
 transcription_semaphore = None
 
@@ -31,6 +44,14 @@ class AITranscriptionService:
         self.current_mode = None
         self.model_name = settings.WHISPER_MODEL  # 使用配置的模型
         self.environment = self._detect_environment()
+        # 模型就绪状态（启用预热时由 warm_up 更新）
+        self.readiness = {
+            "loaded": False,
+            "warmed": False,
+            "load_seconds": None,
+            "warmup_seconds": None,
+            "error": None
+        }
         # 不在初始化时加载模型，采用懒加载模式
         logger.info(f"🔧 AI转录服务初始化 - 环境: {self.environment}, 模型: {self.model_name}")
     
@@ -62,37 +83,126 @@ class AITranscriptionService:
         
         return "local"  # 只支持本地转录
     
-    def _ensure_model_loaded(self):
-        """确保模型已加载（懒加载）"""
-        if self.model is None:
-            try:
-                # 智能选择设备和计算类型
-                device = self._choose_device()
-                compute_type = self._choose_compute_type()
-                
-                logger.info(f"🤖 正在加载Whisper模型: {settings.WHISPER_MODEL}")
-                logger.info(f"🎯 设备: {device}, 计算类型: {compute_type}")
-                
-                # 支持两种加载方式：模型名称 或 本地路径
-                model_path_or_name = self._get_model_path_or_name()
-                
-                self.model = WhisperModel(
-                    model_path_or_name,
-                    device=device,
-                    compute_type=compute_type,
-                    num_workers=getattr(settings, 'WHISPER_NUM_WORKERS', 1),
-                    cpu_threads=getattr(settings, 'WHISPER_THREADS', 2)
-                )
-                logger.info(f"✅ Whisper模型 {settings.WHISPER_MODEL} 加载成功")
-            except Exception as e:
-                logger.error(f"❌ Whisper模型加载失败: {e}")
-                raise Exception(f"模型未安装或损坏，请先手动下载模型: {e}")
-        return self.model
+    def _ensure_model_loaded(self, model_name: Optional[str] = None, compute_type: Optional[str] = None):
+        """确保模型已加载（懒加载），返回模型实例
+        
+        模型实例由进程内的模型注册表管理，可同时驻留多个模型；model_name 为空时使用默认模型，
+        compute_type 为空时使用当前设备的默认计算类型。
+        启用模型服务且服务可用时使用远程模型代理，不在本进程加载模型（计算类型由模型服务决定）
+        """
+        return self._acquire_model(model_name, compute_type)[0]
+    
+    def _acquire_model(self, model_name: Optional[str] = None,
+                       compute_type: Optional[str] = None) -> Tuple[object, Optional[Tuple[str, str, str]]]:
+        """获取模型实例及实际提供服务的模型键
+        
+        热切换期间新模型加载完成前由旧模型服务，返回的键是旧模型的键（结果缓存和检查点按它标记）；
+        远程模型代理返回 None，实际使用的模型由模型服务在转录响应中报告
+        """
+        from app.services.model_server import RemoteWhisperModel
+        
+        if settings.MODEL_SERVER_ENABLED and (self.model is None or isinstance(self.model, RemoteWhisperModel)):
+            if self.model is None:
+                remote_model = RemoteWhisperModel(self.model_name)
+                if remote_model.is_available():
+                    logger.info(f"🔌 使用常驻模型服务: {settings.MODEL_SERVER_SOCKET}")
+                    self.model = remote_model
+                else:
+                    logger.warning("⚠️ 模型服务不可用，回退到进程内加载模型")
+            if self.model is not None:
+                if model_name and model_name != self.model_name:
+                    return RemoteWhisperModel(model_name), None
+                return self.model, None
+        
+        try:
+            model, served_key = model_registry.get_with_key(
+                self._model_key(model_name, compute_type), self._load_whisper_model
+            )
+        except Exception as e:
+            logger.error(f"❌ Whisper模型加载失败: {e}")
+            raise Exception(f"模型未安装或损坏，请先手动下载模型: {e}")
+        
+        if (not model_name or model_name == self.model_name) and not compute_type:
+            self.model = model
+        return model, served_key
+    
+    def warm_up(self) -> Dict:
+        """预加载默认模型并用一段合成音频做一次推理，提前完成首次推理的内存分配"""
+        started = time.time()
+        self.readiness.update(
+            model=self.model_name,
+            device=self._choose_device(),
+            compute_type=self._choose_compute_type(),
+            error=None
+        )
+        try:
+            model = self._ensure_model_loaded()
+            self.readiness.update(loaded=True, load_seconds=round(time.time() - started, 2))
+            
+            # 低幅度正弦波，足以走完特征提取、编码和解码的完整路径
+            samples = int(settings.MODEL_WARMUP_SECONDS * SAMPLE_RATE)
+            audio = (0.05 * np.sin(2 * np.pi * 440 * np.arange(samples) / SAMPLE_RATE)).astype(np.float32)
+            
+            warmup_started = time.time()
+            segments, _ = model.transcribe(audio, language="zh", task="transcribe", beam_size=1)
+            for _ in segments:
+                pass
+            self.readiness.update(warmed=True, warmup_seconds=round(time.time() - warmup_started, 2))
+            logger.info(
+                f"🔥 模型预热完成: {self.model_name}, 加载 {self.readiness['load_seconds']}秒, "
+                f"预热推理 {self.readiness['warmup_seconds']}秒"
+            )
+        except Exception as e:
+            self.readiness["error"] = str(e)
+            logger.error(f"❌ 模型预热失败: {e}")
+        return dict(self.readiness)
+    
+    def _model_key(self, model_name: Optional[str] = None, compute_type: Optional[str] = None) -> Tuple[str, str, str]:
+        """模型注册表的键: (模型名, 设备, 计算类型)"""
+        return (model_name or self.model_name, self._choose_device(), compute_type or self._choose_compute_type())
+    
+    def _load_whisper_model(self, key: Tuple[str, str, str]) -> WhisperModel:
+        """加载模型实例（由模型注册表调用）"""
+        model_name, device, compute_type = key
+        validate_model_name(model_name)
+        logger.info(f"🤖 正在加载Whisper模型: {model_name}")
+        logger.info(f"🎯 设备: {device}, 计算类型: {compute_type}")
+        
+        # 支持两种加载方式：模型名称 或 本地路径
+        model = WhisperModel(
+            self._get_model_path_or_name(model_name),
+            device=device,
+            compute_type=compute_type,
+            num_workers=getattr(settings, 'WHISPER_NUM_WORKERS', 1),
+            cpu_threads=getattr(settings, 'WHISPER_THREADS', 2)
+        )
+        logger.info(f"✅ Whisper模型 {model_name} 加载成功")
+        return model
     
-    def _get_model_path_or_name(self) -> str:
+    def swap_model_async(self, previous_key: Tuple[str, str, str], model_name: Optional[str] = None) -> bool:
+        """按当前配置在后台加载新模型，加载完成前旧模型继续服务，完成后卸载旧模型
+        
+        返回是否发起了切换（配置未变化或新模型已加载时返回 False）
+        """
+        from app.services.model_server import RemoteWhisperModel
+        
+        if isinstance(self.model, RemoteWhisperModel):
+            # 模型由模型服务持有（由模型服务在后台加载），本进程只把代理切换到新模型名
+            if self.model.model_name != (model_name or self.model_name):
+                self.model = RemoteWhisperModel(model_name or self.model_name)
+            return False
+        
+        new_key = self._model_key(model_name)
+        if new_key == previous_key:
+            return False
+        return model_registry.swap_async(previous_key, new_key, self._load_whisper_model)
+    
+    def _get_model_path_or_name(self, model_name: Optional[str] = None) -> str:
         """获取模型路径或名称"""
+        model_name = model_name or settings.WHISPER_MODEL
+        
         # 如果是large模型，强制使用本地路径加载large-v3
-        if settings.WHISPER_MODEL == "large":
+        if model_name == "large":
             local_model_path = "/root/.cache/huggingface/hub/models--Systran--faster-whisper-large-v3"
             if os.path.exists(local_model_path):
                 logger.info(f"🎯 使用本地large-v3模型: {local_model_path}")
@@ -103,7 +213,7 @@ class AITranscriptionService:
                 raise FileNotFoundError(error_msg)
         
         # 其他情况直接使用模型名称
-        return settings.WHISPER_MODEL
+        return model_name
     
     def _choose_device(self) -> str:
         """智能选择计算设备"""
@@ -224,6 +334,11 @@ class AITranscriptionService:
             # 确保音频目录存在
             audio_path.parent.mkdir(parents=True, exist_ok=True)
             
+            # 已提取过且比视频新的音频直接复用，不再重新解码
+            if audio_path.exists() and audio_path.stat().st_mtime >= video_file.stat().st_mtime:
+                logger.info(f"⚡ 复用已提取的音频: {audio_path.name}")
+                return str(audio_path)
+            
             # FFmpeg 提取音频
             cmd = [
                 "ffmpeg",
@@ -250,31 +365,24 @@ class AITranscriptionService:
             logger.error(f"提取音频失败: {e}")
             raise
     
-    async def transcribe_audio(self, audio_path: str) -> Dict:
-        """转录音频为文字（带并发控制）"""
+    async def transcribe_audio(self, audio_path: str, on_segment: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """转录音频为文字（带并发控制）
+        
+        on_segment: 每解码出一个片段即回调（用于流式落库），此时结果中不保留片段列表
+        """
         semaphore = get_transcription_semaphore()
         async with semaphore:  # 控制并发数量
             try:
                 logger.info(f"开始转录音频: {audio_path} (当前可用槽位: {semaphore._value})")
                 
-                if not self.model:
-                    self._ensure_model_loaded()
+                model = self._ensure_model_loaded()
                 
                 # 执行转录
-                segments, info = self.model.transcribe(audio_path)
+                segments, info = model.transcribe(audio_path)
                 
                 # 收集转录结果
-                transcript_segments = []
-                full_text = ""
-                
-                for segment in segments:
-                    segment_data = {
-                        "start": segment.start,
-                        "end": segment.end,
-                        "text": segment.text.strip()
-                    }
-                    transcript_segments.append(segment_data)
-                    full_text += segment.text.strip() + " "
+                transcript_segments, text_parts = self._consume_segments(segments, on_segment)
+                full_text = " ".join(text_parts)
                 
                 # 清理文本
                 cleaned_text = self._clean_text(full_text)
@@ -283,7 +391,7 @@ class AITranscriptionService:
                 summary = self._generate_summary(cleaned_text)
                 tags = self._extract_tags(cleaned_text)
                 
-                logger.info(f"转录完成，共转录 {len(transcript_segments)} 个片段 (释放槽位)")
+                logger.info(f"转录完成，共转录 {len(text_parts)} 个片段 (释放槽位)")
                 
                 return {
                     "original_text": full_text.strip(),
@@ -292,7 +400,8 @@ class AITranscriptionService:
                     "tags": ", ".join(tags),
                     "language": info.language,
                     "confidence_score": info.language_probability,
-                    "segments": transcript_segments
+                    "segments": transcript_segments,
+                    "segment_count": len(text_parts)
                 }
                 
             except Exception as e:
@@ -534,8 +643,126 @@ class AITranscriptionService:
         except Exception as e:
             logger.warning(f"清理临时文件失败: {e}")
     
-    async def transcribe_video(self, video_path: str) -> Dict:
-        """智能转录视频文件（带并发控制和负载监控）"""
+    async def transcribe_video(self, video_path: str, on_segment: Optional[Callable[[Dict], None]] = None,
+                               start_offset: float = 0.0, prefix_texts: Optional[List[str]] = None,
+                               fingerprint: Optional[str] = None, model_name: Optional[str] = None,
+                               on_model: Optional[Callable[[str], None]] = None) -> Dict:
+        """智能转录视频文件（带并发控制和负载监控）
+        
+        on_segment: 每解码出一个片段即回调（用于流式落库），此时结果中不保留片段列表
+        start_offset: 从该时间点（秒）继续转录，音频在送入模型前已定位裁剪，片段时间戳仍为原视频时间轴
+        prefix_texts: 续传时此前已完成片段的文本，会拼接到最终结果之前
+        fingerprint: 文件内容指纹，提供时先查询转录结果缓存，命中则直接返回
+        model_name: 本次转录使用的模型，为空时使用默认模型
+        on_model: 确定实际使用的模型后、产出第一个片段前回调（热切换期间可能是旧模型），用于标记续传检查点；
+                  结果中的 model_name 同样是实际使用的模型
+        """
+        served: Dict = {}
+        
+        def report_model(served_model: str, compute_type: Optional[str] = None):
+            served.update(model_name=served_model, compute_type=compute_type or self._choose_compute_type())
+            if on_model:
+                on_model(served_model)
+        
+        cache_key = None
+        cached_segments = None
+        if fingerprint and settings.TRANSCRIPTION_CACHE_ENABLED:
+            cache_key = self._result_cache_key(fingerprint, model_name)
+            cached = transcription_cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"⚡ 命中转录结果缓存: {os.path.basename(video_path)}")
+                cached["cache_hit"] = True
+                return cached
+            
+            # 续传结果不完整，不写入缓存
+            if start_offset > 0:
+                cache_key = None
+            elif on_segment:
+                # 流式模式下结果里不保留片段，另存紧凑的片段用于写入缓存
+                cached_segments = []
+                stream_callback = on_segment
+                
+                def on_segment(segment_data: Dict):
+                    cached_segments.append((segment_data["start"], segment_data["end"], segment_data["text"]))
+                    stream_callback(segment_data)
+        
+        result = await self._transcribe_video_uncached(
+            video_path, on_segment, start_offset, prefix_texts, fingerprint, model_name, report_model
+        )
+        if served:
+            result["model_name"] = served["model_name"]
+        
+        if cache_key and result.get("tags") != "转录失败":
+            cache_result = dict(result)
+            if cached_segments is not None:
+                cache_result["segments"] = [
+                    {"start": start, "end": end, "text": text} for start, end, text in cached_segments
+                ]
+            # 按实际使用的模型写入缓存（热切换期间旧模型的结果不能记在新模型名下）
+            served_model = served.get("model_name", model_name or self.model_name)
+            served_compute_type = served.get("compute_type", self._choose_compute_type())
+            transcription_cache.put(
+                self._result_cache_key(fingerprint, served_model, compute_type=served_compute_type),
+                fingerprint, served_model, served_compute_type, "zh", self._decode_options(), cache_result
+            )
+        
+        return result
+    
+    def _decode_options(self) -> Dict:
+        """影响转录结果的解码参数（参与结果缓存键的计算）"""
+        options = {"task": "transcribe"}
+        if settings.VAD_ENABLED:
+            options["vad"] = {
+                "threshold_db": settings.VAD_THRESHOLD_DB,
+                "min_speech_ms": settings.VAD_MIN_SPEECH_MS,
+                "min_silence_ms": settings.VAD_MIN_SILENCE_MS,
+                "pad_ms": settings.VAD_PAD_MS,
+                "max_speech_ratio": settings.VAD_MAX_SPEECH_RATIO,
+                "min_speech_ratio": settings.VAD_MIN_SPEECH_RATIO,
+                "silence_floor_db": settings.VAD_SILENCE_FLOOR_DB
+            }
+        if settings.LOOP_GUARD_ENABLED:
+            options["loop_guard"] = {
+                "window": settings.LOOP_GUARD_WINDOW,
+                "max_repeats": settings.LOOP_GUARD_MAX_REPEATS,
+                "compression_ratio": settings.LOOP_GUARD_COMPRESSION_RATIO,
+                "no_speech_streak": settings.LOOP_GUARD_NO_SPEECH_STREAK,
+                "no_speech_prob": settings.LOOP_GUARD_NO_SPEECH_PROB,
+                "skip_seconds": settings.LOOP_GUARD_SKIP_SECONDS
+            }
+        if settings.CASCADE_ENABLED:
+            options["cascade"] = {
+                "draft_model": settings.CASCADE_DRAFT_MODEL,
+                "draft_compute_type": settings.CASCADE_DRAFT_COMPUTE_TYPE,
+                "logprob_threshold": settings.CASCADE_LOGPROB_THRESHOLD,
+                "no_speech_threshold": settings.CASCADE_NO_SPEECH_THRESHOLD,
+                "compression_ratio_threshold": settings.CASCADE_COMPRESSION_RATIO_THRESHOLD,
+                "span_padding": settings.CASCADE_SPAN_PADDING,
+                "max_gap": settings.CASCADE_MAX_GAP,
+                "max_refine_ratio": settings.CASCADE_MAX_REFINE_RATIO
+            }
+        if settings.LONG_VIDEO_MODE_ENABLED:
+            options["long_video"] = {
+                "min_seconds": settings.LONG_VIDEO_MIN_SECONDS,
+                "chunk_seconds": settings.LONG_VIDEO_CHUNK_SECONDS,
+                "overlap_seconds": settings.LONG_VIDEO_OVERLAP_SECONDS
+            }
+        return options
+    
+    def _result_cache_key(self, fingerprint: str, model_name: Optional[str] = None, compute_type: Optional[str] = None,
+                          **extra_options) -> str:
+        """计算转录结果缓存键"""
+        options = self._decode_options()
+        options.update(extra_options)
+        return make_cache_key(
+            fingerprint, model_name or self.model_name, compute_type or self._choose_compute_type(), "zh", options
+        )
+    
+    async def _transcribe_video_uncached(self, video_path: str, on_segment: Optional[Callable[[Dict], None]] = None,
+                                         start_offset: float = 0.0, prefix_texts: Optional[List[str]] = None,
+                                         fingerprint: Optional[str] = None, model_name: Optional[str] = None,
+                                         on_model: Optional[Callable[..., None]] = None) -> Dict:
+        """转录视频文件（不经过结果缓存）"""
         semaphore = get_transcription_semaphore()
         async with semaphore:  # 控制并发数量
             try:
@@ -553,7 +780,9 @@ class AITranscriptionService:
                 logger.info(f"🏗️ 运行环境: {self.environment}")
                 
                 logger.info("💻 === 使用本地Whisper模型转录 ===")
-                result = await self._transcribe_with_local_model(video_path)
+                result = await self._transcribe_with_local_model(
+                    video_path, on_segment, start_offset, prefix_texts, fingerprint, model_name, on_model
+                )
                 logger.info("✅ === 本地转录完成 ===")
                 
                 # 转录后再次记录系统状态
@@ -577,26 +806,106 @@ class AITranscriptionService:
                 }
     
     
-    async def _transcribe_with_local_model(self, video_path: str) -> Dict:
-        """使用本地模型转录"""
+    async def _transcribe_with_local_model(self, video_path: str, on_segment: Optional[Callable[[Dict], None]] = None,
+                                           start_offset: float = 0.0, prefix_texts: Optional[List[str]] = None,
+                                           fingerprint: Optional[str] = None, model_name: Optional[str] = None,
+                                           on_model: Optional[Callable[..., None]] = None) -> Dict:
+        """使用本地模型转录
+        
+        on_model(模型名, 计算类型): 确定实际提供服务的模型后回调（模型服务的模型在响应中报告）
+        """
+        on_model = on_model or (lambda *args: None)
         try:
-            # 确保模型已加载
-            self._ensure_model_loaded()
+            # 确保模型已加载（从模型注册表获取，支持按任务指定模型）
+            model, served_key = self._acquire_model(model_name)
+            # 本进程的模型：注册表已确定实际提供服务的模型（热切换期间可能仍是旧模型）
+            served_model = served_key[0] if served_key else model_name or self.model_name
+            if served_key:
+                on_model(served_key[0], served_key[2])
             
             # 添加详细调试信息
             logger.info(f"🎥 开始处理视频: {video_path}")
-            logger.info(f"🤖 模型信息: {type(self.model).__name__}")
+            logger.info(f"🤖 模型信息: {served_model} ({type(model).__name__})")
             logger.info(f"💻 设备: {self._choose_device()}")
             logger.info(f"🔢 计算类型: {self._choose_compute_type()}")
             
             # faster-whisper 可以直接处理视频文件
+            media = video_path
+            transcribe_options = {}
+            remote = self._uses_model_server(model)
+            
+            if remote:
+                # 模型服务自行通过解码音频缓存读取音频，只传文件路径和续传位置
+                transcribe_options = {"fingerprint": fingerprint, "start_offset": start_offset}
+                if start_offset > 0:
+                    logger.info(f"⏩ 从检查点 {start_offset:.2f}秒 处继续转录")
+            elif settings.AUDIO_CACHE_ENABLED:
+                # 解码音频缓存：内存映射读取，续传时直接切片，都不复制数据
+                media = audio_cache.load(video_path, fingerprint)
+                if start_offset > 0:
+                    logger.info(f"⏩ 从检查点 {start_offset:.2f}秒 处继续转录")
+                    media = media[int(start_offset * SAMPLE_RATE):]
+            elif start_offset > 0:
+                # 续传：用ffmpeg定位到检查点后再解码，只把剩余音频送入模型
+                logger.info(f"⏩ 从检查点 {start_offset:.2f}秒 处继续转录")
+                media = load_audio(video_path, start=start_offset)
+            
+            # VAD 预处理：只把语音区间送入模型，片段时间戳再映射回原时间轴
+            timeline = None
+            speech_stats = {}
+            if settings.VAD_ENABLED and not remote:
+                if isinstance(media, str):
+                    media = decode_audio(video_path, sampling_rate=SAMPLE_RATE)
+                media, timeline, speech_stats = self._trim_silence(media)
+                if media.shape[0] == 0:
+                    logger.info("🔇 音频完全静音，跳过模型推理")
+                    result = self._build_transcript_result([], "zh", 0.0, list(prefix_texts or []))
+                    result.update(speech_stats)
+                    return result
+            
+            # 两级级联：小模型转录全部音频，大模型只复核低置信度区间（指定模型的任务不走级联）
+            if settings.CASCADE_ENABLED and not model_name:
+                if isinstance(media, str):
+                    # 复核时需要按时间切片，先取得解码后的音频
+                    if settings.AUDIO_CACHE_ENABLED:
+                        media = audio_cache.load(video_path, fingerprint)
+                    else:
+                        media = decode_audio(video_path, sampling_rate=SAMPLE_RATE)
+                    if start_offset > 0:
+                        media = media[int(start_offset * SAMPLE_RATE):]
+                stitched, language, confidence, cascade_stats = self._transcribe_cascade(media, model, served_model)
+                if not served_key:
+                    on_model(served_model)
+                transcript_segments, text_parts = self._consume_segments(stitched, on_segment, start_offset, timeline)
+                if prefix_texts:
+                    text_parts = list(prefix_texts) + text_parts
+                result = self._build_transcript_result(transcript_segments, language, confidence, text_parts)
+                result.update(speech_stats)
+                result["cascade"] = cascade_stats
+                return result
+            
+            # 长视频模式：超过阈值的视频在静音处分块，由共享模型的线程池并行转录
+            if settings.LONG_VIDEO_MODE_ENABLED and not remote:
+                audio = media if not isinstance(media, str) else decode_audio(video_path, sampling_rate=SAMPLE_RATE)
+                duration = audio.shape[0] / SAMPLE_RATE
+                if duration >= settings.LONG_VIDEO_MIN_SECONDS:
+                    logger.info(f"🧩 视频时长 {duration:.0f}秒，使用分块并行转录")
+                    # 分块转录单独加载 int8 模型，与当前提供服务的模型保持一致
+                    result = self._transcribe_long_audio(
+                        audio, on_segment, start_offset, prefix_texts, timeline, served_model
+                    )
+                    result.update(speech_stats)
+                    return result
+                media = audio
+            
             logger.info("正在使用本地Whisper模型转录视频...")
             
             try:
-                segments, info = self.model.transcribe(
-                    video_path,
+                segments, info = model.transcribe(
+                    media,
                     language="zh",  # 指定为中文
-                    task="transcribe"
+                    task="transcribe",
+                    **transcribe_options
                 )
                 logger.info(f"🎵 音频信息 - 语言: {info.language}, 置信度: {info.language_probability:.3f}")
                 logger.info(f"⏱️ 音频时长: {info.duration:.2f}秒")
@@ -617,63 +926,40 @@ class AITranscriptionService:
                 # 尝试不同参数
                 logger.info("🔄 尝试不同参数转录...")
                 try:
-                    segments, info = self.model.transcribe(
-                        video_path,
-                        task="transcribe"
+                    segments, info = model.transcribe(
+                        media,
+                        task="transcribe",
                         # 去掉语言指定，让模型自动检测
+                        **transcribe_options
                     )
                     logger.info("🎉 去掉语言指定后成功!")
                 except Exception as retry_error:
                     logger.error(f"🚫 重试仍然失败: {retry_error}")
                     raise transcribe_error  # 抛出原始错误
             
-            # 收集转录结果
-            transcript_segments = []
-            full_text = ""
+            if remote:
+                # 模型服务在响应中报告实际使用的模型（热切换期间可能仍是旧模型）
+                on_model(getattr(info, "model", None) or served_model, getattr(info, "compute_type", None))
             
-            for segment in segments:
-                segment_data = {
-                    "start": segment.start,
-                    "end": segment.end,
-                    "text": segment.text.strip()
-                }
-                transcript_segments.append(segment_data)
-                full_text += segment.text.strip() + " "
-            
-            if not full_text.strip():
-                logger.warning("转录结果为空，可能是视频没有音频或音频质量问题")
-                return {
-                    "original_text": "未检测到音频内容",
-                    "cleaned_text": "未检测到音频内容",
-                    "summary": "该视频可能没有音频内容或音频质量较差",
-                    "tags": "无音频",
-                    "language": "zh",
-                    "confidence_score": 0.0,
-                    "segments": []
-                }
-            
-            # 智能文本处理和分析
-            cleaned_text = self._clean_text(full_text)
-            formatted_text = self._format_text_for_display(cleaned_text)
-            summary = self._generate_summary(cleaned_text)
-            tags = self._extract_tags(cleaned_text)
-            smart_title = self._generate_smart_title(cleaned_text)
-            importance_score = self._calculate_importance_score(cleaned_text, tags)
+            # 循环检测：重复/无语音连串时停止解码，跳过坏区后继续
+            loop_guard = None
+            if settings.LOOP_GUARD_ENABLED:
+                loop_guard = self._new_loop_guard()
+                restart = self._loop_restarter(model, media, info.duration, video_path, fingerprint, start_offset)
+                segments = self._guard_segments(segments, loop_guard, restart)
             
-            logger.info(f"✅ 本地转录完成，共转录 {len(transcript_segments)} 个片段，重要性评分: {importance_score:.1f}")
+            # 收集转录结果（流式模式下片段边解码边落库）
+            transcript_segments, text_parts = self._consume_segments(segments, on_segment, start_offset, timeline)
+            if prefix_texts:
+                text_parts = list(prefix_texts) + text_parts
             
-            return {
-                "original_text": full_text.strip(),
-                "cleaned_text": cleaned_text,
-                "formatted_text": formatted_text,
-                "summary": summary,
-                "smart_title": smart_title,
-                "tags": ", ".join(tags),
-                "importance_score": importance_score,
-                "language": info.language,
-                "confidence_score": info.language_probability,
-                "segments": transcript_segments
-            }
+            result = self._build_transcript_result(
+                transcript_segments, info.language, info.language_probability, text_parts
+            )
+            result.update(speech_stats)
+            if loop_guard and loop_guard.events:
+                result["loop_events"] = self._map_loop_events(loop_guard.events, start_offset, timeline)
+            return result
                 
         except Exception as e:
             logger.error(f"🚫 转录视频失败: {e} (释放槽位)")
@@ -694,5 +980,422 @@ class AITranscriptionService:
                 "segments": []
             }
 
+    def _transcribe_long_audio(self, audio, on_segment: Optional[Callable[[Dict], None]] = None,
+                               start_offset: float = 0.0, prefix_texts: Optional[List[str]] = None,
+                               timeline: Optional[SpeechTimeline] = None, model_name: Optional[str] = None) -> Dict:
+        """长音频分块并行转录（CPU线程池共享一个int8模型），model_name 为空时使用默认模型"""
+        from app.services.chunked_transcriber import get_chunked_transcriber
+        
+        transcriber = get_chunked_transcriber(self._get_model_path_or_name(model_name or self.model_name))
+        stitched, language, confidence = transcriber.transcribe(audio, language="zh")
+        transcript_segments, text_parts = self._consume_segments(stitched, on_segment, start_offset, timeline)
+        if prefix_texts:
+            text_parts = list(prefix_texts) + text_parts
+        return self._build_transcript_result(transcript_segments, language, confidence, text_parts)
+    
+    def _transcribe_cascade(self, audio, refine_model=None,
+                            refine_model_name: Optional[str] = None) -> Tuple[List[Dict], str, float, Dict]:
+        """两级级联转录，返回 (片段列表, 语言, 语言置信度, 级联统计)
+        
+        refine_model: 已取得的复核模型（及其实际模型名），为空时在需要复核时才加载默认模型
+        """
+        from app.services.cascade_transcriber import CascadeTranscriber
+        
+        draft_compute_type = settings.CASCADE_DRAFT_COMPUTE_TYPE
+        draft_model = self._ensure_model_loaded(
+            settings.CASCADE_DRAFT_MODEL, None if draft_compute_type == "auto" else draft_compute_type
+        )
+        transcriber = CascadeTranscriber(
+            draft_model,
+            # 大模型只在存在低置信度片段时才加载
+            (lambda: refine_model) if refine_model is not None else (lambda: self._ensure_model_loaded()),
+            logprob_threshold=settings.CASCADE_LOGPROB_THRESHOLD,
+            no_speech_threshold=settings.CASCADE_NO_SPEECH_THRESHOLD,
+            compression_ratio_threshold=settings.CASCADE_COMPRESSION_RATIO_THRESHOLD,
+            span_padding=settings.CASCADE_SPAN_PADDING,
+            max_gap=settings.CASCADE_MAX_GAP,
+            max_refine_ratio=settings.CASCADE_MAX_REFINE_RATIO
+        )
+        segments, language, confidence, stats = transcriber.transcribe(audio, language="zh")
+        stats.update(draft_model=settings.CASCADE_DRAFT_MODEL, refine_model=refine_model_name or self.model_name)
+        return segments, language, confidence, stats
+    
+    def _uses_model_server(self, model=None) -> bool:
+        """当前是否通过常驻模型服务推理"""
+        from app.services.model_server import RemoteWhisperModel
+        
+        return isinstance(model if model is not None else self.model, RemoteWhisperModel)
+    
+    def infer_segments(self, audio) -> Tuple[List[Dict], str, float, Dict]:
+        """只执行模型推理（不做文本后处理），返回 (片段列表, 语言, 语言置信度, 语音统计)
+        
+        供流水线的推理阶段使用，解码和后处理由其他阶段完成
+        """
+        model = self._ensure_model_loaded()
+        
+        timeline = None
+        speech_stats = {}
+        if settings.VAD_ENABLED:
+            audio, timeline, speech_stats = self._trim_silence(audio)
+            if audio.shape[0] == 0:
+                return [], "zh", 0.0, speech_stats
+        
+        if settings.CASCADE_ENABLED:
+            stitched, language, confidence, cascade_stats = self._transcribe_cascade(audio)
+            transcript_segments, _ = self._consume_segments(stitched, timeline=timeline)
+            return transcript_segments, language, confidence, dict(speech_stats, cascade=cascade_stats)
+        
+        if (settings.LONG_VIDEO_MODE_ENABLED and not self._uses_model_server(model)
+                and audio.shape[0] / SAMPLE_RATE >= settings.LONG_VIDEO_MIN_SECONDS):
+            from app.services.chunked_transcriber import get_chunked_transcriber
+            
+            transcriber = get_chunked_transcriber(self._get_model_path_or_name(self.model_name))
+            stitched, language, confidence = transcriber.transcribe(audio, language="zh")
+            transcript_segments, _ = self._consume_segments(stitched, timeline=timeline)
+            return transcript_segments, language, confidence, speech_stats
+        
+        segments, info = model.transcribe(audio, language="zh", task="transcribe")
+        loop_guard = None
+        if settings.LOOP_GUARD_ENABLED:
+            loop_guard = self._new_loop_guard()
+            restart = self._loop_restarter(model, audio, audio.shape[0] / SAMPLE_RATE)
+            segments = self._guard_segments(segments, loop_guard, restart)
+        # 片段生成器是惰性的，消费的过程就是解码推理的过程
+        transcript_segments, _ = self._consume_segments(segments, timeline=timeline)
+        if loop_guard and loop_guard.events:
+            speech_stats = dict(speech_stats, loop_events=self._map_loop_events(loop_guard.events, 0.0, timeline))
+        return transcript_segments, info.language, info.language_probability, speech_stats
+    
+    def transcribe_preview(self, video_path: str, seconds: float, model_name: Optional[str] = None) -> Dict:
+        """只解码并转录视频开头的 seconds 秒，生成预览结果（含摘要和标签）"""
+        from app.services.model_server import PRIORITY_HIGH
+        
+        audio = load_audio(video_path, duration=seconds)
+        model = self._ensure_model_loaded(model_name)
+        # 经模型服务推理时以高优先级排队，插到普通转录请求之前
+        options = {"priority": PRIORITY_HIGH} if self._uses_model_server(model) else {}
+        segments, info = model.transcribe(audio, language="zh", task="transcribe", **options)
+        transcript_segments, text_parts = self._consume_segments(segments)
+        
+        result = self._build_transcript_result(
+            transcript_segments, info.language, info.language_probability, text_parts
+        )
+        result["preview_seconds"] = round(audio.shape[0] / SAMPLE_RATE, 2)
+        return result
+    
+    def transcribe_range(self, video_path: str, start: float, end: float, model_name: Optional[str] = None) -> Dict:
+        """只解码并转录 [start, end] 时间范围（ffmpeg 定位解码），片段时间戳为原视频时间轴"""
+        from app.services.model_server import PRIORITY_HIGH
+        
+        audio = load_audio(video_path, start=start, duration=end - start)
+        model = self._ensure_model_loaded(model_name)
+        # 和预览一样，经模型服务推理时以高优先级排队
+        options = {"priority": PRIORITY_HIGH} if self._uses_model_server(model) else {}
+        segments, info = model.transcribe(audio, language="zh", task="transcribe", **options)
+        transcript_segments, text_parts = self._consume_segments(segments, offset=start)
+        
+        for segment in transcript_segments:
+            segment["end"] = min(segment["end"], end)
+        return {
+            "start": start,
+            "end": end,
+            "audio_seconds": round(audio.shape[0] / SAMPLE_RATE, 2),
+            "segments": transcript_segments,
+            "text": " ".join(text_parts),
+            "language": info.language,
+            "confidence_score": info.language_probability
+        }
+    
+    def _new_loop_guard(self) -> LoopGuard:
+        return LoopGuard(
+            window=settings.LOOP_GUARD_WINDOW,
+            max_repeats=settings.LOOP_GUARD_MAX_REPEATS,
+            compression_ratio_threshold=settings.LOOP_GUARD_COMPRESSION_RATIO,
+            no_speech_streak=settings.LOOP_GUARD_NO_SPEECH_STREAK,
+            no_speech_prob=settings.LOOP_GUARD_NO_SPEECH_PROB
+        )
+    
+    def _loop_restarter(self, model, media, duration: float, video_path: Optional[str] = None,
+                        fingerprint: Optional[str] = None, start_offset: float = 0.0) -> Callable[[float], Optional[Iterator]]:
+        """跳过坏区后重新解码的函数：restart(resume) 从 media 时间轴的 resume 秒处重新转录，超出结尾时返回 None
+        
+        已解码的音频直接切片（本地模型和模型服务都可以）；文件路径经模型服务时由服务按 start_offset 定位，
+        本地模型则在本地解码剩余音频。重新解码不带之前的上下文，避免再次陷入循环
+        """
+        options = {"language": "zh", "task": "transcribe", "condition_on_previous_text": False}
+        
+        def restart(resume: float):
+            if resume >= duration:
+                return None
+            if isinstance(media, np.ndarray):
+                remaining = media[int(resume * SAMPLE_RATE):]
+            elif self._uses_model_server(model):
+                segments, _ = model.transcribe(
+                    media, fingerprint=fingerprint, start_offset=start_offset + resume, **options
+                )
+                return segments
+            else:
+                remaining = load_audio(video_path, start=start_offset + resume)
+            segments, _ = model.transcribe(remaining, **options)
+            return segments
+        
+        return restart
+    
+    def _guard_segments(self, segments, loop_guard: LoopGuard,
+                        restart: Callable[[float], Optional[Iterator]]) -> Iterator[Dict]:
+        """用循环检测包装片段生成器
+        
+        检测到循环后停止消费当前生成器（停止解码），跳过坏区从其后重新解码；
+        重启次数达到上限后，剩余音频照常转录、不再检测，不会丢弃坏区之后的内容
+        """
+        restarts = 0
+        offset = 0.0
+        while True:
+            yield from loop_guard.filter(segments, offset)
+            if loop_guard.stopped_at is None:
+                return
+            
+            event = loop_guard.events[-1]
+            logger.warning(
+                f"🔁 检测到转录循环({event['kind']}): {event['start']:.1f}~{event['end']:.1f}秒, {event['detail']}"
+            )
+            resume = loop_guard.stopped_at + settings.LOOP_GUARD_SKIP_SECONDS
+            segments = restart(resume)
+            if segments is None:
+                return
+            logger.info(f"⏭️ 跳过坏区，从 {resume:.1f}秒 重新解码")
+            restarts += 1
+            offset = resume
+            if restarts >= settings.LOOP_GUARD_MAX_RESTARTS:
+                logger.warning("⚠️ 跳过坏区次数达到上限，剩余音频不再做循环检测")
+                for segment in segments:
+                    text = segment.text.strip()
+                    if text:
+                        yield {"start": round(segment.start + offset, 3), "end": round(segment.end + offset, 3), "text": text}
+                return
+    
+    @staticmethod
+    def _map_loop_events(events: List[Dict], offset: float = 0.0,
+                         timeline: Optional[SpeechTimeline] = None) -> List[Dict]:
+        """把循环事件的时间映射回原视频时间轴"""
+        mapped = []
+        for event in events:
+            start, end = event["start"], event["end"]
+            if timeline is not None:
+                start, end = timeline.to_original(start), timeline.to_original(end)
+            mapped.append(dict(event, start=round(start + offset, 3), end=round(end + offset, 3)))
+        return mapped
+    
+    def _trim_silence(self, audio) -> Tuple[np.ndarray, Optional[SpeechTimeline], Dict]:
+        """VAD 预处理：只保留语音区间，返回 (送入模型的音频, 时间轴映射, 语音统计)
+        
+        静音占比很低时直接使用原音频（时间轴映射为 None）；检测到的语音为零或少得不合理时（自适应阈值在噪声大或
+        通篇语音的音频上会失效）同样使用原音频，只有按绝对电平判定为完全静音时才返回空音频
+        """
+        total = audio.shape[0]
+        intervals = detect_speech_intervals(
+            audio,
+            threshold_db=settings.VAD_THRESHOLD_DB,
+            min_speech_ms=settings.VAD_MIN_SPEECH_MS,
+            min_silence_ms=settings.VAD_MIN_SILENCE_MS,
+            pad_ms=settings.VAD_PAD_MS
+        )
+        speech_samples = sum(end - start for start, end in intervals)
+        speech_stats = {
+            "audio_seconds": round(total / SAMPLE_RATE, 2),
+            "speech_seconds": round(speech_samples / SAMPLE_RATE, 2),
+            "speech_ratio": round(speech_samples / total, 4) if total else 0.0
+        }
+        logger.info(
+            f"🔇 VAD: 语音 {speech_stats['speech_seconds']}秒 / 总时长 {speech_stats['audio_seconds']}秒 "
+            f"(占比 {speech_stats['speech_ratio']:.1%}, {len(intervals)} 个区间)"
+        )
+        
+        if not intervals or speech_stats["speech_ratio"] < settings.VAD_MIN_SPEECH_RATIO:
+            if is_silent(audio, settings.VAD_SILENCE_FLOOR_DB):
+                return audio[:0], None, speech_stats
+            logger.info("🔊 VAD 检测到的语音过少但音频并非静音，不裁剪，使用原音频")
+            speech_stats["vad_fallback"] = True
+            return audio, None, speech_stats
+        if speech_stats["speech_ratio"] >= settings.VAD_MAX_SPEECH_RATIO:
+            return audio, None, speech_stats
+        
+        speech_audio, timeline = build_speech_audio(audio, intervals)
+        return speech_audio, timeline, speech_stats
+    
+    def _consume_segments(self, segments, on_segment: Optional[Callable[[Dict], None]] = None,
+                          offset: float = 0.0, timeline: Optional[SpeechTimeline] = None) -> Tuple[List[Dict], List[str]]:
+        """消费片段生成器，返回 (片段列表, 文本列表)
+        
+        提供 on_segment 时片段交给回调处理、不在内存中保留，只保留文本；
+        timeline 把 VAD 拼接音频上的时间戳映射回原音频，offset 再加到时间戳上（用于裁剪过的音频）
+        """
+        transcript_segments = []
+        text_parts = []
+        
+        for segment in segments:
+            if isinstance(segment, dict):
+                segment_data = dict(segment)
+            else:
+                segment_data = {
+                    "start": segment.start,
+                    "end": segment.end,
+                    "text": segment.text.strip()
+                }
+            if timeline is not None:
+                segment_data["start"] = timeline.to_original(segment_data["start"])
+                segment_data["end"] = timeline.to_original(segment_data["end"])
+            if offset:
+                segment_data["start"] = round(segment_data["start"] + offset, 3)
+                segment_data["end"] = round(segment_data["end"] + offset, 3)
+            if not segment_data["text"]:
+                continue
+            
+            if on_segment:
+                on_segment(segment_data)
+            else:
+                transcript_segments.append(segment_data)
+            text_parts.append(segment_data["text"])
+        
+        return transcript_segments, text_parts
+    
+    def _build_transcript_result(self, transcript_segments: List[Dict], language: str, confidence: float,
+                                 text_parts: Optional[List[str]] = None) -> Dict:
+        """根据转录片段生成完整的结果字典（文本清理、摘要、标签、评分）"""
+        if text_parts is None:
+            text_parts = [seg["text"] for seg in transcript_segments if seg["text"]]
+        full_text = " ".join(text_parts)
+        
+        if not full_text.strip():
+            logger.warning("转录结果为空，可能是视频没有音频或音频质量问题")
+            return {
+                "original_text": "未检测到音频内容",
+                "cleaned_text": "未检测到音频内容",
+                "summary": "该视频可能没有音频内容或音频质量较差",
+                "tags": "无音频",
+                "language": "zh",
+                "confidence_score": 0.0,
+                "segments": []
+            }
+        
+        # 智能文本处理和分析
+        cleaned_text = self._clean_text(full_text)
+        formatted_text = self._format_text_for_display(cleaned_text)
+        summary = self._generate_summary(cleaned_text)
+        tags = self._extract_tags(cleaned_text)
+        smart_title = self._generate_smart_title(cleaned_text)
+        importance_score = self._calculate_importance_score(cleaned_text, tags)
+        
+        logger.info(f"✅ 本地转录完成，共转录 {len(text_parts)} 个片段，重要性评分: {importance_score:.1f}")
+        
+        return {
+            "original_text": full_text.strip(),
+            "cleaned_text": cleaned_text,
+            "formatted_text": formatted_text,
+            "summary": summary,
+            "smart_title": smart_title,
+            "tags": ", ".join(tags),
+            "importance_score": importance_score,
+            "language": language,
+            "confidence_score": confidence,
+            "segments": transcript_segments,
+            "segment_count": len(text_parts)
+        }
+    
+    def transcribe_batch(self, video_paths: List[str], max_duration: Optional[float] = None,
+                         fingerprints: Optional[Dict[str, str]] = None) -> Dict[str, Dict]:
+        """批量转录多个短视频：音频打包进共享的前向计算，结果按视频路由返回
+        
+        返回 {video_path: 结果字典}；解码失败或时长超过 max_duration 的文件不在结果中，
+        由调用方改走单视频转录。fingerprints 提供 {video_path: 指纹} 时先查询结果缓存
+        """
+        from app.services.batch_transcriber import BatchedTranscriptionEngine
+        
+        fingerprints = fingerprints or {}
+        use_cache = settings.TRANSCRIPTION_CACHE_ENABLED
+        results = {}
+        audios = {}
+        for video_path in video_paths:
+            fingerprint = fingerprints.get(video_path)
+            if use_cache and fingerprint:
+                cached = transcription_cache.get(self._result_cache_key(fingerprint, engine="batched"))
+                if cached is not None:
+                    logger.info(f"⚡ 命中转录结果缓存: {os.path.basename(video_path)}")
+                    cached["cache_hit"] = True
+                    results[video_path] = cached
+                    continue
+            
+            try:
+                if settings.AUDIO_CACHE_ENABLED:
+                    audio = audio_cache.load(video_path, fingerprint)
+                else:
+                    audio = decode_audio(video_path, sampling_rate=SAMPLE_RATE)
+            except Exception as e:
+                logger.error(f"❌ 音频解码失败: {video_path}, 错误: {e}")
+                continue
+            
+            if max_duration and audio.shape[0] / SAMPLE_RATE > max_duration:
+                logger.info(f"⏭️ 视频时长超过批量上限，改走单视频转录: {video_path}")
+                continue
+            audios[video_path] = audio
+        
+        if not audios:
+            return results
+        
+        model, served_key = self._acquire_model()
+        if self._uses_model_server(model):
+            # 模型服务串行处理请求，批量打包只能在持有模型的进程内进行，这里逐个提交
+            logger.info(f"🔌 通过模型服务逐个转录 {len(audios)} 个视频")
+            for video_path, audio in audios.items():
+                try:
+                    segments, language, confidence, speech_stats = self.infer_segments(audio)
+                    result = self._build_transcript_result(segments, language, confidence)
+                    result.update(speech_stats)
+                    result["duration"] = audio.shape[0] / SAMPLE_RATE
+                except Exception as e:
+                    logger.error(f"❌ 模型服务转录失败: {video_path}, 错误: {e}")
+                    result = self._failed_result(e)
+                results[video_path] = result
+            return results
+        
+        engine = BatchedTranscriptionEngine(model, batch_size=settings.BATCH_INFERENCE_SIZE)
+        try:
+            batch_output = engine.transcribe_many(audios, language="zh")
+        except Exception as e:
+            logger.error(f"❌ 批量推理失败: {e}")
+            logger.error(f"📋 完整错误堆栈:\n{traceback.format_exc()}")
+            results.update({video_path: self._failed_result(e) for video_path in audios})
+            return results
+        
+        for video_path, output in batch_output.items():
+            result = self._build_transcript_result(
+                output["segments"], output["language"], output["confidence"]
+            )
+            result["duration"] = audios[video_path].shape[0] / SAMPLE_RATE
+            results[video_path] = result
+            
+            fingerprint = fingerprints.get(video_path)
+            if use_cache and fingerprint:
+                # 按实际提供服务的模型写入缓存（热切换期间可能仍是旧模型）
+                transcription_cache.put(
+                    self._result_cache_key(fingerprint, served_key[0], served_key[2], engine="batched"),
+                    fingerprint, served_key[0], served_key[2], "zh",
+                    dict(self._decode_options(), engine="batched"), result
+                )
+        
+        return results
+    
+    def _failed_result(self, error: Exception) -> Dict:
+        """转录失败时返回的占位结果"""
+        return {
+            "original_text": f"转录失败: {str(error)}",
+            "cleaned_text": f"转录失败: {str(error)}",
+            "summary": "视频转录过程中发生错误",
+            "tags": "转录失败",
+            "language": "zh",
+            "confidence_score": 0.0,
+            "segments": []
+        }
+
 # 全局服务实例
 ai_service = AITranscriptionService()
\ No newline at end of file
@@ -0,0 +1,189 @@
+"""
+解码音频缓存
+把解码后的 16kHz 单声道 PCM 以 .npy 文件保存在磁盘上，按文件内容指纹索引；
+读取时使用内存映射，模型直接从映射区读取，不再重复解码容器。
+重试、调试接口和换模型重新转录都可以跳过解码步骤；
+缓存目录按总字节数上限淘汰最久未访问的文件（以文件修改时间记录访问时间）
+"""
+
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+
+
+class DecodedAudioCache:
+    """基于内存映射 .npy 文件的解码音频缓存"""
+
+    def __init__(self, cache_dir: str, max_bytes: int, dtype: str = "float32"):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        # float32 可零拷贝直接送入模型；int16 节省一半磁盘，但读取时需要转换
+        self.dtype = np.int16 if dtype == "int16" else np.float32
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _entry_path(self, fingerprint: str) -> Path:
+        return self.cache_dir / f"{fingerprint}.npy"
+
+    def contains(self, fingerprint: str) -> bool:
+        """缓存中是否已有该指纹的音频（不读取内容）"""
+        return self._entry_path(fingerprint).exists()
+
+    def get(self, fingerprint: str) -> Optional[np.ndarray]:
+        """读取缓存的音频（只读内存映射），未命中返回 None"""
+        path = self._entry_path(fingerprint)
+        try:
+            audio = np.load(path, mmap_mode="r")
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"⚠️ 音频缓存文件损坏，已删除: {path.name}, 错误: {e}")
+            path.unlink(missing_ok=True)
+            return None
+
+        # 更新修改时间作为最近访问时间，供淘汰使用
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        if audio.dtype == np.int16:
+            return audio.astype(np.float32) / 32768.0
+        return audio
+
+    def put(self, fingerprint: str, audio: np.ndarray):
+        """写入缓存（先写临时文件再原子替换），写入后按字节上限淘汰"""
+        path = self._entry_path(fingerprint)
+        if self.dtype == np.int16:
+            data = (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+        else:
+            data = np.ascontiguousarray(audio, dtype=np.float32)
+
+        if data.nbytes > self.max_bytes:
+            logger.info(f"⏭️ 音频过大，不写入缓存: {data.nbytes / 1024 / 1024:.1f}MB")
+            return
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                np.save(f, data)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            tmp_path.unlink(missing_ok=True)
+            logger.warning(f"⚠️ 写入音频缓存失败: {e}")
+            return
+
+        self._evict()
+
+    def load(self, file_path: str, fingerprint: Optional[str] = None) -> np.ndarray:
+        """获取文件的解码音频：命中缓存则映射读取，否则解码并写入缓存"""
+        if not settings.AUDIO_CACHE_ENABLED:
+            return self._decode(file_path)
+
+        fingerprint = fingerprint or self._resolve_fingerprint(file_path)
+        audio = self.get(fingerprint)
+        if audio is not None:
+            with self._lock:
+                self.hits += 1
+            logger.info(f"⚡ 命中解码音频缓存: {os.path.basename(file_path)}")
+            return audio
+
+        with self._lock:
+            self.misses += 1
+        audio = self._decode(file_path)
+        self.put(fingerprint, audio)
+
+        # 重新映射读取，解码得到的数组随即释放，长视频不会常驻内存
+        cached = self.get(fingerprint)
+        return cached if cached is not None else audio
+
+    @staticmethod
+    def _resolve_fingerprint(file_path: str) -> str:
+        """调用方未提供指纹时，按视频记录/完整哈希确认后的指纹作缓存键（抽样碰撞的文件不会共用缓存）"""
+        from app.core.database import SessionLocal
+        from app.services.file_identity import fingerprint_for_path
+
+        db = SessionLocal()
+        try:
+            return fingerprint_for_path(db, file_path)
+        finally:
+            db.close()
+
+    def _decode(self, file_path: str) -> np.ndarray:
+        """解码容器中的音频（与 faster-whisper 内部解码一致）"""
+        from faster_whisper import decode_audio
+
+        return decode_audio(file_path, sampling_rate=SAMPLE_RATE)
+
+    def _evict(self):
+        """按最久未访问顺序删除缓存文件，直到总大小在上限内"""
+        with self._lock:
+            entries = []
+            total_bytes = 0
+            for path in self.cache_dir.glob("*.npy"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total_bytes += stat.st_size
+
+            if total_bytes <= self.max_bytes:
+                return
+
+            entries.sort(key=lambda entry: entry[0])
+            for _, size, path in entries:
+                if total_bytes <= self.max_bytes:
+                    break
+                # 已映射的文件在 Linux 上删除后映射仍然有效
+                path.unlink(missing_ok=True)
+                total_bytes -= size
+                self.evictions += 1
+                logger.info(f"🧹 淘汰解码音频缓存: {path.name}")
+
+    def stats(self) -> Dict:
+        """缓存统计信息（命中计数为当前进程内的统计）"""
+        files = list(self.cache_dir.glob("*.npy")) if self.cache_dir.exists() else []
+        total_bytes = sum(path.stat().st_size for path in files if path.exists())
+        lookups = self.hits + self.misses
+        return {
+            "enabled": settings.AUDIO_CACHE_ENABLED,
+            "cache_dir": str(self.cache_dir),
+            "dtype": np.dtype(self.dtype).name,
+            "entries": len(files),
+            "size_mb": round(total_bytes / (1024 * 1024), 2),
+            "max_mb": round(self.max_bytes / (1024 * 1024), 2),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+    def clear(self) -> int:
+        """删除全部缓存文件，返回删除数量"""
+        removed = 0
+        for path in self.cache_dir.glob("*.npy"):
+            path.unlink(missing_ok=True)
+            removed += 1
+        return removed
+
+
+# 全局缓存实例
+audio_cache = DecodedAudioCache(
+    cache_dir=settings.AUDIO_CACHE_DIR,
+    max_bytes=settings.AUDIO_CACHE_MAX_BYTES,
+    dtype=settings.AUDIO_CACHE_DTYPE
+)
@@ -0,0 +1,119 @@
+"""
+批量推理引擎
+把多个短视频的音频拼接成一条时间轴，按视频边界切分成 clip 后交给
+faster-whisper 的 BatchedInferencePipeline，一次前向计算同时处理多个视频的片段，
+再按时间轴把转录片段路由回各自的视频。
+流水线会把相邻 clip 合并到不超过 chunk_length 的解码窗口（丢弃其间的间隔），
+因此每个视频补零到 chunk_length 的整数倍、只生成满长度的 clip，解码窗口不会跨越两个视频
+"""
+
+import bisect
+import logging
+from typing import Dict, List, Hashable
+
+import numpy as np
+from faster_whisper import BatchedInferencePipeline
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+
+
+class BatchedTranscriptionEngine:
+    """跨文件批量转录引擎"""
+
+    def __init__(self, model, batch_size: int = 8, chunk_length: int = 30):
+        self.pipeline = BatchedInferencePipeline(model=model)
+        self.batch_size = batch_size
+        self.chunk_length = chunk_length
+
+    def _pack(self, audios: Dict[Hashable, np.ndarray]):
+        """拼接音频并生成每个视频的 clip 边界（单位: 采样点）"""
+        keys: List[Hashable] = []
+        offsets: List[int] = []
+        lengths: List[int] = []
+        clips: List[Dict[str, int]] = []
+        parts: List[np.ndarray] = []
+        chunk_samples = self.chunk_length * SAMPLE_RATE
+        cursor = 0
+
+        for key, audio in audios.items():
+            length = int(audio.shape[0])
+            if length == 0:
+                continue
+
+            keys.append(key)
+            offsets.append(cursor)
+            lengths.append(length)
+
+            # 补零到 chunk_length 的整数倍，每个 clip 恰好一个解码窗口长，不会与相邻 clip 合并
+            padded_length = -(-length // chunk_samples) * chunk_samples
+            for start in range(0, padded_length, chunk_samples):
+                clips.append({"start": cursor + start, "end": cursor + start + chunk_samples})
+
+            parts.append(audio.astype(np.float32, copy=False))
+            if padded_length > length:
+                parts.append(np.zeros(padded_length - length, dtype=np.float32))
+            cursor += padded_length
+
+        packed = np.concatenate(parts) if parts else np.zeros(0, dtype=np.float32)
+        return packed, keys, offsets, lengths, clips
+
+    def transcribe_many(self, audios: Dict[Hashable, np.ndarray], language: str = "zh") -> Dict[Hashable, Dict]:
+        """批量转录多段音频
+
+        Args:
+            audios: {视频标识: 16kHz 单声道 float32 音频}
+            language: 转录语言
+
+        Returns:
+            {视频标识: {"segments": [...], "language": str, "confidence": float}}
+        """
+        results = {
+            key: {"segments": [], "language": language, "confidence": 0.0}
+            for key in audios
+        }
+
+        packed, keys, offsets, lengths, clips = self._pack(audios)
+        if not clips:
+            return results
+
+        logger.info(
+            f"📦 批量推理: {len(keys)} 个视频, {len(clips)} 个片段, "
+            f"总时长 {packed.shape[0] / SAMPLE_RATE:.1f}秒, batch_size={self.batch_size}"
+        )
+
+        segments, info = self.pipeline.transcribe(
+            packed,
+            language=language,
+            task="transcribe",
+            clip_timestamps=clips,
+            vad_filter=False,
+            batch_size=self.batch_size
+        )
+
+        offset_seconds = [offset / SAMPLE_RATE for offset in offsets]
+        for segment in segments:
+            # 以片段中点定位所属视频
+            midpoint = (segment.start + segment.end) / 2
+            index = max(bisect.bisect_right(offset_seconds, midpoint) - 1, 0)
+            key = keys[index]
+            base = offset_seconds[index]
+            limit = lengths[index] / SAMPLE_RATE
+
+            text = segment.text.strip()
+            # 补零区域中识别出的内容不属于视频本身
+            if not text or segment.start - base >= limit:
+                continue
+
+            results[key]["segments"].append({
+                "start": round(min(max(segment.start - base, 0.0), limit), 3),
+                "end": round(min(max(segment.end - base, 0.0), limit), 3),
+                "text": text
+            })
+
+        for key in keys:
+            results[key]["language"] = info.language
+            results[key]["confidence"] = info.language_probability
+
+        return results
@@ -0,0 +1,155 @@
+"""
+两级模型级联转录
+先用小模型（int8）快速转录全部音频，按 avg_logprob、no_speech_prob 和压缩比给每个片段打分，
+只把低置信度的区间交给大模型重新转录，再把结果拼回草稿转录中。
+大部分片段小模型就能转好，大模型只处理难的部分，总推理时间大幅下降
+"""
+
+import logging
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+
+
+def segment_to_dict(segment) -> Dict:
+    """把模型输出的片段转成字典，保留置信度相关字段"""
+    return {
+        "start": segment.start,
+        "end": segment.end,
+        "text": segment.text.strip(),
+        "avg_logprob": getattr(segment, "avg_logprob", 0.0),
+        "no_speech_prob": getattr(segment, "no_speech_prob", 0.0),
+        "compression_ratio": getattr(segment, "compression_ratio", 1.0)
+    }
+
+
+def is_low_confidence(segment: Dict, logprob_threshold: float, no_speech_threshold: float,
+                      compression_ratio_threshold: float) -> bool:
+    """判断草稿片段是否需要大模型复核"""
+    if segment["avg_logprob"] < logprob_threshold:
+        return True
+    # 重复文本（幻觉、循环）压缩比偏高
+    if segment["compression_ratio"] > compression_ratio_threshold:
+        return True
+    # 模型认为这里很可能没有语音却输出了文字
+    if segment["no_speech_prob"] > no_speech_threshold and segment["text"]:
+        return True
+    return False
+
+
+def merge_spans(segments: List[Dict], flags: List[bool], max_gap: float) -> List[Tuple[float, float]]:
+    """把相邻的低置信度片段合并成需要复核的时间区间"""
+    spans: List[Tuple[float, float]] = []
+    for segment, flagged in zip(segments, flags):
+        if not flagged:
+            continue
+        if spans and segment["start"] - spans[-1][1] <= max_gap:
+            spans[-1] = (spans[-1][0], max(spans[-1][1], segment["end"]))
+        else:
+            spans.append((segment["start"], segment["end"]))
+    return spans
+
+
+class CascadeTranscriber:
+    """小模型草稿 + 大模型复核低置信度区间"""
+
+    def __init__(self, draft_model, refine_model_loader, logprob_threshold: float = -0.8,
+                 no_speech_threshold: float = 0.6, compression_ratio_threshold: float = 2.4,
+                 span_padding: float = 0.5, max_gap: float = 1.0, max_refine_ratio: float = 0.6):
+        self.draft_model = draft_model
+        # 大模型懒加载：草稿全部可信时不需要加载大模型
+        self.refine_model_loader = refine_model_loader
+        self.logprob_threshold = logprob_threshold
+        self.no_speech_threshold = no_speech_threshold
+        self.compression_ratio_threshold = compression_ratio_threshold
+        self.span_padding = span_padding
+        self.max_gap = max_gap
+        self.max_refine_ratio = max_refine_ratio
+
+    def transcribe(self, audio: np.ndarray, language: str = "zh") -> Tuple[List[Dict], str, float, Dict]:
+        """级联转录，返回 (片段列表, 语言, 语言置信度, 统计信息)"""
+        duration = audio.shape[0] / SAMPLE_RATE
+
+        started = time.time()
+        draft_segments, info = self.draft_model.transcribe(audio, language=language, task="transcribe")
+        draft = [segment_to_dict(segment) for segment in draft_segments]
+        draft = [segment for segment in draft if segment["text"]]
+        draft_seconds = time.time() - started
+
+        flags = [
+            is_low_confidence(segment, self.logprob_threshold, self.no_speech_threshold, self.compression_ratio_threshold)
+            for segment in draft
+        ]
+        spans = merge_spans(draft, flags, self.max_gap)
+        span_seconds = sum(end - start for start, end in spans)
+
+        stats = {
+            "audio_seconds": round(duration, 2),
+            "draft_segments": len(draft),
+            "low_confidence_segments": sum(flags),
+            "refined_spans": len(spans),
+            "refined_audio_seconds": round(span_seconds, 2),
+            "draft_inference_seconds": round(draft_seconds, 2),
+            "refine_inference_seconds": 0.0
+        }
+
+        if not spans:
+            logger.info(f"✅ 级联转录: 草稿 {len(draft)} 个片段全部可信，无需大模型复核")
+            return self._strip(draft), info.language, info.language_probability, stats
+
+        refine_model = self.refine_model_loader()
+
+        # 低置信度部分过多时，直接用大模型转录整段
+        if duration and span_seconds / duration > self.max_refine_ratio:
+            logger.info(f"🔁 级联转录: 低置信度占比 {span_seconds / duration:.0%}，整段交给大模型")
+            started = time.time()
+            segments, refine_info = refine_model.transcribe(audio, language=language, task="transcribe")
+            refined = [segment_to_dict(segment) for segment in segments]
+            stats["refine_inference_seconds"] = round(time.time() - started, 2)
+            stats["refined_audio_seconds"] = round(duration, 2)
+            return self._strip([s for s in refined if s["text"]]), refine_info.language, refine_info.language_probability, stats
+
+        started = time.time()
+        result = list(draft)
+        for span_start, span_end in spans:
+            clip_start = max(span_start - self.span_padding, 0.0)
+            clip_end = min(span_end + self.span_padding, duration)
+            clip = audio[int(clip_start * SAMPLE_RATE):int(clip_end * SAMPLE_RATE)]
+
+            segments, _ = refine_model.transcribe(
+                clip, language=language, task="transcribe", condition_on_previous_text=False
+            )
+            refined = []
+            for segment in segments:
+                item = segment_to_dict(segment)
+                item["start"] = round(item["start"] + clip_start, 3)
+                item["end"] = round(item["end"] + clip_start, 3)
+                # 只采用中点落在复核区间内的片段，两侧余量部分仍以草稿为准
+                midpoint = (item["start"] + item["end"]) / 2
+                if item["text"] and span_start <= midpoint <= span_end:
+                    item["start"] = max(item["start"], span_start)
+                    item["end"] = min(item["end"], span_end)
+                    refined.append(item)
+
+            result = [
+                segment for segment in result
+                if not span_start <= (segment["start"] + segment["end"]) / 2 <= span_end
+            ] + refined
+        result.sort(key=lambda segment: segment["start"])
+        stats["refine_inference_seconds"] = round(time.time() - started, 2)
+
+        logger.info(
+            f"🔁 级联转录: {stats['low_confidence_segments']}/{len(draft)} 个片段低置信度, "
+            f"大模型复核 {len(spans)} 个区间共 {span_seconds:.1f}秒 (占 {span_seconds / duration:.0%})"
+        )
+        return self._strip(result), info.language, info.language_probability, stats
+
+    @staticmethod
+    def _strip(segments: List[Dict]) -> List[Dict]:
+        """只保留转录结果需要的字段"""
+        return [{"start": s["start"], "end": s["end"], "text": s["text"]} for s in segments]
@@ -0,0 +1,184 @@
+"""
+长视频分块并行转录
+在静音处把解码后的音频切成若干块（块之间保留少量重叠），由线程池并行转录，
+所有线程共享同一个 int8 CPU 模型（CTranslate2 num_workers 个推理实例并行执行，不创建子进程，
+可以在 Celery 的守护子进程中运行），最后按块顺序拼接片段、修正时间戳并去除重叠部分的重复
+"""
+
+import atexit
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+FRAME_SAMPLES = 480  # 30ms 能量帧
+
+
+def find_silence_splits(audio: np.ndarray, chunk_seconds: float, search_seconds: float = 10.0) -> List[int]:
+    """在每个目标切分点附近寻找能量最低的帧作为切分位置（单位: 采样点）"""
+    total = audio.shape[0]
+    chunk_samples = int(chunk_seconds * SAMPLE_RATE)
+    if total <= chunk_samples:
+        return []
+
+    # 向量化计算每帧 RMS 能量
+    frame_count = total // FRAME_SAMPLES
+    frames = audio[:frame_count * FRAME_SAMPLES].reshape(frame_count, FRAME_SAMPLES)
+    energy = np.sqrt(np.mean(frames.astype(np.float32) ** 2, axis=1))
+
+    search_frames = int(search_seconds * SAMPLE_RATE / FRAME_SAMPLES)
+    splits = []
+    target = chunk_samples
+    while target < total - chunk_samples // 4:
+        center = target // FRAME_SAMPLES
+        lo = max(center - search_frames, 1)
+        hi = min(center + search_frames, frame_count - 1)
+        if hi <= lo:
+            break
+        split_frame = lo + int(np.argmin(energy[lo:hi]))
+        split = split_frame * FRAME_SAMPLES
+        if splits and split <= splits[-1]:
+            split = target
+        splits.append(split)
+        target = split + chunk_samples
+
+    return splits
+
+
+def stitch_segments(chunk_results: List[List[Dict]], cores: List[Tuple[float, float]]) -> List[Dict]:
+    """拼接各块的片段：只保留中点落在块核心区间内的片段，并去掉跨块的重复文本"""
+    stitched: List[Dict] = []
+    for segments, (core_start, core_end) in zip(chunk_results, cores):
+        for segment in segments:
+            midpoint = (segment["start"] + segment["end"]) / 2
+            if midpoint < core_start or midpoint >= core_end:
+                continue
+            if stitched:
+                previous = stitched[-1]
+                # 重叠区两侧识别出的相同句子只保留一份
+                if segment["text"] == previous["text"] and segment["start"] < previous["end"] + 1.0:
+                    previous["end"] = max(previous["end"], segment["end"])
+                    continue
+                if segment["start"] < previous["end"]:
+                    segment = dict(segment, start=min(previous["end"], segment["end"]))
+            stitched.append(segment)
+    return stitched
+
+
+class ChunkedTranscriber:
+    """基于线程池和共享模型的长音频并行转录器"""
+
+    def __init__(self, model_path_or_name: str, workers: int, cpu_threads: int,
+                 chunk_seconds: float = 300, overlap_seconds: float = 2.0):
+        self.model_path_or_name = model_path_or_name
+        self.workers = workers
+        self.cpu_threads = cpu_threads
+        self.chunk_seconds = chunk_seconds
+        self.overlap_seconds = overlap_seconds
+        self._model = None
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        """懒加载模型和线程池，模型在多次长视频转录之间复用"""
+        if self._pool is None:
+            from faster_whisper import WhisperModel
+
+            logger.info(f"🧵 启动分块转录: {self.workers} 个并行推理实例, 每实例 {self.cpu_threads} 线程")
+            # num_workers 个推理实例共享同一份权重，多个 Python 线程同时调用 transcribe 时真正并行
+            self._model = WhisperModel(
+                self.model_path_or_name,
+                device="cpu",
+                compute_type="int8",
+                cpu_threads=self.cpu_threads,
+                num_workers=self.workers
+            )
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="chunk-transcribe")
+        return self._pool
+
+    def _transcribe_chunk(self, audio: np.ndarray, language: Optional[str]) -> Tuple[List[Dict], str, float]:
+        """转录单个音频块，返回相对于块起点的片段"""
+        segments, info = self._model.transcribe(audio, language=language, task="transcribe")
+        results = []
+        for segment in segments:
+            text = segment.text.strip()
+            if text:
+                results.append({"start": segment.start, "end": segment.end, "text": text})
+        return results, info.language, info.language_probability
+
+    def shutdown(self):
+        """关闭线程池并释放模型"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        self._model = None
+
+    def transcribe(self, audio: np.ndarray, language: Optional[str] = "zh") -> Tuple[List[Dict], str, float]:
+        """分块并行转录整段音频，返回 (片段列表, 语言, 语言置信度)"""
+        total = audio.shape[0]
+        boundaries = [0] + find_silence_splits(audio, self.chunk_seconds) + [total]
+        overlap = int(self.overlap_seconds * SAMPLE_RATE)
+
+        pool = self._get_pool()
+        futures = []
+        offsets = []
+        cores = []
+        for start, end in zip(boundaries[:-1], boundaries[1:]):
+            chunk_start = max(start - overlap, 0)
+            chunk_end = min(end + overlap, total)
+            offsets.append(chunk_start / SAMPLE_RATE)
+            cores.append((start / SAMPLE_RATE, end / SAMPLE_RATE))
+            futures.append(pool.submit(self._transcribe_chunk, audio[chunk_start:chunk_end], language))
+
+        logger.info(f"🔪 长音频切分为 {len(futures)} 块 (总时长 {total / SAMPLE_RATE:.1f}秒)")
+
+        chunk_results = []
+        languages = []
+        for index, (future, offset) in enumerate(zip(futures, offsets)):
+            segments, chunk_language, probability = future.result()
+            for segment in segments:
+                segment["start"] = round(segment["start"] + offset, 3)
+                segment["end"] = round(segment["end"] + offset, 3)
+            chunk_results.append(segments)
+            languages.append((chunk_language, probability))
+            logger.info(f"✅ 第 {index + 1}/{len(futures)} 块完成, {len(segments)} 个片段")
+
+        language_result, probability = max(languages, key=lambda item: item[1]) if languages else (language, 0.0)
+        return stitch_segments(chunk_results, cores), language_result, probability
+
+
+# 进程内共享的分块转录器
+_chunked_transcriber: Optional[ChunkedTranscriber] = None
+
+
+def get_chunked_transcriber(model_path_or_name: str) -> ChunkedTranscriber:
+    """获取（或创建）分块转录器"""
+    global _chunked_transcriber
+    from app.core.config import settings
+
+    if _chunked_transcriber is None or _chunked_transcriber.model_path_or_name != model_path_or_name:
+        if _chunked_transcriber is not None:
+            _chunked_transcriber.shutdown()
+
+        cpu_threads = max(settings.LONG_VIDEO_THREADS_PER_WORKER, 1)
+        # 每个 Celery 子进程都可能同时转录长视频，CPU 核数按子进程数平分
+        concurrency = max(settings.CELERY_WORKER_CONCURRENCY, 1)
+        workers = settings.LONG_VIDEO_WORKERS or max((os.cpu_count() or 1) // cpu_threads // concurrency, 1)
+        _chunked_transcriber = ChunkedTranscriber(
+            model_path_or_name,
+            workers=workers,
+            cpu_threads=cpu_threads,
+            chunk_seconds=settings.LONG_VIDEO_CHUNK_SECONDS,
+            overlap_seconds=settings.LONG_VIDEO_OVERLAP_SECONDS
+        )
+    return _chunked_transcriber
+
+
+@atexit.register
+def _shutdown_chunked_transcriber():
+    if _chunked_transcriber is not None:
+        _chunked_transcriber.shutdown()
@@ -0,0 +1,218 @@
+"""
+文件内容识别
+视频记录的 file_fingerprint 默认使用抽样指纹（成本固定）；抽样指纹与已有视频相同时，
+才在后台 I/O 线程池中计算两者的完整 SHA256 确认：内容一致视为重复，
+内容不同（抽样碰撞）则改用完整 SHA256 作为新视频的指纹。
+升级前的视频记录保存的是完整 SHA256，由后台回填任务分批改为抽样指纹（完整指纹转存到 file_content_hashes）
+"""
+
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Tuple
+
+import redis
+
+from app.core.config import settings
+from app.core.database import FileContentHash, Video
+from app.utils.fingerprint import compute_file_fingerprint, compute_sampled_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# 回填进度：最后处理的视频ID，全部完成后为 "done"
+BACKFILL_KEY = "video_learning:fingerprint_backfill"
+# 回填租约：同一时间只允许一条自我续提交的回填任务链运行，任务链每处理一批续约一次
+BACKFILL_LEASE_KEY = "video_learning:fingerprint_backfill_lease"
+
+# 租约仍属于该任务链（或已过期且无人持有）时续约，否则返回 0
+_RENEW_LEASE_SCRIPT = """
+local holder = redis.call('GET', KEYS[1])
+if holder == false or holder == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+    return 1
+end
+return 0
+"""
+_RELEASE_LEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+_io_pool: Optional[ThreadPoolExecutor] = None
+_io_pool_lock = threading.Lock()
+
+
+def _get_io_pool() -> ThreadPoolExecutor:
+    global _io_pool
+    with _io_pool_lock:
+        if _io_pool is None:
+            _io_pool = ThreadPoolExecutor(
+                max_workers=max(settings.FINGERPRINT_IO_WORKERS, 1),
+                thread_name_prefix="fingerprint-io"
+            )
+        return _io_pool
+
+
+def submit_full_fingerprint(file_path: str, throttle=None) -> Future:
+    """在后台 I/O 线程池中计算完整指纹（限制同时进行的全文件读取数量，throttle 为可选的读取限速）"""
+    return _get_io_pool().submit(compute_file_fingerprint, file_path, throttle)
+
+
+def _stored_full_fingerprint(db, video: Video) -> Optional[str]:
+    """获取已有视频的完整指纹：优先读取记录，文件仍存在时计算并保存，否则返回 None"""
+    record = db.query(FileContentHash).filter(FileContentHash.video_id == video.id).first()
+    if record:
+        return record.full_fingerprint
+    if not video.local_path or not Path(video.local_path).exists():
+        return None
+
+    full = submit_full_fingerprint(video.local_path).result()
+    db.add(FileContentHash(
+        video_id=video.id,
+        full_fingerprint=full,
+        file_size=Path(video.local_path).stat().st_size,
+        computed_at=datetime.utcnow()
+    ))
+    db.commit()
+    return full
+
+
+def resolve_fingerprint(db, file_path: str, exclude_video_id: Optional[int] = None,
+                        throttle=None) -> Tuple[str, Optional[int]]:
+    """计算文件的内容指纹，返回 (指纹, 内容相同的已有视频ID)
+
+    已有视频的文件已不存在、无法计算完整指纹时，抽样指纹（含文件大小）相同即视为重复；
+    throttle 为可选的读取限速（扫描时传入，避免挤占转录读取）
+    """
+    sampled = compute_sampled_fingerprint(file_path, throttle=throttle)
+    query = db.query(Video).filter(Video.file_fingerprint == sampled)
+    if exclude_video_id is not None:
+        query = query.filter(Video.id != exclude_video_id)
+    candidate = query.first()
+    if candidate is None:
+        return sampled, None
+
+    logger.info(f"🔍 抽样指纹相同，计算完整指纹确认: {Path(file_path).name} vs video_id={candidate.id}")
+    future = submit_full_fingerprint(file_path, throttle)
+    candidate_full = _stored_full_fingerprint(db, candidate)
+    full = future.result()
+    if candidate_full is None or candidate_full == full:
+        return sampled, candidate.id
+
+    # 抽样碰撞：内容不同，用完整指纹区分
+    logger.warning(f"⚠️ 抽样指纹碰撞，改用完整指纹: {Path(file_path).name}")
+    query = db.query(Video.id).filter(Video.file_fingerprint == full)
+    if exclude_video_id is not None:
+        query = query.filter(Video.id != exclude_video_id)
+    duplicate = query.first()
+    return full, duplicate.id if duplicate else None
+
+
+def fingerprint_for_path(db, file_path: str) -> str:
+    """文件的内容指纹（用作缓存键）：已有视频记录指向该路径时使用其指纹，否则按 resolve_fingerprint 计算"""
+    video = db.query(Video).filter(Video.local_path == file_path, Video.file_fingerprint.isnot(None)).first()
+    if video is not None:
+        return video.file_fingerprint
+    fingerprint, _ = resolve_fingerprint(db, file_path)
+    return fingerprint
+
+
+def backfill_sampled_fingerprints(db, after_id: int, limit: int, throttle=None) -> Optional[int]:
+    """把升级前保存的完整 SHA256 指纹改为抽样指纹，使已有视频的副本能按抽样指纹识别为重复
+
+    处理 ID 大于 after_id 的至多 limit 条记录并提交，返回最后处理的ID，没有更多记录时返回 None。
+    原完整指纹转存到 file_content_hashes（抽样指纹相同时免去重新计算）；
+    抽样指纹已被其他视频占用（抽样碰撞时保存的完整指纹，或内容相同的副本）或文件已不存在时保留原指纹
+    """
+    videos = db.query(Video).filter(
+        Video.id > after_id,
+        Video.file_fingerprint.isnot(None),
+        Video.local_path.isnot(None)
+    ).order_by(Video.id).limit(limit).all()
+    if not videos:
+        return None
+
+    converted = 0
+    for video in videos:
+        try:
+            sampled = compute_sampled_fingerprint(video.local_path, throttle=throttle)
+            file_size = os.path.getsize(video.local_path)
+        except OSError:
+            continue
+        if sampled == video.file_fingerprint:
+            continue
+        if db.query(Video.id).filter(Video.file_fingerprint == sampled, Video.id != video.id).first():
+            continue
+        if not db.query(FileContentHash.id).filter(FileContentHash.video_id == video.id).first():
+            db.add(FileContentHash(
+                video_id=video.id,
+                full_fingerprint=video.file_fingerprint,
+                file_size=file_size,
+                computed_at=datetime.utcnow()
+            ))
+        video.file_fingerprint = sampled
+        converted += 1
+        # 逐条刷新，同一批中内容相同的副本能看到已改写的指纹
+        db.flush()
+
+    db.commit()
+    if converted:
+        logger.info(f"🔁 已回填 {converted} 个视频的抽样指纹（ID {videos[0].id}~{videos[-1].id}）")
+    return videos[-1].id
+
+
+def _redis() -> redis.Redis:
+    return redis.Redis.from_url(settings.REDIS_URL, socket_timeout=2)
+
+
+def load_backfill_progress() -> Optional[str]:
+    """读取回填进度：None 表示尚未开始，"done" 表示已完成，否则为最后处理的视频ID"""
+    try:
+        value = _redis().get(BACKFILL_KEY)
+    except Exception as e:
+        logger.warning(f"⚠️ 读取指纹回填进度失败: {e}")
+        return "done"
+    return value.decode() if value else None
+
+
+def save_backfill_progress(value: str):
+    try:
+        _redis().set(BACKFILL_KEY, value)
+    except Exception as e:
+        logger.warning(f"⚠️ 保存指纹回填进度失败: {e}")
+
+
+def acquire_backfill_lease() -> Optional[str]:
+    """获取回填租约（SET NX），返回租约令牌；已有任务链持有或 Redis 不可用时返回 None"""
+    token = uuid.uuid4().hex
+    try:
+        acquired = _redis().set(BACKFILL_LEASE_KEY, token, nx=True, ex=settings.FINGERPRINT_BACKFILL_LEASE_SECONDS)
+    except Exception as e:
+        logger.warning(f"⚠️ 获取指纹回填租约失败: {e}")
+        return None
+    return token if acquired else None
+
+
+def renew_backfill_lease(token: str) -> bool:
+    """续约回填租约，租约已被其他任务链持有或 Redis 不可用时返回 False（当前任务链应停止）"""
+    try:
+        return bool(_redis().eval(
+            _RENEW_LEASE_SCRIPT, 1, BACKFILL_LEASE_KEY, token, settings.FINGERPRINT_BACKFILL_LEASE_SECONDS
+        ))
+    except Exception as e:
+        logger.warning(f"⚠️ 续约指纹回填租约失败: {e}")
+        return False
+
+
+def release_backfill_lease(token: str):
+    """释放回填租约（只释放自己持有的）"""
+    try:
+        _redis().eval(_RELEASE_LEASE_SCRIPT, 1, BACKFILL_LEASE_KEY, token)
+    except Exception as e:
+        logger.warning(f"⚠️ 释放指纹回填租约失败: {e}")
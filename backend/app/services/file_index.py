@@ -0,0 +1,150 @@
+"""
+监控目录的内存文件名索引
+文件名 → 路径集合，启动时并行 os.scandir 遍历一次建立，之后由文件监控事件（创建/删除/移动）增量维护，
+取代各接口每次请求都 rglob 整个监控目录查找文件的做法。
+同名文件位于不同子目录时由调用方传入相对路径区分
+"""
+
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from app.services.library_walker import walk_library
+
+logger = logging.getLogger(__name__)
+
+# 查找未命中时（未开启文件监控可能漏掉事件）重建索引的最短间隔（秒）
+MISS_REBUILD_INTERVAL = 10.0
+
+
+class AmbiguousFileName(Exception):
+    """同名文件不止一个且未指定相对路径"""
+
+    def __init__(self, name: str, candidates: List[str]):
+        super().__init__(f"存在 {len(candidates)} 个同名文件: {name}")
+        self.name = name
+        self.candidates = candidates
+
+
+class FileNameIndex:
+    """线程安全的文件名 → 路径索引"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._by_name: Dict[str, Set[str]] = {}
+        self.root: Optional[str] = None
+        self.built_at: Optional[float] = None
+
+    def build(self, root: str) -> int:
+        """并行遍历 root 重建索引，返回文件数量"""
+        started = time.time()
+        paths = [path for listing in walk_library(os.path.abspath(root)) for path in listing.files]
+        count = self.load(root, paths)
+        logger.info(f"🗂️ 文件名索引已建立: {count} 个文件, 耗时 {round(time.time() - started, 3)}秒")
+        return count
+
+    def load(self, root: str, paths: List[str]) -> int:
+        """用已遍历得到的文件路径重建索引（与视频库快照共用一次遍历），返回文件数量"""
+        by_name: Dict[str, Set[str]] = {}
+        for path in paths:
+            by_name.setdefault(os.path.basename(path), set()).add(path)
+        with self._lock:
+            self._by_name = by_name
+            self.root = os.path.abspath(root)
+            self.built_at = time.time()
+        return len(paths)
+
+    def add(self, path: str):
+        path = os.path.abspath(path)
+        with self._lock:
+            self._by_name.setdefault(os.path.basename(path), set()).add(path)
+
+    def remove(self, path: str):
+        path = os.path.abspath(path)
+        prefix = path + os.sep
+        with self._lock:
+            name = os.path.basename(path)
+            paths = self._by_name.get(name)
+            if paths and path in paths:
+                paths.discard(path)
+                if not paths:
+                    del self._by_name[name]
+                return
+            # 删除的是目录：移除其下所有文件
+            for name in list(self._by_name):
+                paths = self._by_name[name]
+                paths.difference_update([p for p in paths if p.startswith(prefix)])
+                if not paths:
+                    del self._by_name[name]
+
+    def move(self, src_path: str, dest_path: str):
+        src_path = os.path.abspath(src_path)
+        dest_path = os.path.abspath(dest_path)
+        with self._lock:
+            name = os.path.basename(src_path)
+            if src_path in self._by_name.get(name, ()):
+                self.remove(src_path)
+                self.add(dest_path)
+                return
+            # 移动的是目录：改写其下所有文件的路径
+            prefix = src_path + os.sep
+            for paths in self._by_name.values():
+                moved = [p for p in paths if p.startswith(prefix)]
+                for p in moved:
+                    paths.discard(p)
+                    paths.add(dest_path + p[len(src_path):])
+
+    def ensure_built(self, root: str):
+        if self.built_at is None or self.root != os.path.abspath(root):
+            self.build(root)
+
+    def _candidates(self, name: str) -> List[str]:
+        with self._lock:
+            paths = self._by_name.get(name, set())
+            existing = [p for p in paths if os.path.exists(p)]
+            if len(existing) != len(paths):
+                # 清理已不存在的路径（文件监控未开启时可能漏掉删除事件）
+                paths.intersection_update(existing)
+                if not paths:
+                    self._by_name.pop(name, None)
+            return sorted(existing)
+
+    def lookup(self, root: str, name: str, relative_path: Optional[str] = None) -> Optional[Path]:
+        """按文件名查找文件，未找到返回 None
+
+        同名文件不止一个时必须指定 relative_path（相对 root 的路径），否则抛出 AmbiguousFileName
+        """
+        self.ensure_built(root)
+        candidates = self._candidates(name)
+        if not candidates and time.time() - (self.built_at or 0) > MISS_REBUILD_INTERVAL:
+            self.build(root)
+            candidates = self._candidates(name)
+
+        if relative_path:
+            wanted = os.path.abspath(os.path.join(self.root, relative_path))
+            return Path(wanted) if wanted in candidates else None
+        if len(candidates) > 1:
+            raise AmbiguousFileName(name, [os.path.relpath(p, self.root) for p in candidates])
+        return Path(candidates[0]) if candidates else None
+
+    def paths(self) -> List[str]:
+        """索引中的全部文件路径"""
+        with self._lock:
+            return [path for paths in self._by_name.values() for path in paths]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "root": self.root,
+                "names": len(self._by_name),
+                "files": sum(len(paths) for paths in self._by_name.values()),
+                "duplicate_names": sum(1 for paths in self._by_name.values() if len(paths) > 1),
+                "built_at": self.built_at
+            }
+
+
+# 全局文件名索引
+file_index = FileNameIndex()
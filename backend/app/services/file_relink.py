@@ -0,0 +1,198 @@
+"""
+移动/重命名识别
+视频文件在监控目录内移动或重命名时，原地更新已有视频记录的 local_path/url 和扫描索引，
+字幕、片段和处理状态保持不变，不重新计算指纹、不重新转录。识别方式：
+  - 文件监控的移动事件：原路径 → 新路径，目录移动用一个事务批量改写路径前缀
+  - inode：扫描索引中 inode/大小/mtime 相同、原路径已不存在的条目
+  - 抽样指纹：指纹相同、原文件已不存在的视频记录
+"""
+
+import logging
+import os
+from typing import Optional
+
+from sqlalchemy import String, exists, func, literal, or_
+from sqlalchemy.orm import aliased
+
+from app.core.database import ScanDirectory, ScanIndexEntry, Transcript, Video
+
+logger = logging.getLogger(__name__)
+
+
+def _file_url(path: str) -> str:
+    return f"file://{path}"
+
+
+def restored_status(db, video_id: int) -> str:
+    """文件重新出现的视频应恢复的状态：已有字幕为 completed，否则重新排队"""
+    has_transcript = db.query(Transcript.id).filter(Transcript.video_id == video_id).first() is not None
+    return "completed" if has_transcript else "pending"
+
+
+def update_video_path(db, video: Video, new_path: str):
+    """把视频记录指向新路径（url 为 file:// 形式时一并更新；标记为文件缺失的恢复状态），不提交"""
+    old_path = video.local_path
+    video.local_path = new_path
+    if video.status == "missing":
+        video.status = restored_status(db, video.id)
+    if video.url and video.url.startswith("file://"):
+        new_url = _file_url(new_path)
+        if not db.query(Video.id).filter(Video.url == new_url, Video.id != video.id).first():
+            video.url = new_url
+    logger.info(f"🔗 视频记录已关联到新路径: video_id={video.id}, {old_path} -> {new_path}")
+
+
+def _move_entry(db, entry: ScanIndexEntry, new_path: str):
+    """把扫描索引条目改到新路径（保留指纹和处理状态），不提交"""
+    db.query(ScanIndexEntry).filter(
+        ScanIndexEntry.path == new_path, ScanIndexEntry.id != entry.id
+    ).delete(synchronize_session=False)
+    entry.path = new_path
+    entry.directory = os.path.dirname(new_path)
+    try:
+        stat = os.stat(new_path)
+        entry.inode, entry.size, entry.mtime = stat.st_ino, stat.st_size, stat.st_mtime
+    except OSError:
+        pass
+
+
+def find_video_for_path(db, old_path: str, video_id: Optional[int] = None) -> Optional[Video]:
+    """原路径对应的视频记录：路径匹配，或扫描索引记录的视频ID（该视频的文件已不存在时）"""
+    video = db.query(Video).filter(Video.local_path == old_path).first()
+    if video is None and video_id:
+        video = db.query(Video).filter(Video.id == video_id).first()
+        if video is not None and video.local_path and os.path.exists(video.local_path):
+            # 条目只是指向内容相同的另一个视频（重复文件），不改写该视频
+            video = None
+    return video
+
+
+def relink_file(db, src_path: str, dest_path: str) -> bool:
+    """文件移动/重命名：更新视频记录和扫描索引，返回是否为已知文件（已关联，无需重新处理）"""
+    entry = db.query(ScanIndexEntry).filter(ScanIndexEntry.path == src_path).first()
+    video = find_video_for_path(db, src_path, entry.video_id if entry is not None else None)
+    if entry is None and video is None:
+        # 目录移动时逐个文件的移动事件：批量改写后新路径已在索引中
+        moved = db.query(ScanIndexEntry.id).filter(
+            ScanIndexEntry.path == dest_path, ScanIndexEntry.processed.is_(True)
+        ).first()
+        return moved is not None
+
+    if entry is not None:
+        _move_entry(db, entry, dest_path)
+        if video is not None:
+            entry.video_id = video.id
+    if video is not None:
+        update_video_path(db, video, dest_path)
+    db.commit()
+    return True
+
+
+def _prefix_match(column, prefix: str):
+    # 不用 LIKE：路径中的 % 和 _ 会被当作通配符
+    return func.substr(column, 1, len(prefix)) == prefix
+
+
+def _replace_prefix(column, old: str, new: str):
+    return literal(new, String) + func.substr(column, len(old) + 1)
+
+
+def relink_directory(db, src_dir: str, dest_dir: str) -> int:
+    """目录移动/重命名：在一个事务中批量改写其下所有视频记录、扫描索引条目和目录的路径，返回更新的视频数量
+
+    与 update_video_path 一致，新 url 已被其他视频占用（唯一约束）的记录只改 local_path、保留原 url，
+    不让一条冲突回滚整个目录的关联；目标目录下残留的扫描索引条目和目录记录先删除
+    """
+    src_dir = os.path.abspath(src_dir)
+    dest_dir = os.path.abspath(dest_dir)
+    prefix = src_dir + os.sep
+    dest_prefix = dest_dir + os.sep
+    url_prefix = _file_url(prefix)
+    try:
+        videos = db.query(Video).filter(_prefix_match(Video.local_path, prefix)).update(
+            {Video.local_path: _replace_prefix(Video.local_path, src_dir, dest_dir)},
+            synchronize_session=False
+        )
+        new_url = _replace_prefix(Video.url, _file_url(src_dir), _file_url(dest_dir))
+        occupant = aliased(Video)
+        conflicts = db.query(Video).filter(
+            _prefix_match(Video.url, url_prefix), exists().where(occupant.url == new_url)
+        ).count()
+        db.query(Video).filter(
+            _prefix_match(Video.url, url_prefix), ~exists().where(occupant.url == new_url)
+        ).update({Video.url: new_url}, synchronize_session=False)
+        if conflicts:
+            logger.warning(f"⚠️ {conflicts} 个视频的新 url 已被占用，保留原 url: {src_dir} -> {dest_dir}")
+        # 目标路径上的旧条目是已不存在的文件（移动后目录内容以源目录为准），避免路径唯一约束冲突
+        db.query(ScanIndexEntry).filter(_prefix_match(ScanIndexEntry.path, dest_prefix)).delete(
+            synchronize_session=False
+        )
+        db.query(ScanDirectory).filter(
+            or_(ScanDirectory.path == dest_dir, _prefix_match(ScanDirectory.path, dest_prefix))
+        ).delete(synchronize_session=False)
+        db.query(ScanIndexEntry).filter(_prefix_match(ScanIndexEntry.path, prefix)).update(
+            {
+                ScanIndexEntry.path: _replace_prefix(ScanIndexEntry.path, src_dir, dest_dir),
+                ScanIndexEntry.directory: _replace_prefix(ScanIndexEntry.directory, src_dir, dest_dir)
+            },
+            synchronize_session=False
+        )
+        db.query(ScanDirectory).filter(
+            or_(ScanDirectory.path == src_dir, _prefix_match(ScanDirectory.path, prefix))
+        ).update(
+            {ScanDirectory.path: _replace_prefix(ScanDirectory.path, src_dir, dest_dir)},
+            synchronize_session=False
+        )
+        db.query(ScanDirectory).filter(
+            or_(ScanDirectory.parent == src_dir, _prefix_match(ScanDirectory.parent, prefix))
+        ).update(
+            {ScanDirectory.parent: _replace_prefix(ScanDirectory.parent, src_dir, dest_dir)},
+            synchronize_session=False
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    logger.info(f"🔗 目录移动，已批量关联 {videos} 个视频: {src_dir} -> {dest_dir}")
+    return videos
+
+
+def relink_by_inode(db, file_path: str) -> bool:
+    """按 inode/大小/mtime 查找原路径已不存在的扫描索引条目，找到时关联到新路径"""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return False
+    candidates = db.query(ScanIndexEntry).filter(
+        ScanIndexEntry.inode == stat.st_ino,
+        ScanIndexEntry.size == stat.st_size,
+        ScanIndexEntry.mtime == stat.st_mtime,
+        ScanIndexEntry.path != file_path
+    ).all()
+    for entry in candidates:
+        if not os.path.exists(entry.path):
+            logger.info(f"🔗 inode 相同，识别为移动的文件: {entry.path} -> {file_path}")
+            return relink_file(db, entry.path, file_path)
+    return False
+
+
+def moved_video(db, video_id: int) -> Optional[Video]:
+    """内容相同的已有视频，其文件已不存在时返回该视频（视为移动），否则返回 None"""
+    video = db.query(Video).filter(Video.id == video_id).first()
+    if video is None or (video.local_path and os.path.exists(video.local_path)):
+        return None
+    return video
+
+
+def relink_by_fingerprint(db, video_id: int, file_path: str, commit: bool = True) -> bool:
+    """内容相同的已有视频的文件已不存在时，视为移动：把该视频关联到新路径"""
+    video = moved_video(db, video_id)
+    if video is None:
+        return False
+    logger.info(f"🔗 指纹相同且原文件已不存在，识别为移动的文件: {video.local_path} -> {file_path}")
+    if video.local_path:
+        db.query(ScanIndexEntry).filter(ScanIndexEntry.path == video.local_path).delete(synchronize_session=False)
+    update_video_path(db, video, file_path)
+    if commit:
+        db.commit()
+    return True
@@ -0,0 +1,143 @@
+"""
+文件监控事件的导入工作线程
+单个常驻线程运行一个事件循环，处理文件监控事件和扫描结果：
+  - 有界队列：等待处理的路径数量达到上限时丢弃新事件（之后的全量扫描会补上）
+  - 按路径合并 + 防抖：同一路径在防抖时间内的多次事件只处理一次，每次新事件重新计时
+  - 并发上限：同时处理的文件数、同时计算指纹的文件数都可配置
+取代原先每个事件新建一个线程和事件循环的做法
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class IngestWorker:
+    """带防抖和并发上限的单线程导入队列"""
+
+    def __init__(self, handler: Callable[[str], Awaitable], max_queue: int = 5000,
+                 debounce_seconds: float = 2.0, concurrency: int = 4):
+        self.handler = handler
+        self.max_queue = max(max_queue, 1)
+        self.debounce_seconds = max(debounce_seconds, 0.0)
+        self.concurrency = max(concurrency, 1)
+
+        self._lock = threading.Lock()
+        self._pending: Dict[str, float] = {}  # 路径 → 到期时间（防抖结束）
+        self._running: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._thread: Optional[threading.Thread] = None
+        self._started = threading.Event()
+
+        self.submitted = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.processed = 0
+        self.failed = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._started.clear()
+            self._thread = threading.Thread(target=self._run_loop, name="ingest-worker", daemon=True)
+            self._thread.start()
+        self._started.wait()
+        logger.info(
+            f"📥 导入工作线程已启动: 队列上限 {self.max_queue}, 防抖 {self.debounce_seconds}秒, 并发 {self.concurrency}"
+        )
+
+    def _run_loop(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._wakeup = asyncio.Event()
+        self._started.set()
+        try:
+            self._loop.run_until_complete(self._dispatch())
+        finally:
+            self._loop.close()
+
+    def submit(self, path: str, debounce: Optional[float] = None) -> bool:
+        """提交路径（线程安全），同一路径未处理前的重复提交会合并并重新计时；队列已满时丢弃并返回 False"""
+        self.start()
+        delay = self.debounce_seconds if debounce is None else debounce
+        with self._lock:
+            self.submitted += 1
+            if path in self._pending:
+                self.coalesced += 1
+            elif len(self._pending) >= self.max_queue:
+                self.dropped += 1
+                logger.warning(f"⚠️ 导入队列已满（{self.max_queue}），丢弃事件: {path}")
+                return False
+            self._pending[path] = time.monotonic() + delay
+        self._loop.call_soon_threadsafe(self._wakeup.set)
+        return True
+
+    def run_coroutine(self, coro: Awaitable) -> asyncio.Task:
+        """在工作线程的事件循环中运行后台协程（须在该循环内调用），保留引用直到完成"""
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _dispatch(self):
+        while True:
+            self._wakeup.clear()
+            now = time.monotonic()
+            next_due = None
+            with self._lock:
+                for path, due in list(self._pending.items()):
+                    if len(self._running) >= self.concurrency:
+                        # 没有空闲槽位，处理完成时会再次唤醒
+                        next_due = None
+                        break
+                    if path in self._running:
+                        # 同一路径正在处理，处理完成后再执行
+                        continue
+                    if due > now:
+                        next_due = due if next_due is None else min(next_due, due)
+                        continue
+                    del self._pending[path]
+                    self._running.add(path)
+                    self.run_coroutine(self._process(path))
+
+            timeout = None if next_due is None else max(next_due - time.monotonic(), 0.01)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _process(self, path: str):
+        try:
+            await self.handler(path)
+            self.processed += 1
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"❌ 导入处理失败: {path}, 错误: {e}")
+        finally:
+            with self._lock:
+                self._running.discard(path)
+            self._wakeup.set()
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            return {
+                "running": self._thread is not None and self._thread.is_alive(),
+                "queue_depth": len(self._pending),
+                "in_flight": len(self._running),
+                "background_tasks": max(len(self._tasks) - len(self._running), 0),
+                "max_queue": self.max_queue,
+                "concurrency": self.concurrency,
+                "debounce_seconds": self.debounce_seconds,
+                "submitted": self.submitted,
+                "coalesced": self.coalesced,
+                "dropped": self.dropped,
+                "processed": self.processed,
+                "failed": self.failed
+            }
@@ -0,0 +1,290 @@
+"""
+本地视频库快照
+在内存中物化"监控目录中的视频文件 + 数据库处理状态"的列表：
+  - 文件部分由一次并行遍历建立（同时重建文件名索引），之后由文件监控事件增量更新
+  - 状态部分按 updated_at 增量同步（有节流），只读取变化的视频记录
+每次变化递增版本号，列表接口以版本号作为 ETag，未变化的轮询直接返回 304；
+排序/筛选结果按版本缓存，请求成本不再随视频库大小增长
+"""
+
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+
+from app.core.config import settings
+from app.core.database import SessionLocal, Video
+from app.services.file_index import file_index
+from app.services.library_walker import walk_library
+
+logger = logging.getLogger(__name__)
+
+VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mov', '.mkv', '.flv', '.wmv', '.webm', '.m4v'}
+
+# 数据库状态 → 前端处理状态
+STATUS_MAPPING = {
+    "pending": "unprocessed",
+    "processing": "processing",
+    "completed": "completed",
+    "failed": "failed"
+}
+
+SORT_KEYS = {
+    "modified_time": lambda item: item["modified_time"],
+    "name": lambda item: item["name"].lower(),
+    "size": lambda item: item["size"],
+    "status": lambda item: item["processing_status"]
+}
+
+# 每个版本最多缓存的排序/筛选结果数量
+MAX_CACHED_VIEWS = 32
+
+
+def is_listed_video(path: str) -> bool:
+    """是否为列表中展示的视频文件（过滤 macOS 元数据文件）"""
+    name = os.path.basename(path)
+    if name.startswith('._') or name.startswith('.DS_Store'):
+        return False
+    return os.path.splitext(name)[1].lower() in VIDEO_EXTENSIONS
+
+
+class LibrarySnapshot:
+    """本地视频库的内存快照"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._files: Dict[str, Dict] = {}  # 文件路径 → 文件信息
+        self._records: Dict[str, Dict] = {}  # 文件路径 → 视频记录状态
+        self._views: "OrderedDict[Tuple, List[Dict]]" = OrderedDict()
+        self._items: Optional[List[Dict]] = None
+        self._instance = uuid.uuid4().hex[:8]
+        self._rebuilding = False
+        self.root: Optional[str] = None
+        self.version = 0
+        self.built_at: Optional[float] = None
+        self._synced_at = 0.0
+        self._db_count: Optional[int] = None
+        self._db_since: Optional[datetime] = None
+
+    @property
+    def etag(self) -> str:
+        return f'"{self._instance}-{self.version}"'
+
+    def _changed(self):
+        self.version += 1
+        self._items = None
+        self._views.clear()
+
+    def _file_info(self, path: str, stat: Optional[os.stat_result] = None) -> Optional[Dict]:
+        if stat is None:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                return None
+        name = os.path.basename(path)
+        return {
+            "name": name,
+            "stem": os.path.splitext(name)[0],
+            "path": path,
+            "size": stat.st_size,
+            "size_mb": round(stat.st_size / (1024 * 1024), 2),
+            "modified_time": stat.st_mtime,
+            "extension": os.path.splitext(name)[1].lower(),
+            "relative_path": os.path.relpath(path, self.root)
+        }
+
+    @staticmethod
+    def _record_info(video: Video) -> Dict:
+        return {"id": video.id, "status": video.status, "title": video.title}
+
+    def build(self, root: str):
+        """并行遍历监控目录并从数据库完整建立快照，同时重建文件名索引（共用一次遍历）"""
+        started = time.time()
+        root = os.path.abspath(root)
+        paths = []
+        stats = {}
+        for listing in walk_library(root, stat_files=is_listed_video):
+            for path, stat in listing.files.items():
+                paths.append(path)
+                if stat is not None:
+                    stats[path] = stat
+        file_index.load(root, paths)
+        with self._lock:
+            self.root = root
+            self._files = {path: self._file_info(path, stat) for path, stat in stats.items()}
+            self._load_records()
+            self.built_at = time.time()
+            self._changed()
+        logger.info(f"📚 视频库快照已建立: {len(self._files)} 个视频, 耗时 {round(time.time() - started, 3)}秒")
+
+    def _load_records(self):
+        db = SessionLocal()
+        try:
+            records = {}
+            count = 0
+            since = None
+            for video in db.query(Video).filter(Video.platform == "local"):
+                count += 1
+                if video.updated_at and (since is None or video.updated_at > since):
+                    since = video.updated_at
+                if video.local_path:
+                    records[os.path.abspath(video.local_path)] = self._record_info(video)
+            self._records = records
+            self._db_count = count
+            self._db_since = since
+            self._synced_at = time.time()
+        finally:
+            db.close()
+
+    def _sync_records(self):
+        """增量同步数据库状态变化（节流）：只读取 updated_at 之后的记录，记录数减少时完整重新加载"""
+        if time.time() - self._synced_at < settings.LIBRARY_SNAPSHOT_SYNC_SECONDS:
+            return
+        db = SessionLocal()
+        try:
+            count, latest = db.query(func.count(Video.id), func.max(Video.updated_at)).filter(
+                Video.platform == "local"
+            ).one()
+            self._synced_at = time.time()
+            if count == self._db_count and (latest is None or (self._db_since and latest <= self._db_since)):
+                return
+            if self._db_count is not None and count < self._db_count:
+                # 有记录被删除，updated_at 无法反映，完整重新加载
+                self._load_records()
+                self._changed()
+                return
+
+            query = db.query(Video).filter(Video.platform == "local")
+            if self._db_since is not None:
+                query = query.filter(Video.updated_at > self._db_since)
+            for video in query:
+                if video.local_path:
+                    self._records[os.path.abspath(video.local_path)] = self._record_info(video)
+            self._db_count = count
+            self._db_since = latest
+            self._changed()
+        finally:
+            db.close()
+
+    def upsert_file(self, path: str):
+        """文件新增或修改"""
+        path = os.path.abspath(path)
+        with self._lock:
+            if self.built_at is None or not is_listed_video(path):
+                return
+            info = self._file_info(path)
+            if info:
+                self._files[path] = info
+                self._changed()
+
+    def remove_path(self, path: str):
+        """文件或目录被删除"""
+        path = os.path.abspath(path)
+        prefix = path + os.sep
+        with self._lock:
+            if self.built_at is None:
+                return
+            if path in self._files:
+                removed = [path]
+            else:
+                removed = [p for p in self._files if p.startswith(prefix)]
+            for p in removed:
+                del self._files[p]
+            if removed:
+                self._changed()
+
+    def move(self, src_path: str, dest_path: str):
+        """文件或目录被移动/重命名"""
+        src_path = os.path.abspath(src_path)
+        dest_path = os.path.abspath(dest_path)
+        with self._lock:
+            if self.built_at is None:
+                return
+            self.remove_path(src_path)
+            if os.path.isdir(dest_path):
+                for path in file_index.paths():
+                    if path.startswith(dest_path + os.sep):
+                        self.upsert_file(path)
+            else:
+                self.upsert_file(dest_path)
+
+    def _merged_items(self) -> List[Dict]:
+        """合并文件信息和记录状态（每个版本只合并一次）"""
+        if self._items is None:
+            items = []
+            for path, info in self._files.items():
+                record = self._records.get(path, {})
+                processing_status = STATUS_MAPPING.get(record.get("status"), "unprocessed")
+                item = {key: value for key, value in info.items() if key != "stem"}
+                item.update(
+                    title=record.get("title") or info["stem"],
+                    processing_status=processing_status,
+                    progress=100 if processing_status == "completed" else (None if processing_status == "processing" else 0),
+                    estimated_time=None,
+                    video_id=record.get("id"),
+                    db_status=record.get("status")
+                )
+                items.append(item)
+            self._items = items
+        return self._items
+
+    def _refresh_in_background(self, root: str):
+        """未开启文件监控时快照可能过期，定期在后台重建（重建期间继续返回旧快照）"""
+        if self._rebuilding:
+            return
+        self._rebuilding = True
+
+        def run():
+            try:
+                self.build(root)
+            except Exception as e:
+                logger.error(f"❌ 重建视频库快照失败: {e}")
+            finally:
+                self._rebuilding = False
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def query(self, root: str, watching: bool = True, sort: str = "modified_time", order: str = "desc",
+              status: Optional[str] = None, search: Optional[str] = None,
+              offset: int = 0, limit: Optional[int] = None) -> Tuple[str, Dict]:
+        """返回 (ETag, 当前版本排序、筛选、分页后的视频列表)"""
+        with self._lock:
+            if self.built_at is None or self.root != os.path.abspath(root):
+                self.build(root)
+            elif not watching and time.time() - self.built_at > settings.LIBRARY_SNAPSHOT_REFRESH_SECONDS:
+                self._refresh_in_background(root)
+            self._sync_records()
+
+            sort = sort if sort in SORT_KEYS else "modified_time"
+            key = (sort, order, status or None, (search or "").lower() or None)
+            view = self._views.get(key)
+            if view is None:
+                view = self._merged_items()
+                if status:
+                    view = [item for item in view if item["processing_status"] == status]
+                if key[3]:
+                    view = [item for item in view if key[3] in item["name"].lower()]
+                view = sorted(view, key=SORT_KEYS[sort], reverse=order != "asc")
+                self._views[key] = view
+                while len(self._views) > MAX_CACHED_VIEWS:
+                    self._views.popitem(last=False)
+            else:
+                self._views.move_to_end(key)
+
+            page = view[offset:offset + limit] if limit else view[offset:]
+            return self.etag, {
+                "videos": page,
+                "total_count": len(view),
+                "offset": offset,
+                "version": self.version
+            }
+
+
+# 全局视频库快照
+library_snapshot = LibrarySnapshot()
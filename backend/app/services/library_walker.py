@@ -0,0 +1,19 @@
+"""
+监控目录遍历
+所有全量遍历监控目录的地方（文件名索引、视频库快照、增量扫描）共用同一个 I/O 限速器，
+并行度和限速由 SCAN_WALK_WORKERS / SCAN_MAX_IOPS / SCAN_MAX_BYTES_PER_SECOND 配置
+"""
+
+from typing import Callable, Iterator, Optional
+
+from app.core.config import settings
+from app.utils.fs_walker import DirListing, IoThrottle, StatFilter, walk
+
+# 扫描共用的 I/O 限速器（目录列出、stat、扫描时的指纹读取）
+scan_throttle = IoThrottle(settings.SCAN_MAX_IOPS, settings.SCAN_MAX_BYTES_PER_SECOND)
+
+
+def walk_library(root: str, include: Optional[Callable[[str], bool]] = None,
+                 stat_files: StatFilter = False) -> Iterator[DirListing]:
+    """按配置的并行度和限速遍历 root"""
+    return walk(root, include, stat_files, workers=settings.SCAN_WALK_WORKERS, throttle=scan_throttle)
@@ -5,17 +5,27 @@
 
 import os
 import asyncio
-import hashlib
-from typing import List, Set
+import threading
+import time
+from typing import Dict, List
 from pathlib import Path
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 import logging
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
 from app.core.database import get_db, Video, LearningRecord, Transcript
 from app.models.schemas import VideoCreate
 from app.services.ai_service import ai_service
+from app.services.file_identity import resolve_fingerprint
+from app.services.file_index import file_index
+from app.services.file_relink import relink_by_fingerprint, relink_by_inode, relink_directory, relink_file
+from app.services.ingest_worker import IngestWorker
+from app.services.library_snapshot import library_snapshot
+from app.services.library_walker import scan_throttle
+from app.services.scan_index import scan_index
+from app.utils.file_completion import is_open_for_write, supports_close_write
 
 logger = logging.getLogger(__name__)
 
@@ -29,38 +39,62 @@ class VideoFileHandler(FileSystemEventHandler):
         
     def on_created(self, event):
         """文件创建事件"""
+        if not event.is_directory:
+            file_index.add(event.src_path)
+            library_snapshot.upsert_file(event.src_path)
         if not event.is_directory and self._is_video_file(event.src_path):
             logger.info(f"检测到新视频文件: {event.src_path}")
-            self._schedule_processing(event.src_path)
+            # 能收到关闭写入事件时等待该事件再处理，超时后重新排队，不凭修改时间判断写入完成
+            if self.scanner_service.close_write_active:
+                self.scanner_service.mark_write_pending(event.src_path)
+            self._schedule_processing(
+                event.src_path,
+                settings.WATCH_COMPLETE_FALLBACK_SECONDS if self.scanner_service.close_write_active else None
+            )
+    
+    def on_closed(self, event):
+        """文件关闭写入事件（Linux inotify IN_CLOSE_WRITE）：写入方已关闭文件，立即处理"""
+        if event.is_directory:
+            return
+        library_snapshot.upsert_file(event.src_path)
+        if self._is_video_file(event.src_path):
+            self.scanner_service.mark_write_closed(event.src_path)
+            self._schedule_processing(event.src_path, 0)
+    
+    def on_deleted(self, event):
+        """文件/目录删除事件"""
+        file_index.remove(event.src_path)
+        library_snapshot.remove_path(event.src_path)
+        self.scanner_service.write_closed.pop(event.src_path, None)
+        self.scanner_service.write_pending.pop(event.src_path, None)
+    
+    def on_modified(self, event):
+        """文件修改事件（写入中的文件大小/修改时间变化）"""
+        if not event.is_directory:
+            library_snapshot.upsert_file(event.src_path)
     
     def on_moved(self, event):
-        """文件移动事件"""
-        if not event.is_directory and self._is_video_file(event.dest_path):
+        """文件移动事件：已知文件原地关联到新路径，不重新处理"""
+        file_index.move(event.src_path, event.dest_path)
+        library_snapshot.move(event.src_path, event.dest_path)
+        self.scanner_service.write_pending.pop(event.src_path, None)
+        if event.is_directory:
+            # 目录移动：一个事务批量改写路径，之后逐个文件的移动事件直接识别为已知文件
+            self.scanner_service.relink_moved(event.src_path, event.dest_path, is_directory=True)
+            return
+        if self._is_video_file(event.dest_path) and self.scanner_service.relink_moved(event.src_path, event.dest_path):
+            logger.debug(f"视频文件移动，已关联已有记录: {event.src_path} -> {event.dest_path}")
+            return
+        if self._is_video_file(event.dest_path):
             logger.info(f"检测到移动的视频文件: {event.dest_path}")
-            self._schedule_processing(event.dest_path)
+            # 重命名/移入（IN_MOVED_TO）是原子操作，文件已完整
+            self.scanner_service.mark_write_closed(event.dest_path)
+            self._schedule_processing(event.dest_path, 0)
     
-    def _schedule_processing(self, file_path: str):
-        """安排处理任务（线程安全）"""
+    def _schedule_processing(self, file_path: str, debounce: float = None):
+        """安排处理任务（线程安全）：提交到导入工作线程，同一文件的连续事件合并处理"""
         try:
-            # 使用线程池执行器来处理异步任务
-            import threading
-            import concurrent.futures
-            
-            def run_processing():
-                # 创建新的事件循环
-                import asyncio
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                try:
-                    loop.run_until_complete(self.scanner_service.process_new_video(file_path))
-                finally:
-                    loop.close()
-            
-            # 在线程池中执行
-            thread = threading.Thread(target=run_processing)
-            thread.daemon = True
-            thread.start()
-            
+            self.scanner_service.ingest_worker.submit(file_path, debounce)
         except Exception as e:
             logger.error(f"安排处理任务失败: {e}")
     
@@ -86,68 +120,95 @@ class LocalVideoScanner:
     
     def __init__(self, watch_directory: str):
         self.watch_directory = Path(watch_directory)
-        self.processed_files: Set[str] = set()
         self.observer = None
         self.handler = VideoFileHandler(self)
+        self.ingest_worker = IngestWorker(
+            self.process_new_video,
+            max_queue=settings.WATCH_QUEUE_MAX,
+            debounce_seconds=settings.WATCH_DEBOUNCE_SECONDS,
+            concurrency=settings.WATCH_CONCURRENCY
+        )
+        self._hash_slots = threading.BoundedSemaphore(max(settings.WATCH_HASH_CONCURRENCY, 1))
+        # 文件路径 → 收到关闭写入/移入事件的时间
+        self.write_closed: Dict[str, float] = {}
+        # 文件路径 → 收到创建事件、尚未收到关闭写入事件的起始时间
+        self.write_pending: Dict[str, float] = {}
         
         # 确保监控目录存在
         self.watch_directory.mkdir(parents=True, exist_ok=True)
-        
-        # 加载已处理文件记录
-        self._load_processed_files()
     
-    def _load_processed_files(self):
-        """加载已处理的文件记录"""
-        cache_file = self.watch_directory / '.processed_videos.txt'
-        if cache_file.exists():
-            with open(cache_file, 'r', encoding='utf-8') as f:
-                self.processed_files = set(line.strip() for line in f.readlines())
+    @property
+    def close_write_active(self) -> bool:
+        """当前的文件监控能否收到关闭写入事件"""
+        return (settings.WATCH_CLOSE_WRITE_ENABLED and self.observer is not None
+                and self.observer.is_alive() and supports_close_write(self.observer))
     
-    def _save_processed_files(self):
-        """保存已处理的文件记录"""
-        cache_file = self.watch_directory / '.processed_videos.txt'
-        with open(cache_file, 'w', encoding='utf-8') as f:
-            for file_hash in self.processed_files:
-                f.write(f"{file_hash}\\n")
+    def mark_write_pending(self, file_path: str):
+        """记录文件刚被创建、写入方尚未关闭（只以关闭写入事件判断完成）"""
+        self.write_pending.setdefault(file_path, time.time())
     
-    def _get_file_hash(self, file_path: str) -> str:
-        """获取文件哈希值（用于缓存）"""
-        hasher = hashlib.md5()
-        file_path_obj = Path(file_path)
+    def mark_write_closed(self, file_path: str):
+        """记录文件已被写入方关闭（或原子移入）"""
+        self.write_pending.pop(file_path, None)
+        self.write_closed[file_path] = time.time()
+    
+    @property
+    def processed_count(self) -> int:
+        """扫描索引中已处理的文件数量"""
+        return scan_index.processed_count()
+    
+    def _get_file_fingerprint(self, file_path: str):
+        """获取文件内容指纹和内容相同的已有视频ID（抽样指纹，碰撞时才读取完整文件；限制同时计算的数量）"""
+        from app.core.database import SessionLocal
         
-        # 使用文件路径、大小和修改时间生成哈希
-        stat = file_path_obj.stat()
-        hash_input = f"{file_path_obj.name}_{stat.st_size}_{stat.st_mtime}"
-        hasher.update(hash_input.encode())
-        return hasher.hexdigest()
+        with self._hash_slots:
+            db = SessionLocal()
+            try:
+                return resolve_fingerprint(db, file_path, throttle=scan_throttle)
+            finally:
+                db.close()
     
-    def _get_file_fingerprint(self, file_path: str) -> str:
-        """获取文件内容指纹（SHA256）"""
-        sha256_hash = hashlib.sha256()
-        file_path_obj = Path(file_path)
+    def relink_moved(self, src_path: str, dest_path: str, is_directory: bool = False) -> bool:
+        """移动/重命名：已有视频记录原地改到新路径，返回是否为已知文件（无需重新处理）"""
+        from app.core.database import SessionLocal
         
+        db = SessionLocal()
         try:
-            with open(file_path_obj, "rb") as f:
-                # 分块读取文件以处理大文件
-                for byte_block in iter(lambda: f.read(4096), b""):
-                    sha256_hash.update(byte_block)
-            return sha256_hash.hexdigest()
+            if is_directory:
+                relink_directory(db, src_path, dest_path)
+                return True
+            return relink_file(db, src_path, dest_path)
         except Exception as e:
-            logger.error(f"计算文件指纹失败: {file_path}, 错误: {e}")
-            # 如果读取失败，使用文件大小和修改时间作为后备
-            stat = file_path_obj.stat()
-            fallback_input = f"{file_path_obj.name}_{stat.st_size}_{stat.st_mtime}"
-            return hashlib.sha256(fallback_input.encode()).hexdigest()
+            db.rollback()
+            logger.error(f"关联移动的文件失败: {src_path} -> {dest_path}, 错误: {e}")
+            return False
+        finally:
+            db.close()
     
-    async def scan_existing_videos(self) -> List[str]:
-        """扫描现有的视频文件"""
-        video_files = []
+    def _relink_by_inode(self, file_path: str) -> bool:
+        from app.core.database import SessionLocal
         
-        for file_path in self.watch_directory.rglob('*'):
-            if file_path.is_file() and self._is_video_file(str(file_path)):
-                file_hash = self._get_file_hash(str(file_path))
-                if file_hash not in self.processed_files:
-                    video_files.append(str(file_path))
+        db = SessionLocal()
+        try:
+            return relink_by_inode(db, file_path)
+        finally:
+            db.close()
+    
+    def _relink_by_fingerprint(self, video_id: int, file_path: str) -> bool:
+        from app.core.database import SessionLocal
+        
+        db = SessionLocal()
+        try:
+            return relink_by_fingerprint(db, video_id, file_path)
+        finally:
+            db.close()
+    
+    async def scan_existing_videos(self) -> List[str]:
+        """扫描现有的视频文件（增量扫描：只列出 mtime 变化的目录）"""
+        loop = asyncio.get_running_loop()
+        video_files = await loop.run_in_executor(
+            None, scan_index.scan, str(self.watch_directory), self.handler._is_video_file
+        )
         
         logger.info(f"发现 {len(video_files)} 个未处理的视频文件")
         return video_files
@@ -155,72 +216,100 @@ class LocalVideoScanner:
     async def process_new_video(self, file_path: str):
         """处理新增的视频文件"""
         try:
-            file_hash = self._get_file_hash(file_path)
+            # 检查是否已处理（扫描索引，文件 stat 变化后需要重新处理）
+            if scan_index.is_processed(file_path):
+                logger.debug(f"文件已处理（扫描索引），跳过: {file_path}")
+                return
+            
+            loop = asyncio.get_running_loop()
             
-            # 检查是否已处理（缓存检查）
-            if file_hash in self.processed_files:
-                logger.debug(f"文件已处理（缓存），跳过: {file_path}")
+            # 移动/重命名的已知文件（inode 相同、原路径已不存在）：关联已有记录，不计算指纹、不重新转录
+            if await loop.run_in_executor(None, self._relink_by_inode, file_path):
+                logger.info(f"已关联移动的视频文件: {file_path}")
                 return
             
-            # 等待文件写入完成
-            await self._wait_for_file_complete(file_path)
+            # 等待文件写入完成，仍在写入时稍后重新检查，不处理写了一半的文件
+            if not await self._wait_for_file_complete(file_path):
+                if os.path.exists(file_path):
+                    logger.info(f"⏳ 文件仍在写入，稍后重新检查: {file_path}")
+                    self.ingest_worker.submit(file_path, settings.WATCH_COMPLETE_FALLBACK_SECONDS)
+                return
             
-            # 计算文件内容指纹
-            file_fingerprint = self._get_file_fingerprint(file_path)
+            # 计算文件内容指纹（成本固定，与文件大小无关）
+            file_fingerprint, duplicate_id = await loop.run_in_executor(None, self._get_file_fingerprint, file_path)
             logger.info(f"计算文件指纹: {file_path} -> {file_fingerprint}")
             
-            # 检查数据库中是否已存在相同指纹的视频
-            if await self._check_duplicate_fingerprint(file_fingerprint):
+            # 内容相同的视频原文件已不存在：视为移动，把该视频关联到新路径
+            if duplicate_id and await loop.run_in_executor(None, self._relink_by_fingerprint, duplicate_id, file_path):
+                scan_index.mark_processed(file_path, file_fingerprint, duplicate_id)
+                logger.info(f"已关联移动的视频文件（指纹相同）: {file_path}")
+                return
+            
+            # 检查数据库中是否已存在相同内容的视频
+            if duplicate_id and await self._check_duplicate_completed(duplicate_id):
                 logger.info(f"检测到重复视频（指纹相同），跳过: {file_path}")
-                # 将此文件添加到已处理缓存，避免重复检查
-                self.processed_files.add(file_hash)
-                self._save_processed_files()
+                # 记入扫描索引，避免重复检查
+                scan_index.mark_processed(file_path, file_fingerprint, duplicate_id)
                 return
             
-            # 创建视频记录
+            # 创建视频记录（内容相同的视频尚未完成时不重复写入指纹，避免唯一约束冲突）
             video_data = {
                 "url": f"file://{file_path}",
                 "title": Path(file_path).stem,
                 "platform": "local",
                 "priority": 3,
-                "file_fingerprint": file_fingerprint
+                "file_fingerprint": None if duplicate_id else file_fingerprint
             }
             
             # 添加到处理队列
             result = await self._add_to_processing_queue(video_data, file_path)
             
             if result:
-                self.processed_files.add(file_hash)
-                self._save_processed_files()
+                scan_index.mark_processed(file_path, file_fingerprint)
                 logger.info(f"本地视频添加成功: {file_path}")
             
         except Exception as e:
             logger.error(f"处理本地视频失败: {file_path}, 错误: {e}")
     
-    async def _wait_for_file_complete(self, file_path: str, max_wait: int = 30):
-        """等待文件写入完成"""
-        file_path_obj = Path(file_path)
-        previous_size = 0
-        stable_count = 0
-        
-        for _ in range(max_wait):
-            if not file_path_obj.exists():
-                await asyncio.sleep(1)
-                continue
-                
-            current_size = file_path_obj.stat().st_size
-            if current_size == previous_size:
-                stable_count += 1
-                if stable_count >= 3:  # 文件大小稳定3秒
-                    break
+    async def _wait_for_file_complete(self, file_path: str, max_wait: int = 30) -> bool:
+        """等待文件写入完成，返回是否已完成（文件不存在或 max_wait 秒内未完成时返回 False）
+
+        收到关闭写入/移入事件且之后未再修改的文件立即视为完成。
+        inotify 可用且收到过创建事件的文件只等关闭写入事件，不凭修改时间判断（网络拷贝可能停顿很久），
+        直到等待超过 WATCH_CLOSE_WRITE_MAX_WAIT（事件丢失，如 inotify 队列溢出）才改用轮询兜底，且必定检查打开的写入句柄；
+        其余文件（扫描发现、无关闭写入事件的平台）轮询兜底：
+        文件超过 WATCH_STABLE_SECONDS 未修改（且可选检查没有进程以写入方式打开）视为完成
+        """
+        deadline = time.time() + max_wait
+        while True:
+            try:
+                stat = os.stat(file_path)
+            except FileNotFoundError:
+                return False
+            
+            closed_at = self.write_closed.get(file_path)
+            if closed_at is not None and stat.st_mtime <= closed_at:
+                self.write_closed.pop(file_path, None)
+                return True
+            
+            pending_since = self.write_pending.get(file_path)
+            if pending_since is not None and self.close_write_active:
+                if time.time() - pending_since < settings.WATCH_CLOSE_WRITE_MAX_WAIT:
+                    # 不占用导入槽位空等，重新排队；收到关闭写入事件时会立即重新提交
+                    return False
+                writing = is_open_for_write(file_path)
             else:
-                stable_count = 0
-                previous_size = current_size
+                writing = settings.WATCH_OPEN_HANDLE_CHECK and is_open_for_write(file_path)
+            if not writing and time.time() - stat.st_mtime >= settings.WATCH_STABLE_SECONDS:
+                self.write_pending.pop(file_path, None)
+                return True
             
+            if time.time() >= deadline:
+                return False
             await asyncio.sleep(1)
     
-    async def _check_duplicate_fingerprint(self, fingerprint: str) -> bool:
-        """检查数据库中是否已存在相同指纹的已完成视频"""
+    async def _check_duplicate_completed(self, video_id: int) -> bool:
+        """检查内容相同的已有视频是否已完成处理"""
         try:
             from app.core.database import SessionLocal, Video
             
@@ -228,7 +317,7 @@ class LocalVideoScanner:
             try:
                 # 只有状态为completed的视频才算重复
                 existing_video = db.query(Video).filter(
-                    Video.file_fingerprint == fingerprint,
+                    Video.id == video_id,
                     Video.status == "completed"
                 ).first()
                 return existing_video is not None
@@ -262,7 +351,8 @@ class LocalVideoScanner:
                     platform=video_data["platform"],
                     local_path=file_path,
                     file_fingerprint=video_data["file_fingerprint"],
-                    status="processing"  # 直接设置为处理中
+                    status="pending",
+                    retry_count=0
                 )
                 db.add(video)
                 db.flush()  # 获取ID
@@ -278,24 +368,15 @@ class LocalVideoScanner:
                 
                 logger.info(f"视频记录创建成功，ID: {video.id}")
                 
-                # 异步启动处理任务
-                try:
-                    # 尝试在当前事件循环中创建任务
-                    asyncio.create_task(self._process_video_async(video.id, file_path))
-                except RuntimeError:
-                    # 如果没有运行的事件循环，创建新线程处理
-                    import threading
-                    def run_processing():
-                        loop = asyncio.new_event_loop()
-                        asyncio.set_event_loop(loop)
-                        try:
-                            loop.run_until_complete(self._process_video_async(video.id, file_path))
-                        finally:
-                            loop.close()
-                    
-                    thread = threading.Thread(target=run_processing)
-                    thread.daemon = True
-                    thread.start()
+                # 提交到Celery队列由 worker 转录（不在导入工作线程的事件循环里转录，避免阻塞事件处理）
+                from app.tasks.video_tasks import preview_video_task, process_video_task
+                if settings.PREVIEW_ENABLED:
+                    task = preview_video_task.delay(video.id)
+                else:
+                    task = process_video_task.delay(video.id)
+                video.task_id = task.id
+                db.commit()
+                logger.info(f"🚀 视频已提交到Celery队列: video_id={video.id}, task_id={task.id}")
                 
                 return True
                 
@@ -310,94 +391,6 @@ class LocalVideoScanner:
             logger.error(f"添加视频到处理队列失败: {e}")
             return False
     
-    async def _process_video_async(self, video_id: int, file_path: str):
-        """异步处理视频"""
-        try:
-            from app.services.ai_service import ai_service
-            from app.core.database import SessionLocal, Video
-            
-            logger.info(f"开始自动处理视频 ID: {video_id}, 路径: {file_path}")
-            
-            # 模拟处理进度
-            db = SessionLocal()
-            try:
-                # 更新状态为处理中
-                video = db.query(Video).filter(Video.id == video_id).first()
-                if video:
-                    video.status = "processing"
-                    db.commit()
-                
-                # 真实的视频处理步骤
-                logger.info(f"开始使用Whisper处理视频 {video_id}: {file_path}")
-                
-                from datetime import datetime
-                import time
-                start_time = time.time()
-                
-                try:
-                    # 使用AI服务进行真实的字幕提取
-                    logger.info(f"正在提取音频并转录字幕: {file_path}")
-                    
-                    # 直接对视频文件进行转录（faster-whisper支持直接处理视频）
-                    transcript_data = await ai_service.transcribe_video(file_path)
-                    
-                    processing_time = int(time.time() - start_time)
-                    logger.info(f"字幕提取完成，耗时 {processing_time} 秒")
-                    
-                    # 创建字幕记录
-                    transcript = Transcript(
-                        video_id=video_id,
-                        original_text=transcript_data.get("original_text", ""),
-                        cleaned_text=transcript_data.get("cleaned_text", transcript_data.get("original_text", "")),
-                        summary=transcript_data.get("summary", ""),
-                        tags=transcript_data.get("tags", ""),
-                        language=transcript_data.get("language", "zh"),
-                        confidence_score=transcript_data.get("confidence_score", 0.0),
-                        processing_time=processing_time
-                    )
-                    db.add(transcript)
-                    logger.info(f"字幕记录已保存到数据库")
-                    
-                    # 更新为完成状态
-                    if video:
-                        video.status = "completed"
-                        db.commit()
-                        
-                except Exception as transcribe_error:
-                    logger.error(f"字幕提取失败: {transcribe_error}")
-                    processing_time = int(time.time() - start_time)
-                    # 转录失败，检查重试次数
-                    if video:
-                        retry_count = video.retry_count or 0
-                        if retry_count < 3:  # 最多重试3次
-                            video.status = "pending"  # 重新排队
-                            video.retry_count = retry_count + 1
-                            logger.info(f"转录失败，重新排队重试 ({retry_count + 1}/3): {file_path}")
-                        else:
-                            video.status = "failed"  # 重试次数用完，标记为失败
-                            logger.error(f"转录失败次数过多，标记为失败: {file_path}")
-                        db.commit()
-                    
-            except Exception as e:
-                logger.error(f"处理视频 {video_id} 失败: {e}")
-                # 处理异常，检查重试次数
-                video = db.query(Video).filter(Video.id == video_id).first()
-                if video:
-                    retry_count = video.retry_count or 0
-                    if retry_count < 3:  # 最多重试3次
-                        video.status = "pending"  # 重新排队
-                        video.retry_count = retry_count + 1
-                        logger.info(f"处理异常，重新排队重试 ({retry_count + 1}/3): video_id={video_id}")
-                    else:
-                        video.status = "failed"  # 重试次数用完，标记为失败
-                        logger.error(f"处理异常次数过多，标记为失败: video_id={video_id}")
-                    db.commit()
-            finally:
-                db.close()
-                
-        except Exception as e:
-            logger.error(f"异步处理视频失败: {e}")
-    
     def _is_video_file(self, file_path: str) -> bool:
         """检查是否为支持的视频文件"""
         return Path(file_path).suffix.lower() in self.handler.SUPPORTED_EXTENSIONS
@@ -405,6 +398,8 @@ class LocalVideoScanner:
     def start_watching(self):
         """开始监控文件夹"""
         try:
+            # 监控期间由文件事件维护文件名索引和视频库快照，启动时先完整建立一次
+            library_snapshot.build(str(self.watch_directory))
             self.observer = Observer()
             self.observer.schedule(self.handler, str(self.watch_directory), recursive=True)
             self.observer.start()
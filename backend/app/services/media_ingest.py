@@ -0,0 +1,199 @@
+"""
+单次读取的媒体导入
+用 PyAV 打开文件一次、顺序解复用一遍，同时得到：
+  - 16kHz 单声道 PCM（写入解码音频缓存，转录时直接内存映射读取）
+  - 容器/音视频流元数据（时长、码率、分辨率、编码等）
+  - 关键帧缩略图（视频解码器只解码关键帧）
+取代原先转录解码、提取音频、探测元数据各自重复读取文件的做法
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+
+
+@dataclass
+class IngestResult:
+    audio: Optional[np.ndarray]
+    metadata: Dict = field(default_factory=dict)
+    thumbnail_path: Optional[str] = None
+    seconds: float = 0.0
+
+
+def _stream_rate(stream) -> Optional[float]:
+    rate = stream.average_rate or stream.base_rate
+    return round(float(rate), 3) if rate else None
+
+
+def _save_thumbnail(frame, thumbnail_path: str, width: int):
+    """把视频帧缩放后保存为 JPEG"""
+    image = frame.to_image()
+    if image.width > width:
+        image = image.resize((width, max(int(image.height * width / image.width), 1)))
+    path = Path(thumbnail_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp.jpg")
+    image.save(tmp_path, format="JPEG", quality=85)
+    tmp_path.replace(path)
+
+
+def ingest_media(file_path: str, thumbnail_path: Optional[str] = None, decode_audio: bool = True,
+                 thumbnail_at: float = 5.0, thumbnail_width: int = 480) -> IngestResult:
+    """单次顺序读取文件，返回 PCM、元数据和缩略图路径
+
+    缩略图取 thumbnail_at 秒之后的第一个关键帧（跳过片头黑屏），视频更短时取第一个关键帧
+    """
+    import av
+
+    started = time.time()
+    chunks = []
+    thumbnail_saved = None
+
+    with av.open(file_path, mode="r", metadata_errors="ignore") as container:
+        audio_stream = container.streams.audio[0] if container.streams.audio else None
+        video_stream = container.streams.video[0] if container.streams.video else None
+
+        metadata = {
+            "container": container.format.name,
+            "duration": round(container.duration / av.time_base, 3) if container.duration else None,
+            "bit_rate": container.bit_rate or None,
+            "file_size": Path(file_path).stat().st_size
+        }
+        if audio_stream is not None:
+            metadata.update(
+                audio_codec=audio_stream.codec_context.name,
+                sample_rate=audio_stream.codec_context.sample_rate,
+                channels=getattr(audio_stream.codec_context, "channels", None)
+            )
+        if video_stream is not None:
+            metadata.update(
+                video_codec=video_stream.codec_context.name,
+                width=video_stream.codec_context.width,
+                height=video_stream.codec_context.height,
+                fps=_stream_rate(video_stream)
+            )
+
+        streams = []
+        resampler = None
+        if decode_audio and audio_stream is not None:
+            audio_stream.thread_type = "AUTO"
+            resampler = av.AudioResampler(format="s16", layout="mono", rate=SAMPLE_RATE)
+            streams.append(audio_stream)
+
+        want_thumbnail = thumbnail_path is not None and video_stream is not None
+        fallback_frame = None
+        if want_thumbnail:
+            # 只解码关键帧，缩略图不需要完整解码视频
+            video_stream.codec_context.skip_frame = "NONKEY"
+            streams.append(video_stream)
+
+        if streams:
+            for packet in container.demux(*streams):
+                if packet.stream is audio_stream:
+                    for frame in packet.decode():
+                        for resampled in resampler.resample(frame):
+                            chunks.append(resampled.to_ndarray().reshape(-1))
+                elif want_thumbnail and thumbnail_saved is None:
+                    for frame in packet.decode():
+                        if fallback_frame is None:
+                            fallback_frame = frame
+                        if frame.time is not None and frame.time >= thumbnail_at:
+                            _save_thumbnail(frame, thumbnail_path, thumbnail_width)
+                            thumbnail_saved = thumbnail_path
+                            fallback_frame = None
+                            break
+                    if thumbnail_saved and resampler is None:
+                        break
+
+            if resampler is not None:
+                for resampled in resampler.resample(None):
+                    chunks.append(resampled.to_ndarray().reshape(-1))
+
+        if want_thumbnail and thumbnail_saved is None and fallback_frame is not None:
+            _save_thumbnail(fallback_frame, thumbnail_path, thumbnail_width)
+            thumbnail_saved = thumbnail_path
+
+    audio = None
+    if decode_audio and audio_stream is not None:
+        audio = (np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.int16)).astype(np.float32) / 32768.0
+        if not metadata["duration"]:
+            metadata["duration"] = round(audio.shape[0] / SAMPLE_RATE, 3)
+
+    result = IngestResult(audio, metadata, thumbnail_saved, round(time.time() - started, 2))
+    logger.info(
+        f"📥 单次导入完成: {Path(file_path).name}, 时长 {metadata.get('duration')}秒, "
+        f"音频 {'已解码' if audio is not None else '跳过'}, 缩略图 {'已生成' if thumbnail_saved else '无'}, "
+        f"耗时 {result.seconds}秒"
+    )
+    return result
+
+
+def thumbnail_path_for(video_id: int) -> str:
+    return str(Path(settings.THUMBNAIL_DIR) / f"{video_id}.jpg")
+
+
+def ingest_video(db, video, fingerprint: Optional[str] = None) -> Optional[IngestResult]:
+    """为视频记录执行单次导入并保存结果（音频写入解码缓存，元数据和缩略图写入数据库）
+
+    音频已缓存、元数据和缩略图都已存在时直接跳过；fingerprint 为空时不缓存音频。
+    缩略图文件按视频ID命名，只有本视频的媒体信息记录已存在时才沿用磁盘上的缩略图，
+    否则可能是已删除视频（ID被复用）遗留的文件，重新生成覆盖
+    """
+    from app.core.database import VideoMediaInfo
+    from app.services.audio_cache import audio_cache
+
+    cache_audio = settings.AUDIO_CACHE_ENABLED and fingerprint is not None
+    need_audio = cache_audio and not audio_cache.contains(fingerprint)
+    has_info = db.query(VideoMediaInfo.id).filter(VideoMediaInfo.video_id == video.id).first() is not None
+    thumbnail_path = thumbnail_path_for(video.id)
+    need_thumbnail = not video.thumbnail_url
+    if need_thumbnail and has_info and Path(thumbnail_path).exists():
+        video.thumbnail_url = f"/api/local-videos/thumbnail/{video.id}"
+        need_thumbnail = False
+    if not need_audio and has_info and not need_thumbnail:
+        db.commit()
+        return None
+
+    try:
+        result = ingest_media(
+            video.local_path,
+            thumbnail_path=thumbnail_path if need_thumbnail else None,
+            decode_audio=need_audio,
+            thumbnail_at=settings.THUMBNAIL_AT_SECONDS,
+            thumbnail_width=settings.THUMBNAIL_WIDTH
+        )
+    except Exception as e:
+        logger.warning(f"⚠️ 单次导入失败，转录时再解码: {video.local_path}, 错误: {e}")
+        return None
+
+    if result.audio is not None:
+        audio_cache.put(fingerprint, result.audio)
+        # 数组已写入缓存，转录时改为内存映射读取
+        result.audio = None
+
+    metadata = result.metadata
+    info = db.query(VideoMediaInfo).filter(VideoMediaInfo.video_id == video.id).first()
+    if not info:
+        info = VideoMediaInfo(video_id=video.id)
+        db.add(info)
+    for key in ("container", "duration", "bit_rate", "audio_codec", "sample_rate", "channels",
+                "video_codec", "width", "height", "fps"):
+        setattr(info, key, metadata.get(key))
+
+    if metadata.get("duration"):
+        video.duration = int(round(metadata["duration"]))
+    video.file_size = metadata.get("file_size") or video.file_size
+    if result.thumbnail_path:
+        video.thumbnail_url = f"/api/local-videos/thumbnail/{video.id}"
+    db.commit()
+    return result
@@ -0,0 +1,247 @@
+"""
+模型注册表
+在内存预算内同时保留多个 (模型名, 设备, 计算类型) 的模型实例，按最近使用顺序淘汰；
+支持在后台加载替换模型，加载完成前旧模型继续提供服务（切换设备、升级模型不中断转录）
+"""
+
+import gc
+import logging
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# (模型名, 设备, 计算类型)
+ModelKey = Tuple[str, str, str]
+
+# 各模型的大致参数量，用于估算内存占用
+MODEL_PARAMS = {
+    "tiny": 39_000_000,
+    "base": 74_000_000,
+    "small": 244_000_000,
+    "medium": 769_000_000,
+    "large": 1_550_000_000,
+    "large-v1": 1_550_000_000,
+    "large-v2": 1_550_000_000,
+    "large-v3": 1_550_000_000,
+    "large-v3-turbo": 809_000_000,
+    "turbo": 809_000_000,
+    "distil-large-v3": 756_000_000,
+}
+
+BYTES_PER_PARAM = {
+    "float32": 4,
+    "float16": 2,
+    "bfloat16": 2,
+    "int8_float16": 1,
+    "int8_bfloat16": 1,
+    "int8_float32": 1,
+    "int8": 1,
+}
+
+
+def estimate_model_bytes(key: ModelKey) -> int:
+    """估算模型实例占用的内存/显存"""
+    model_name, _, compute_type = key
+    bytes_per_param = BYTES_PER_PARAM.get(compute_type, 2)
+
+    params = MODEL_PARAMS.get(model_name.split("/")[-1].replace("faster-whisper-", ""))
+    if params:
+        return params * bytes_per_param
+
+    # 本地路径：按模型权重文件大小估算（权重按 float16 存储）
+    weights = Path(model_name) / "model.bin"
+    if weights.exists():
+        return int(weights.stat().st_size / 2 * bytes_per_param)
+    return MODEL_PARAMS["small"] * bytes_per_param
+
+
+class ModelEntry:
+    """已加载的模型实例"""
+
+    def __init__(self, key: ModelKey, model, size_bytes: int, load_seconds: float):
+        self.key = key
+        self.model = model
+        self.size_bytes = size_bytes
+        self.load_seconds = load_seconds
+        self.loaded_at = time.time()
+        self.last_used = self.loaded_at
+        self.uses = 0
+
+
+class ModelRegistry:
+    """进程内的多模型注册表（LRU + 内存预算）"""
+
+    def __init__(self, max_bytes: int, max_models: int):
+        self.max_bytes = max_bytes
+        self.max_models = max(max_models, 1)
+        self._entries: "OrderedDict[ModelKey, ModelEntry]" = OrderedDict()
+        self._lock = threading.RLock()
+        # 正在加载的模型: key -> 加载完成事件
+        self._loading: Dict[ModelKey, threading.Event] = {}
+        # 后台替换中的模型: 新 key -> 加载完成前继续服务的旧 key
+        self._replacing: Dict[ModelKey, ModelKey] = {}
+        self.evictions = 0
+
+    def get(self, key: ModelKey, loader: Callable[[ModelKey], object]):
+        """获取模型实例，未加载时同步加载
+
+        key 正在后台替换加载时，返回仍驻留的旧模型，不阻塞当前任务
+        """
+        return self.get_with_key(key, loader)[0]
+
+    def get_with_key(self, key: ModelKey, loader: Callable[[ModelKey], object]) -> Tuple[object, ModelKey]:
+        """获取模型实例及实际提供服务的 key（后台替换期间为旧模型的 key，结果缓存和检查点应按它标记）"""
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    return self._touch(entry), entry.key
+
+                previous = self._replacing.get(key)
+                if previous is not None and previous in self._entries:
+                    entry = self._entries[previous]
+                    return self._touch(entry), entry.key
+
+                event = self._loading.get(key)
+                if event is None:
+                    event = threading.Event()
+                    self._loading[key] = event
+                    break
+
+            # 其他线程正在加载同一模型，等待其完成后重新查找
+            event.wait()
+
+        try:
+            entry = self._load(key, loader)
+        finally:
+            with self._lock:
+                self._loading.pop(key, None)
+            event.set()
+        return self._touch(entry), entry.key
+
+    def swap_async(self, old_key: Optional[ModelKey], new_key: ModelKey,
+                   loader: Callable[[ModelKey], object]) -> bool:
+        """后台加载 new_key，加载完成前对 new_key 的请求由 old_key 提供服务，完成后卸载旧模型"""
+        with self._lock:
+            if new_key in self._entries or new_key in self._loading:
+                return False
+            event = threading.Event()
+            self._loading[new_key] = event
+            if old_key and old_key in self._entries:
+                self._replacing[new_key] = old_key
+
+        def _swap():
+            try:
+                self._load(new_key, loader, keep=old_key)
+                logger.info(f"🔁 模型热切换完成: {old_key} -> {new_key}")
+                if old_key and old_key != new_key:
+                    self.unload(old_key)
+            except Exception as e:
+                logger.error(f"❌ 后台加载替换模型失败，继续使用旧模型: {new_key}, 错误: {e}")
+            finally:
+                with self._lock:
+                    self._loading.pop(new_key, None)
+                    self._replacing.pop(new_key, None)
+                event.set()
+
+        threading.Thread(target=_swap, name="model-swap", daemon=True).start()
+        logger.info(f"⏳ 后台加载替换模型: {new_key}")
+        return True
+
+    def _touch(self, entry: ModelEntry):
+        with self._lock:
+            entry.last_used = time.time()
+            entry.uses += 1
+            if entry.key in self._entries:
+                self._entries.move_to_end(entry.key)
+        return entry.model
+
+    def _load(self, key: ModelKey, loader: Callable[[ModelKey], object], keep: Optional[ModelKey] = None) -> ModelEntry:
+        """加载模型：先按预算腾出空间（keep 指定的模型不淘汰），再加载并登记"""
+        size_bytes = estimate_model_bytes(key)
+        self._make_room(size_bytes, keep)
+
+        logger.info(f"🤖 正在加载模型: {key}, 预计占用 {size_bytes / 1024 / 1024:.0f}MB")
+        started = time.time()
+        model = loader(key)
+        entry = ModelEntry(key, model, size_bytes, time.time() - started)
+
+        with self._lock:
+            self._entries[key] = entry
+        logger.info(f"✅ 模型加载完成: {key}, 耗时 {entry.load_seconds:.1f}秒")
+        return entry
+
+    def _make_room(self, incoming_bytes: int, keep: Optional[ModelKey] = None):
+        """按最近最少使用顺序淘汰模型，直到能容纳新模型"""
+        evicted = []
+        with self._lock:
+            for key in list(self._entries.keys()):
+                used = sum(entry.size_bytes for entry in self._entries.values())
+                if used + incoming_bytes <= self.max_bytes and len(self._entries) < self.max_models:
+                    break
+                if key == keep:
+                    continue
+                evicted.append(self._entries.pop(key))
+                self.evictions += 1
+
+        for entry in evicted:
+            logger.info(f"🧹 淘汰模型: {entry.key}, 释放约 {entry.size_bytes / 1024 / 1024:.0f}MB")
+        if evicted:
+            del evicted
+            gc.collect()
+
+    def unload(self, key: ModelKey) -> bool:
+        """卸载指定模型（正在使用该模型的任务持有引用，完成后才真正释放）"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        logger.info(f"🗑️ 卸载模型: {key}")
+        del entry
+        gc.collect()
+        return True
+
+    def clear(self) -> int:
+        """卸载全部模型"""
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+        gc.collect()
+        return count
+
+    def status(self) -> Dict:
+        """注册表状态"""
+        with self._lock:
+            models: List[Dict] = [
+                {
+                    "model": entry.key[0],
+                    "device": entry.key[1],
+                    "compute_type": entry.key[2],
+                    "size_mb": round(entry.size_bytes / 1024 / 1024, 1),
+                    "load_seconds": round(entry.load_seconds, 1),
+                    "uses": entry.uses,
+                    "idle_seconds": round(time.time() - entry.last_used, 1)
+                }
+                for entry in reversed(self._entries.values())
+            ]
+            return {
+                "models": models,
+                "loading": [list(key) for key in self._loading],
+                "used_mb": round(sum(entry.size_bytes for entry in self._entries.values()) / 1024 / 1024, 1),
+                "max_mb": round(self.max_bytes / 1024 / 1024, 1),
+                "max_models": self.max_models,
+                "evictions": self.evictions
+            }
+
+
+# 进程内共享的模型注册表
+model_registry = ModelRegistry(
+    max_bytes=settings.MODEL_REGISTRY_MAX_BYTES,
+    max_models=settings.MODEL_REGISTRY_MAX_MODELS
+)
@@ -0,0 +1,75 @@
+"""
+默认模型的跨进程同步与模型名单
+热切换默认模型时把新模型名写入 Redis，各 Celery worker 子进程在执行任务前读取并切换（后台加载，旧模型继续服务），
+模型服务收到预加载请求后同样在后台加载；所有按任务指定或切换的模型名都必须在允许名单内
+"""
+
+import logging
+from typing import List, Optional
+
+import redis
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_KEY = "video_learning:default_model"
+
+
+def allowed_models() -> List[str]:
+    """允许使用的模型名：WHISPER_ALLOWED_MODELS，加上配置中使用的默认、草稿和预览模型"""
+    names = [name.strip() for name in settings.WHISPER_ALLOWED_MODELS.split(",") if name.strip()]
+    for configured in (settings.WHISPER_MODEL, settings.CASCADE_DRAFT_MODEL, settings.PREVIEW_MODEL):
+        if configured and configured not in names:
+            names.append(configured)
+    return names
+
+
+def validate_model_name(model_name: str) -> str:
+    """检查模型名在允许名单内，否则抛出 ValueError（避免任意下载/加载模型）"""
+    if model_name not in allowed_models():
+        raise ValueError(f"不允许的模型: {model_name}，可选: {', '.join(allowed_models())}")
+    return model_name
+
+
+def _client() -> redis.Redis:
+    return redis.Redis.from_url(settings.REDIS_URL, socket_timeout=2)
+
+
+def publish_default_model(model_name: str) -> bool:
+    """写入新的默认模型，返回是否写入成功"""
+    try:
+        _client().set(DEFAULT_MODEL_KEY, model_name)
+        return True
+    except Exception as e:
+        logger.warning(f"⚠️ 发布默认模型失败: {e}")
+        return False
+
+
+def load_default_model() -> Optional[str]:
+    """读取已发布的默认模型，未发布或读取失败时返回 None"""
+    try:
+        value = _client().get(DEFAULT_MODEL_KEY)
+    except Exception as e:
+        logger.warning(f"⚠️ 读取默认模型失败: {e}")
+        return None
+    return value.decode() if value else None
+
+
+def sync_default_model(service) -> bool:
+    """把当前进程的 AI 服务切换到已发布的默认模型（后台加载），返回是否发起了切换"""
+    model_name = load_default_model()
+    if not model_name or model_name == service.model_name:
+        return False
+    try:
+        validate_model_name(model_name)
+    except ValueError as e:
+        logger.warning(f"⚠️ 忽略已发布的默认模型: {e}")
+        return False
+
+    previous_key = service._model_key()
+    settings.WHISPER_MODEL = model_name
+    service.model_name = model_name
+    service.swap_model_async(previous_key)
+    logger.info(f"🔁 已同步默认模型: {previous_key[0]} -> {model_name}")
+    return True
@@ -0,0 +1,337 @@
+"""
+常驻模型服务
+独立的长生命周期进程，通过 Unix socket 对外提供转录服务：
+所有 Celery worker 和 FastAPI 进程共享同一份已加载的模型，
+模型只在服务启动时加载一次，内存/显存占用不再随 worker 数量成倍增长，
+worker 按 max_tasks_per_child 重启也不再需要重新加载模型。
+
+启动方式:
+    MODEL_SERVER_AUTHKEY=<随机密钥> python -m app.services.model_server
+    （连接使用 pickle 传输消息，必须设置认证密钥，服务端和客户端使用同一个密钥）
+
+协议（multiprocessing.connection，每个请求一个连接）:
+    请求  {"op": "transcribe", "model": 模型名, "media": 文件路径或音频数组, "fingerprint": 指纹,
+           "start_offset": 秒, "priority": 优先级（越小越优先）, "options": 传给 model.transcribe 的参数}
+    响应  {"type": "info", "model": 实际使用的模型, ...} -> 若干 {"type": "segment", ...} -> {"type": "done"}
+          出错时返回 {"type": "error", "error": 错误信息}
+    请求  {"op": "health"} -> 服务状态、已加载模型、排队数量、已处理请求数
+    请求  {"op": "preload", "model": 模型名} -> {"type": "ok", "loading": 是否开始后台加载}
+          热切换默认模型：后台加载新模型，加载完成前对新模型的请求由当前默认模型服务
+"""
+
+import logging
+import os
+import queue
+import itertools
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+from types import SimpleNamespace
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+
+# 请求优先级：预览请求排在普通转录请求之前
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+
+
+class ModelServer:
+    """持有已加载模型、串行执行转录请求的模型服务"""
+
+    def __init__(self, address: str, authkey: bytes, max_queue: int = 32):
+        if not authkey:
+            raise ValueError("未设置 MODEL_SERVER_AUTHKEY，模型服务拒绝启动")
+        self.address = address
+        self.authkey = authkey
+        self._service = None
+        self.jobs: "queue.PriorityQueue" = queue.PriorityQueue(maxsize=max_queue)
+        # 同优先级按到达顺序执行
+        self._sequence = itertools.count()
+        self.started_at = time.time()
+        self.processed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.current_job: Optional[str] = None
+
+    def _get_service(self):
+        from app.services.ai_service import AITranscriptionService
+
+        if self._service is None:
+            # 复用AI服务的设备、计算类型和模型路径选择逻辑（加载前校验模型名单）
+            self._service = AITranscriptionService()
+        return self._service
+
+    def _load_model(self, model_name: str):
+        """获取模型实例及实际提供服务的模型键（由模型注册表管理，可同时驻留多个模型；热切换期间可能是旧模型）"""
+        from app.services.model_registry import model_registry
+
+        service = self._get_service()
+        return model_registry.get_with_key(service._model_key(model_name), service._load_whisper_model)
+
+    def preload(self, model_name: str) -> Dict:
+        """切换默认模型：后台加载新模型，加载完成前对新模型的请求由当前默认模型服务"""
+        from app.services.model_registry import model_registry
+        from app.services.model_selection import validate_model_name
+
+        try:
+            validate_model_name(model_name)
+        except ValueError as e:
+            return {"type": "error", "error": str(e)}
+
+        service = self._get_service()
+        previous_key = service._model_key(settings.WHISPER_MODEL)
+        settings.WHISPER_MODEL = model_name
+        loading = model_registry.swap_async(previous_key, service._model_key(model_name), service._load_whisper_model)
+        logger.info(f"🔁 模型服务默认模型切换为 {model_name}{'，正在后台加载' if loading else ''}")
+        return {"type": "ok", "loading": loading}
+
+    def health(self) -> Dict:
+        """服务健康状态"""
+        from app.services.model_registry import model_registry
+
+        uptime = time.time() - self.started_at
+        return {
+            "status": "ok",
+            "pid": os.getpid(),
+            "uptime_seconds": round(uptime, 1),
+            "models": model_registry.status()["models"],
+            "queue_size": self.jobs.qsize(),
+            "queue_capacity": self.jobs.maxsize,
+            "current_job": self.current_job,
+            "processed": self.processed,
+            "failed": self.failed,
+            "utilization": round(self.busy_seconds / uptime, 4) if uptime > 0 else 0.0
+        }
+
+    def _handle_connection(self, conn):
+        """读取请求：健康检查直接应答，转录请求进入队列"""
+        try:
+            request = conn.recv()
+            op = request.get("op")
+            if op == "health":
+                conn.send(self.health())
+                conn.close()
+                return
+            if op == "preload":
+                conn.send(self.preload(request.get("model")))
+                conn.close()
+                return
+            if op != "transcribe":
+                conn.send({"type": "error", "error": f"未知操作: {op}"})
+                conn.close()
+                return
+
+            try:
+                priority = request.get("priority", PRIORITY_NORMAL)
+                self.jobs.put_nowait((priority, next(self._sequence), request, conn))
+            except queue.Full:
+                conn.send({"type": "error", "error": "模型服务繁忙，请求队列已满"})
+                conn.close()
+        except Exception as e:
+            logger.error(f"❌ 处理模型服务请求失败: {e}")
+            conn.close()
+
+    def _worker_loop(self):
+        """按优先级和到达顺序串行执行转录请求（同一时间只有一个请求占用模型）"""
+        from app.services.audio_cache import audio_cache
+
+        while True:
+            _, _, request, conn = self.jobs.get()
+            started = time.time()
+            media = request.get("media")
+            self.current_job = media if isinstance(media, str) else "<audio>"
+            try:
+                model, served_key = self._load_model(request.get("model") or settings.WHISPER_MODEL)
+
+                # 文件路径通过解码音频缓存读取（内存映射），避免在进程间传输大数组
+                if isinstance(media, str):
+                    media = audio_cache.load(media, request.get("fingerprint"))
+                start_offset = request.get("start_offset") or 0.0
+                if start_offset > 0:
+                    media = media[int(start_offset * SAMPLE_RATE):]
+
+                segments, info = model.transcribe(media, **(request.get("options") or {}))
+                conn.send({
+                    "type": "info",
+                    "language": info.language,
+                    "language_probability": info.language_probability,
+                    "duration": info.duration,
+                    # 实际使用的模型：新模型加载完成前由旧模型服务，客户端按它标记缓存和检查点
+                    "model": served_key[0],
+                    "compute_type": served_key[2]
+                })
+                for segment in segments:
+                    conn.send({
+                        "type": "segment",
+                        "start": segment.start,
+                        "end": segment.end,
+                        "text": segment.text,
+                        "avg_logprob": segment.avg_logprob,
+                        "no_speech_prob": segment.no_speech_prob,
+                        "compression_ratio": segment.compression_ratio
+                    })
+                conn.send({"type": "done"})
+                self.processed += 1
+            except (BrokenPipeError, ConnectionResetError, EOFError):
+                # 客户端已断开（如任务超时被终止），丢弃该请求
+                self.failed += 1
+                logger.warning(f"⚠️ 客户端已断开，放弃请求: {self.current_job}")
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"❌ 模型服务转录失败: {e}")
+                try:
+                    conn.send({"type": "error", "error": str(e)})
+                except Exception:
+                    pass
+            finally:
+                self.busy_seconds += time.time() - started
+                self.current_job = None
+                conn.close()
+
+    def serve_forever(self, preload: List[str]):
+        """加载预置模型并开始监听"""
+        for model_name in preload:
+            self._load_model(model_name)
+
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+        os.makedirs(os.path.dirname(self.address) or ".", exist_ok=True)
+
+        threading.Thread(target=self._worker_loop, name="model-server-worker", daemon=True).start()
+        with Listener(self.address, family="AF_UNIX", authkey=self.authkey) as listener:
+            logger.info(f"🚀 模型服务已启动: {self.address}, 预加载模型: {preload}")
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    logger.warning(f"⚠️ 接受连接失败: {e}")
+                    continue
+                threading.Thread(target=self._handle_connection, args=(conn,), daemon=True).start()
+
+
+class RemoteWhisperModel:
+    """模型服务的客户端代理，接口与 WhisperModel.transcribe 一致"""
+
+    def __init__(self, model_name: str, address: str = None, authkey: bytes = None):
+        self.model_name = model_name
+        self.address = address or settings.MODEL_SERVER_SOCKET
+        self.authkey = authkey or settings.MODEL_SERVER_AUTHKEY.encode()
+
+    def _connect(self):
+        if not self.authkey:
+            raise RuntimeError("未设置 MODEL_SERVER_AUTHKEY，无法连接模型服务")
+        return Client(self.address, family="AF_UNIX", authkey=self.authkey)
+
+    def health(self) -> Dict:
+        """查询模型服务健康状态"""
+        conn = self._connect()
+        try:
+            conn.send({"op": "health"})
+            return conn.recv()
+        finally:
+            conn.close()
+
+    def preload(self) -> Dict:
+        """请模型服务在后台加载该模型并设为默认模型"""
+        conn = self._connect()
+        try:
+            conn.send({"op": "preload", "model": self.model_name})
+            response = conn.recv()
+        finally:
+            conn.close()
+        if response.get("type") == "error":
+            raise RuntimeError(f"模型服务预加载失败: {response.get('error')}")
+        return response
+
+    def is_available(self) -> bool:
+        """模型服务是否可连接"""
+        if not self.authkey:
+            logger.warning("⚠️ 未设置 MODEL_SERVER_AUTHKEY，不使用模型服务")
+            return False
+        if not os.path.exists(self.address):
+            return False
+        try:
+            self.health()
+            return True
+        except Exception:
+            return False
+
+    def transcribe(self, media, fingerprint: Optional[str] = None, start_offset: float = 0.0,
+                   priority: int = PRIORITY_NORMAL, **options) -> Tuple[Iterator[SimpleNamespace], SimpleNamespace]:
+        """提交转录请求，返回 (片段迭代器, 音频信息)；排队期间阻塞"""
+        conn = self._connect()
+        try:
+            conn.send({
+                "op": "transcribe",
+                "model": self.model_name,
+                "media": media,
+                "fingerprint": fingerprint,
+                "start_offset": start_offset,
+                "priority": priority,
+                "options": options
+            })
+            message = conn.recv()
+        except Exception:
+            conn.close()
+            raise
+
+        if message.get("type") == "error":
+            conn.close()
+            raise RuntimeError(f"模型服务转录失败: {message.get('error')}")
+
+        info = SimpleNamespace(
+            language=message["language"],
+            language_probability=message["language_probability"],
+            duration=message["duration"],
+            model=message.get("model", self.model_name),
+            compute_type=message.get("compute_type")
+        )
+        return self._iter_segments(conn), info
+
+    @staticmethod
+    def _iter_segments(conn) -> Iterator[SimpleNamespace]:
+        """逐个接收片段，和本地模型一样惰性产出"""
+        try:
+            while True:
+                message = conn.recv()
+                message_type = message.get("type")
+                if message_type == "done":
+                    return
+                if message_type == "error":
+                    raise RuntimeError(f"模型服务转录失败: {message.get('error')}")
+                yield SimpleNamespace(
+                    start=message["start"],
+                    end=message["end"],
+                    text=message["text"],
+                    avg_logprob=message.get("avg_logprob", 0.0),
+                    no_speech_prob=message.get("no_speech_prob", 0.0),
+                    compression_ratio=message.get("compression_ratio", 1.0)
+                )
+        finally:
+            conn.close()
+
+
+def main():
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+    if not settings.MODEL_SERVER_AUTHKEY:
+        logger.error("❌ 未设置 MODEL_SERVER_AUTHKEY，模型服务拒绝启动（可用 openssl rand -hex 32 生成）")
+        raise SystemExit(1)
+    preload = [name.strip() for name in settings.MODEL_SERVER_PRELOAD.split(",") if name.strip()]
+    server = ModelServer(
+        settings.MODEL_SERVER_SOCKET,
+        settings.MODEL_SERVER_AUTHKEY.encode(),
+        max_queue=settings.MODEL_SERVER_MAX_QUEUE
+    )
+    server.serve_forever(preload or [settings.WHISPER_MODEL])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""
+文件系统/数据库对账
+文件被删除、离线移动或从备份恢复之后，把 videos 表和监控目录重新对齐：
+  1. scan：增量扫描刷新扫描索引（inode 相同的移动在这一步关联，预演时只统计）
+  2. new_files：遍历扫描索引中未处理的文件，按抽样指纹判断——内容相同的视频原文件已不存在时视为移动并关联，
+     原文件仍在时视为重复，其余创建视频记录并提交处理
+  3. videos：遍历本地视频记录，文件不存在的批量标记为 missing，missing 的文件重新出现时恢复状态
+每个阶段按记录ID分块（keyset 分页），每块提交一次并保存游标，内存占用与视频库大小无关；
+dry_run 时只统计并列出示例，不修改视频记录（扫描索引是可重建的缓存，仍会刷新，但离线移动的文件保持未配对）
+"""
+
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from sqlalchemy import func, or_
+
+from app.core.config import settings
+from app.core.database import ReconciliationRun, ScanIndexEntry, Transcript, Video
+from app.services.file_identity import resolve_fingerprint
+from app.services.file_relink import moved_video, relink_by_fingerprint
+from app.services.library_snapshot import is_listed_video
+from app.services.library_walker import scan_throttle
+from app.services.scan_index import scan_index
+
+logger = logging.getLogger(__name__)
+
+PHASES = ("scan", "new_files", "videos")
+
+CATEGORIES = (
+    "relinked",  # 移动的文件，已有视频关联到新路径
+    "duplicates",  # 与已有视频内容相同（原文件仍在）
+    "new",  # 新文件，创建视频记录并提交处理
+    "already_linked",  # 已有视频记录指向该路径（文件有变化）
+    "vanished_files",  # 扫描后又被删除的文件
+    "missing",  # 视频记录指向的文件不存在
+    "restored"  # 标记为缺失的视频文件重新出现
+)
+
+
+class LibraryReconciler:
+    """分块执行的对账过程，进度和报告保存在 ReconciliationRun 中"""
+
+    def __init__(self, db, run: ReconciliationRun, enqueue: Optional[Callable[[List[int]], None]] = None,
+                 root: Optional[str] = None):
+        self.db = db
+        self.run = run
+        self.enqueue = enqueue
+        self.root = os.path.abspath(root or settings.LOCAL_VIDEO_DIR)
+        self.chunk_size = max(settings.RECONCILE_CHUNK_SIZE, 1)
+        self.report = json.loads(run.report) if run.report else {
+            "dry_run": bool(run.dry_run),
+            "root": self.root,
+            "counts": {name: 0 for name in CATEGORIES},
+            "samples": {name: [] for name in CATEGORIES},
+            "enqueued": 0,
+            "chunks": 0
+        }
+
+    @property
+    def dry_run(self) -> bool:
+        return bool(self.run.dry_run)
+
+    def _record(self, category: str, path: Optional[str] = None):
+        self.report["counts"][category] += 1
+        if path:
+            self._record_sample(category, path)
+
+    def _record_sample(self, category: str, path: str):
+        samples = self.report["samples"][category]
+        if len(samples) < settings.RECONCILE_REPORT_SAMPLES:
+            samples.append(path)
+
+    def _commit_chunk(self, cursor: int, video_ids: List[int]):
+        """提交本块的修改和游标，之后再提交处理任务（任务读取到的是已提交的记录）"""
+        self.run.cursor = cursor
+        self.report["chunks"] += 1
+        self.run.report = json.dumps(self.report, ensure_ascii=False)
+        self.db.commit()
+        if video_ids and self.enqueue:
+            self.enqueue(video_ids)
+            self.report["enqueued"] += len(video_ids)
+            self.run.report = json.dumps(self.report, ensure_ascii=False)
+            self.db.commit()
+
+    def _next_phase(self):
+        index = PHASES.index(self.run.phase)
+        if index + 1 < len(PHASES):
+            self.run.phase = PHASES[index + 1]
+            self.run.cursor = 0
+        else:
+            self.run.status = "completed"
+            self.run.finished_at = datetime.utcnow()
+        self.run.report = json.dumps(self.report, ensure_ascii=False)
+        self.db.commit()
+
+    def step(self, max_chunks: int) -> bool:
+        """最多执行 max_chunks 块，返回是否已全部完成"""
+        for _ in range(max(max_chunks, 1)):
+            if self.run.status == "completed":
+                return True
+            if self.run.phase == "scan":
+                scan_index.scan(self.root, is_listed_video, collect_pending=False, relink=not self.dry_run)
+                self.report["scan"] = scan_index.last_scan
+                self.report["counts"]["relinked"] += scan_index.last_scan["files_relinked"]
+                for path in scan_index.last_scan["relinked_samples"]:
+                    self._record_sample("relinked", path)
+                self._next_phase()
+            elif self.run.phase == "new_files":
+                if not self._new_files_chunk():
+                    self._next_phase()
+            elif not self._videos_chunk():
+                self._next_phase()
+        if self.run.status == "completed":
+            logger.info(f"🧾 对账完成（{'预演' if self.dry_run else '执行'}）: {self.report['counts']}")
+        return self.run.status == "completed"
+
+    def _new_files_chunk(self) -> bool:
+        """处理一块未处理的扫描索引条目，没有更多条目时返回 False"""
+        prefix = self.root + os.sep
+        entries = self.db.query(ScanIndexEntry).filter(
+            ScanIndexEntry.processed.is_(False),
+            ScanIndexEntry.id > self.run.cursor,
+            func.substr(ScanIndexEntry.path, 1, len(prefix)) == prefix
+        ).order_by(ScanIndexEntry.id).limit(self.chunk_size).all()
+        if not entries:
+            return False
+
+        new_video_ids = []
+        for entry in entries:
+            path = entry.path
+            if not os.path.exists(path):
+                self._record("vanished_files", path)
+                continue
+            if self.db.query(Video.id).filter(
+                or_(Video.local_path == path, Video.url == f"file://{path}")
+            ).first():
+                self._record("already_linked", path)
+                continue
+
+            fingerprint, duplicate_id = resolve_fingerprint(self.db, path, throttle=scan_throttle)
+            if duplicate_id:
+                if moved_video(self.db, duplicate_id) is not None:
+                    self._record("relinked", path)
+                    if not self.dry_run:
+                        relink_by_fingerprint(self.db, duplicate_id, path, commit=False)
+                else:
+                    self._record("duplicates", path)
+                if not self.dry_run:
+                    entry.processed = True
+                    entry.fingerprint = fingerprint
+                    entry.video_id = duplicate_id
+                continue
+
+            self._record("new", path)
+            if not self.dry_run:
+                video = Video(
+                    url=f"file://{path}",
+                    title=Path(path).stem,
+                    platform="local",
+                    local_path=path,
+                    file_size=entry.size,
+                    file_fingerprint=fingerprint,
+                    status="pending",
+                    retry_count=0
+                )
+                self.db.add(video)
+                self.db.flush()
+                entry.processed = True
+                entry.fingerprint = fingerprint
+                entry.video_id = video.id
+                new_video_ids.append(video.id)
+
+        self._commit_chunk(entries[-1].id, new_video_ids)
+        return True
+
+    def _videos_chunk(self) -> bool:
+        """检查一块本地视频记录的文件是否存在，没有更多记录时返回 False"""
+        rows = self.db.query(Video.id, Video.local_path, Video.status).filter(
+            Video.platform == "local",
+            Video.local_path.isnot(None),
+            Video.id > self.run.cursor
+        ).order_by(Video.id).limit(self.chunk_size).all()
+        if not rows:
+            return False
+
+        # 扫描索引中的路径刚刚确认过存在，其余（监控目录外的）路径逐个检查
+        indexed = {
+            path for (path,) in self.db.query(ScanIndexEntry.path).filter(
+                ScanIndexEntry.path.in_([row.local_path for row in rows])
+            )
+        }
+        missing_ids = []
+        restored_ids = []
+        for row in rows:
+            exists = row.local_path in indexed or os.path.exists(row.local_path)
+            if not exists and row.status != "missing":
+                missing_ids.append(row.id)
+                self._record("missing", row.local_path)
+            elif exists and row.status == "missing":
+                restored_ids.append(row.id)
+                self._record("restored", row.local_path)
+
+        requeue_ids = []
+        if not self.dry_run:
+            if missing_ids:
+                self.db.query(Video).filter(Video.id.in_(missing_ids)).update(
+                    {Video.status: "missing"}, synchronize_session=False
+                )
+            if restored_ids:
+                transcribed = {
+                    video_id for (video_id,) in self.db.query(Transcript.video_id).filter(
+                        Transcript.video_id.in_(restored_ids)
+                    )
+                }
+                requeue_ids = [video_id for video_id in restored_ids if video_id not in transcribed]
+                if transcribed:
+                    self.db.query(Video).filter(Video.id.in_(transcribed)).update(
+                        {Video.status: "completed"}, synchronize_session=False
+                    )
+                if requeue_ids:
+                    self.db.query(Video).filter(Video.id.in_(requeue_ids)).update(
+                        {Video.status: "pending", Video.retry_count: 0}, synchronize_session=False
+                    )
+
+        self._commit_chunk(rows[-1].id, requeue_ids)
+        return True
@@ -0,0 +1,266 @@
+"""
+持久化的增量扫描索引
+在数据库中记录监控目录下每个目录的 mtime，以及每个视频文件的 inode、大小、mtime、指纹和处理状态。
+重新扫描时只 stat 目录：mtime 未变的目录不再列出内容（子目录从索引读取），
+只有 mtime 变化的目录才重新列出并对比其中文件的 stat，取代原先每次 rglob 全量 stat 的做法。
+目录的 stat/列出在遍历线程池中并行执行（受扫描 I/O 限速），数据库读写只在调用线程中进行。
+（原地覆盖写入、目录 mtime 不变的文件由文件监控事件处理）
+"""
+
+import logging
+import os
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.database import SessionLocal, ScanDirectory, ScanIndexEntry, Video
+from app.services.file_relink import find_video_for_path, update_video_path
+from app.services.library_walker import scan_throttle
+from app.utils.fs_walker import list_directory, parallel_visit
+
+logger = logging.getLogger(__name__)
+
+
+RELINK_SAMPLES = 50  # 扫描结果中保留的关联文件示例数量
+
+
+def _stat_key(stat: os.stat_result):
+    return stat.st_ino, stat.st_size, stat.st_mtime
+
+
+class ScanIndex:
+    """视频目录的增量扫描索引"""
+
+    def __init__(self):
+        self.last_scan: Dict = {}
+
+    def is_processed(self, path: str) -> bool:
+        """文件已处理且此后未发生变化"""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return False
+        db = SessionLocal()
+        try:
+            entry = db.query(ScanIndexEntry).filter(ScanIndexEntry.path == path).first()
+            return bool(entry and entry.processed and (entry.inode, entry.size, entry.mtime) == _stat_key(stat))
+        finally:
+            db.close()
+
+    def mark_processed(self, path: str, fingerprint: Optional[str] = None, video_id: Optional[int] = None):
+        """记录文件已处理（只写入这一条记录）"""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return
+        db = SessionLocal()
+        try:
+            entry = db.query(ScanIndexEntry).filter(ScanIndexEntry.path == path).first()
+            if not entry:
+                entry = ScanIndexEntry(path=path, directory=os.path.dirname(path))
+                db.add(entry)
+            entry.inode, entry.size, entry.mtime = _stat_key(stat)
+            entry.fingerprint = fingerprint or entry.fingerprint
+            entry.video_id = video_id or entry.video_id
+            entry.processed = True
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"⚠️ 更新扫描索引失败: {path}, 错误: {e}")
+        finally:
+            db.close()
+
+    def processed_count(self) -> int:
+        db = SessionLocal()
+        try:
+            return db.query(ScanIndexEntry).filter(ScanIndexEntry.processed.is_(True)).count()
+        finally:
+            db.close()
+
+    def scan(self, root: str, is_video: Callable[[str], bool], collect_pending: bool = True,
+             relink: bool = True) -> List[str]:
+        """增量扫描 root，更新索引并返回尚未处理的视频文件路径（collect_pending 为 False 时只统计数量，返回空列表）
+
+        relink 为 False 时（对账预演）离线移动的文件只统计不关联：不改写视频记录，原条目保留，
+        新路径暂不入索引，所在目录标记为需要重新列出，下次扫描时再次配对
+        """
+        started = time.time()
+        root = os.path.abspath(root)
+        dirs_listed = 0
+        dirs_skipped = 0
+        files_checked = 0
+        files_changed = 0
+
+        db = SessionLocal()
+        try:
+            known_dirs = {
+                row.path: row for row in db.query(ScanDirectory).filter(
+                    (ScanDirectory.path == root) | ScanDirectory.path.like(f"{root}{os.sep}%")
+                )
+            }
+            known_mtimes = {path: row.mtime for path, row in known_dirs.items()}
+            children = defaultdict(list)
+            for row in known_dirs.values():
+                children[row.parent].append(row.path)
+
+            def visit(directory: str):
+                """在遍历线程中执行：mtime 未变化的目录不列出，子目录从索引读取"""
+                scan_throttle.acquire()
+                try:
+                    dir_stat = os.stat(directory)
+                except (FileNotFoundError, NotADirectoryError):
+                    return (directory, None, None), []
+                if known_mtimes.get(directory) == dir_stat.st_mtime:
+                    return (directory, dir_stat, None), children.get(directory, [])
+                listing = list_directory(directory, is_video, stat_files=True, throttle=scan_throttle)
+                return (directory, dir_stat, listing), (listing.subdirs if listing else [])
+
+            # 已有视频记录的文件首次进入索引时直接视为已处理（升级后首次扫描不重复处理）
+            known_video_paths = None
+            seen_dirs = set()
+            # 本次扫描新增/消失的条目，按 (inode, 大小, mtime) 配对识别离线期间移动的文件
+            added: List[ScanIndexEntry] = []
+            vanished: Dict[tuple, ScanIndexEntry] = {}
+            vanished_entries: List[ScanIndexEntry] = []
+
+            for directory, dir_stat, listing in parallel_visit([root], visit, settings.SCAN_WALK_WORKERS):
+                if dir_stat is None:
+                    continue
+                seen_dirs.add(directory)
+
+                row = known_dirs.get(directory)
+                if listing is None:
+                    if row is not None and row.mtime == dir_stat.st_mtime:
+                        # 目录内容未变化
+                        dirs_skipped += 1
+                    continue
+
+                dirs_listed += 1
+                files = listing.files
+
+                indexed = {
+                    entry.path: entry
+                    for entry in db.query(ScanIndexEntry).filter(ScanIndexEntry.directory == directory)
+                }
+                for path, stat in files.items():
+                    files_checked += 1
+                    entry = indexed.pop(path, None)
+                    if entry is None:
+                        if known_video_paths is None:
+                            known_video_paths = {path for (path,) in db.query(Video.local_path) if path}
+                        inode, size, mtime = _stat_key(stat)
+                        entry = ScanIndexEntry(
+                            path=path, directory=directory, inode=inode, size=size, mtime=mtime,
+                            processed=path in known_video_paths
+                        )
+                        db.add(entry)
+                        if not entry.processed:
+                            added.append(entry)
+                        files_changed += 1
+                    elif (entry.inode, entry.size, entry.mtime) != _stat_key(stat):
+                        entry.inode, entry.size, entry.mtime = _stat_key(stat)
+                        entry.fingerprint = None
+                        entry.processed = False
+                        files_changed += 1
+
+                # 目录中已删除（或移走）的文件，配对之后再删除
+                for entry in indexed.values():
+                    vanished[(entry.inode, entry.size, entry.mtime)] = entry
+                    vanished_entries.append(entry)
+
+                if row is None:
+                    parent = "" if directory == root else os.path.dirname(directory)
+                    db.add(ScanDirectory(path=directory, parent=parent, mtime=dir_stat.st_mtime,
+                                         last_scanned=datetime.utcnow()))
+                else:
+                    row.mtime = dir_stat.st_mtime
+                    row.last_scanned = datetime.utcnow()
+
+            # 已删除的目录（其中的文件有新增条目需要配对时才读取）
+            removed_dirs = [path for path in known_dirs if path not in seen_dirs]
+            if added:
+                for path in removed_dirs:
+                    for entry in db.query(ScanIndexEntry).filter(ScanIndexEntry.directory == path):
+                        vanished[(entry.inode, entry.size, entry.mtime)] = entry
+
+            # 离线期间移动/重命名的文件：沿用原条目的指纹和处理状态，视频记录改到新路径
+            files_relinked = 0
+            relinked_samples = []
+            kept_ids = set()
+            relist_dirs = set()
+            if added and not relink:
+                db.flush()
+            for entry in added:
+                old = vanished.pop((entry.inode, entry.size, entry.mtime), None)
+                if old is None or not old.processed:
+                    continue
+                files_relinked += 1
+                if len(relinked_samples) < RELINK_SAMPLES:
+                    relinked_samples.append(entry.path)
+                if not relink:
+                    db.delete(entry)
+                    kept_ids.add(old.id)
+                    relist_dirs.update((old.directory, entry.directory))
+                    continue
+                entry.processed = True
+                entry.fingerprint = old.fingerprint
+                video = find_video_for_path(db, old.path, old.video_id)
+                if video is not None:
+                    update_video_path(db, video, entry.path)
+                    entry.video_id = video.id
+                else:
+                    entry.video_id = old.video_id
+
+            for entry in vanished_entries:
+                if entry.id not in kept_ids:
+                    db.delete(entry)
+            for path in removed_dirs:
+                if path in relist_dirs:
+                    continue
+                db.query(ScanIndexEntry).filter(ScanIndexEntry.directory == path).delete(synchronize_session=False)
+                db.query(ScanDirectory).filter(ScanDirectory.path == path).delete(synchronize_session=False)
+            if relist_dirs:
+                db.flush()
+                db.query(ScanDirectory).filter(ScanDirectory.path.in_(relist_dirs)).update(
+                    {ScanDirectory.mtime: None}, synchronize_session=False
+                )
+
+            db.commit()
+
+            pending_query = db.query(ScanIndexEntry.path).filter(
+                ScanIndexEntry.processed.is_(False),
+                ScanIndexEntry.path.like(f"{root}{os.sep}%")
+            )
+            pending = [path for (path,) in pending_query] if collect_pending else []
+            pending_count = len(pending) if collect_pending else pending_query.count()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        self.last_scan = {
+            "root": root,
+            "dirs_listed": dirs_listed,
+            "dirs_skipped": dirs_skipped,
+            "dirs_removed": len(removed_dirs),
+            "files_checked": files_checked,
+            "files_changed": files_changed,
+            "files_relinked": files_relinked,
+            "relinked_samples": relinked_samples,
+            "relinked_applied": relink,
+            "pending": pending_count,
+            "seconds": round(time.time() - started, 3),
+            "finished_at": datetime.utcnow().isoformat()
+        }
+        logger.info(
+            f"🗂️ 增量扫描完成: 列出 {dirs_listed} 个目录, 跳过 {dirs_skipped} 个未变化目录, "
+            f"{files_changed} 个文件有变化, {files_relinked} 个移动的文件{'已关联' if relink else '可关联（未关联）'}, 待处理 {pending_count} 个, 耗时 {self.last_scan['seconds']}秒"
+        )
+        return pending
+
+
+# 全局扫描索引
+scan_index = ScanIndex()
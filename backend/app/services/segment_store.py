@@ -0,0 +1,178 @@
+"""
+转录片段存储
+解码过程中按小批量把片段写入数据库，转录中途崩溃时已解码的部分不会丢失，
+同时供实时字幕流接口读取；每次写入同时更新续传检查点，重试时从检查点继续解码
+"""
+
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.database import SessionLocal, TranscriptSegment, TranscriptionCheckpoint
+
+logger = logging.getLogger(__name__)
+
+
+def clear_segments(db, video_id: int):
+    """删除视频已有的全部片段及续传检查点"""
+    db.query(TranscriptSegment).filter(TranscriptSegment.video_id == video_id).delete(synchronize_session=False)
+    clear_checkpoint(db, video_id)
+
+
+def clear_checkpoint(db, video_id: int):
+    """删除视频的续传检查点（不提交事务）"""
+    db.query(TranscriptionCheckpoint).filter(TranscriptionCheckpoint.video_id == video_id).delete(synchronize_session=False)
+
+
+def get_resume_checkpoint(db, video_id: int, model_name: str, file_size: Optional[int]) -> Optional[TranscriptionCheckpoint]:
+    """获取可用于续传的检查点：模型和文件大小都与上次一致时才续传"""
+    checkpoint = db.query(TranscriptionCheckpoint).filter(TranscriptionCheckpoint.video_id == video_id).first()
+    if not checkpoint or not checkpoint.segment_count:
+        return None
+    if checkpoint.model_name != model_name or (file_size is not None and checkpoint.file_size != file_size):
+        return None
+    return checkpoint
+
+
+def load_segment_texts(db, video_id: int) -> List[str]:
+    """按序读取已落库片段的文本"""
+    rows = db.query(TranscriptSegment.text).filter(
+        TranscriptSegment.video_id == video_id
+    ).order_by(TranscriptSegment.segment_index).all()
+    return [row.text for row in rows]
+
+
+def replace_segments(db, video_id: int, segments: List[Dict]):
+    """用完整的片段列表替换视频已有的片段（不提交事务）"""
+    clear_segments(db, video_id)
+    db.bulk_insert_mappings(TranscriptSegment, [
+        {
+            "video_id": video_id,
+            "segment_index": index,
+            "start": segment["start"],
+            "end": segment["end"],
+            "text": segment["text"]
+        }
+        for index, segment in enumerate(segments)
+    ])
+
+
+def patch_segments(db, video_id: int, start: float, end: float, segments: List[Dict]) -> Tuple[int, List[Dict]]:
+    """用 [start, end] 范围内重新转录的片段替换已有片段（中点落在范围内的旧片段被替换，不提交事务）
+
+    视频没有已保存的片段时抛出 ValueError
+
+    返回 (被替换的旧片段数量, 替换后的完整片段列表)
+    """
+    existing = load_segments(db, video_id)
+    if not existing:
+        # 没有已保存片段的字幕（片段表出现之前完成的转录）无法按时间修补，不能用局部片段重建全文
+        raise ValueError(f"视频没有已保存的字幕片段，无法修补: video_id={video_id}")
+    kept = [
+        {"start": segment.start, "end": segment.end, "text": segment.text}
+        for segment in existing
+        if not start <= (segment.start + segment.end) / 2 <= end
+    ]
+    merged = sorted(kept + list(segments), key=lambda segment: segment["start"])
+    replace_segments(db, video_id, merged)
+    return len(existing) - len(kept), merged
+
+
+def has_segments(db, video_id: int) -> bool:
+    """视频是否有已保存的片段"""
+    return db.query(TranscriptSegment.id).filter(TranscriptSegment.video_id == video_id).first() is not None
+
+
+def load_segments(db, video_id: int, after_index: int = -1, limit: int = None) -> List[TranscriptSegment]:
+    """按序读取视频的片段（只返回序号大于 after_index 的部分）"""
+    query = db.query(TranscriptSegment).filter(
+        TranscriptSegment.video_id == video_id,
+        TranscriptSegment.segment_index > after_index
+    ).order_by(TranscriptSegment.segment_index)
+    if limit:
+        query = query.limit(limit)
+    return query.all()
+
+
+class SegmentWriter:
+    """片段批量写入器：缓冲少量片段后写入数据库，内存占用与视频长度无关"""
+
+    def __init__(self, video_id: int, start_index: int = 0, reset: bool = True,
+                 model_name: Optional[str] = None, file_size: Optional[int] = None):
+        self.video_id = video_id
+        self.next_index = start_index
+        self.model_name = model_name
+        self.file_size = file_size
+        self.batch_size = max(settings.SEGMENT_FLUSH_BATCH, 1)
+        self.buffer_max = max(settings.SEGMENT_BUFFER_MAX, self.batch_size)
+        self.flush_interval = settings.SEGMENT_FLUSH_INTERVAL
+        self._buffer: List[Dict] = []
+        self._last_flush = time.monotonic()
+
+        if reset:
+            db = SessionLocal()
+            try:
+                clear_segments(db, video_id)
+                db.commit()
+            finally:
+                db.close()
+
+    def set_model_name(self, model_name: str):
+        """记录实际提供服务的模型（热切换期间可能不是请求的模型），检查点按它标记"""
+        self.model_name = model_name
+
+    def add(self, segment: Dict):
+        """追加一个片段，达到批量大小或时间间隔时写入数据库"""
+        self._buffer.append({
+            "video_id": self.video_id,
+            "segment_index": self.next_index,
+            "start": segment["start"],
+            "end": segment["end"],
+            "text": segment["text"]
+        })
+        self.next_index += 1
+
+        if len(self._buffer) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self, raise_on_error: bool = False):
+        """把缓冲区中的片段写入数据库
+
+        写入失败时保留缓冲区等待下次重试；raise_on_error 为真或缓冲区超过上限时抛出 RuntimeError，
+        中止本次转录（已提交的片段与检查点一致，重试时从检查点继续）
+        """
+        if not self._buffer:
+            return
+
+        db = SessionLocal()
+        try:
+            db.bulk_insert_mappings(TranscriptSegment, self._buffer)
+            
+            # 检查点与片段在同一事务中提交，保证续传位置与已落库片段一致
+            checkpoint = db.query(TranscriptionCheckpoint).filter(
+                TranscriptionCheckpoint.video_id == self.video_id
+            ).first()
+            if not checkpoint:
+                checkpoint = TranscriptionCheckpoint(video_id=self.video_id)
+                db.add(checkpoint)
+            checkpoint.resume_offset = max(segment["end"] for segment in self._buffer)
+            checkpoint.segment_count = self.next_index
+            checkpoint.model_name = self.model_name
+            checkpoint.file_size = self.file_size
+            
+            db.commit()
+            logger.debug(f"💾 已写入 {len(self._buffer)} 个片段: video_id={self.video_id}, 累计 {self.next_index}")
+            self._buffer = []
+            self._last_flush = time.monotonic()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"❌ 写入转录片段失败: video_id={self.video_id}, 待写入 {len(self._buffer)} 个, 错误: {e}")
+            if raise_on_error or len(self._buffer) >= self.buffer_max:
+                raise RuntimeError(f"转录片段未能写入数据库: video_id={self.video_id}, 错误: {e}") from e
+        finally:
+            db.close()
+
+    def close(self):
+        """写入剩余片段，仍有片段未能写入时抛出 RuntimeError（片段表不完整，不能据此保存字幕）"""
+        self.flush(raise_on_error=True)
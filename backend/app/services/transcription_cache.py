@@ -0,0 +1,176 @@
+"""
+转录结果缓存
+以 (文件指纹, 模型, 计算类型, 语言, 解码参数) 为键持久化保存转录结果，
+相同内容的文件重复提交（重新上传、改名、误操作重复处理）时直接返回缓存结果；
+缓存按总大小和条目数上限淘汰最久未访问的条目
+"""
+
+import hashlib
+import json
+import logging
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import func
+
+from app.core.config import settings
+from app.core.database import SessionLocal, TranscriptionCacheEntry, TranscriptionCacheStats
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(fingerprint: str, model_name: str, compute_type: str, language: str, decode_options: Dict) -> str:
+    """根据指纹、模型和参数生成缓存键"""
+    payload = json.dumps({
+        "fingerprint": fingerprint,
+        "model": model_name,
+        "compute_type": compute_type,
+        "language": language,
+        "options": decode_options
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TranscriptionResultCache:
+    """基于数据库的转录结果缓存"""
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+    def _bump_stats(self, db, **increments):
+        """原子递增统计计数"""
+        updated = db.query(TranscriptionCacheStats).filter(TranscriptionCacheStats.id == 1).update(
+            {getattr(TranscriptionCacheStats, name): getattr(TranscriptionCacheStats, name) + value
+             for name, value in increments.items()},
+            synchronize_session=False
+        )
+        if not updated:
+            counters = {"hits": 0, "misses": 0, "evictions": 0}
+            counters.update(increments)
+            db.add(TranscriptionCacheStats(id=1, **counters))
+
+    def get(self, cache_key: str) -> Optional[Dict]:
+        """查询缓存，命中时返回结果字典"""
+        db = SessionLocal()
+        try:
+            entry = db.query(TranscriptionCacheEntry).filter(TranscriptionCacheEntry.cache_key == cache_key).first()
+            if not entry:
+                self._bump_stats(db, misses=1)
+                db.commit()
+                return None
+
+            entry.hit_count = (entry.hit_count or 0) + 1
+            entry.last_accessed_at = datetime.utcnow()
+            self._bump_stats(db, hits=1)
+            db.commit()
+            return json.loads(entry.result)
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"⚠️ 读取转录缓存失败: {e}")
+            return None
+        finally:
+            db.close()
+
+    def put(self, cache_key: str, fingerprint: str, model_name: str, compute_type: str,
+            language: str, decode_options: Dict, result: Dict):
+        """写入缓存并按上限淘汰旧条目"""
+        payload = json.dumps(result, ensure_ascii=False)
+        size_bytes = len(payload.encode("utf-8"))
+        if size_bytes > self.max_bytes:
+            logger.info(f"⏭️ 转录结果过大，不写入缓存: {size_bytes} bytes")
+            return
+
+        db = SessionLocal()
+        try:
+            entry = db.query(TranscriptionCacheEntry).filter(TranscriptionCacheEntry.cache_key == cache_key).first()
+            if not entry:
+                entry = TranscriptionCacheEntry(cache_key=cache_key, hit_count=0)
+                db.add(entry)
+            entry.file_fingerprint = fingerprint
+            entry.model_name = model_name
+            entry.compute_type = compute_type
+            entry.language = language
+            entry.decode_options = json.dumps(decode_options, sort_keys=True)
+            entry.result = payload
+            entry.size_bytes = size_bytes
+            entry.last_accessed_at = datetime.utcnow()
+            db.commit()
+
+            self._evict(db)
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"⚠️ 写入转录缓存失败: {e}")
+        finally:
+            db.close()
+
+    def _evict(self, db):
+        """按最久未访问顺序淘汰，直到条目数和总大小都在上限内"""
+        count, total_bytes = db.query(
+            func.count(TranscriptionCacheEntry.id),
+            func.coalesce(func.sum(TranscriptionCacheEntry.size_bytes), 0)
+        ).one()
+
+        evicted = 0
+        while count > self.max_entries or total_bytes > self.max_bytes:
+            oldest = db.query(TranscriptionCacheEntry).order_by(
+                TranscriptionCacheEntry.last_accessed_at
+            ).limit(100).all()
+            if not oldest:
+                break
+            for entry in oldest:
+                if count <= self.max_entries and total_bytes <= self.max_bytes:
+                    break
+                count -= 1
+                total_bytes -= entry.size_bytes or 0
+                db.delete(entry)
+                evicted += 1
+            db.flush()
+
+        if evicted:
+            self._bump_stats(db, evictions=evicted)
+            logger.info(f"🧹 转录缓存淘汰 {evicted} 个条目")
+        db.commit()
+
+    def stats(self) -> Dict:
+        """缓存统计信息"""
+        db = SessionLocal()
+        try:
+            count, total_bytes = db.query(
+                func.count(TranscriptionCacheEntry.id),
+                func.coalesce(func.sum(TranscriptionCacheEntry.size_bytes), 0)
+            ).one()
+            stats = db.query(TranscriptionCacheStats).filter(TranscriptionCacheStats.id == 1).first()
+            hits = stats.hits if stats else 0
+            misses = stats.misses if stats else 0
+            return {
+                "enabled": settings.TRANSCRIPTION_CACHE_ENABLED,
+                "entries": count,
+                "size_bytes": int(total_bytes),
+                "size_mb": round(total_bytes / (1024 * 1024), 2),
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": hits,
+                "misses": misses,
+                "evictions": stats.evictions if stats else 0,
+                "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0
+            }
+        finally:
+            db.close()
+
+    def clear(self) -> int:
+        """清空缓存，返回删除的条目数"""
+        db = SessionLocal()
+        try:
+            deleted = db.query(TranscriptionCacheEntry).delete(synchronize_session=False)
+            db.commit()
+            return deleted
+        finally:
+            db.close()
+
+
+# 全局缓存实例
+transcription_cache = TranscriptionResultCache(
+    max_entries=settings.TRANSCRIPTION_CACHE_MAX_ENTRIES,
+    max_bytes=settings.TRANSCRIPTION_CACHE_MAX_BYTES
+)
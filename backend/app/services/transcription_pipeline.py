@@ -0,0 +1,224 @@
+"""
+流水线转录
+把多视频转录拆成三个阶段，各阶段之间用有界队列连接：
+  解码阶段（后台线程）：提前解码后续 N 个文件的音频，队列满时阻塞（背压）
+  推理阶段（调用线程）：只运行模型，不做其他工作
+  后处理阶段（后台线程）：文本清理、摘要、标签以及数据库写入
+这样模型不会因为等待 ffmpeg 解码或 SQLite 写入而空闲；每个阶段记录忙碌时间，
+结束时报告各阶段利用率
+"""
+
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 队列结束标记
+_DONE = object()
+
+
+class StageStats:
+    """单个阶段的耗时统计"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.busy_seconds = 0.0
+        self.wait_seconds = 0.0
+        self.items = 0
+        self.errors = 0
+
+    def to_dict(self, wall_seconds: float) -> Dict:
+        return {
+            "items": self.items,
+            "errors": self.errors,
+            "busy_seconds": round(self.busy_seconds, 2),
+            "wait_seconds": round(self.wait_seconds, 2),
+            "utilization": round(self.busy_seconds / wall_seconds, 4) if wall_seconds > 0 else 0.0
+        }
+
+
+class TranscriptionPipeline:
+    """解码 / 推理 / 后处理三阶段流水线"""
+
+    def __init__(self, ai_service, prefetch: int = 2, post_queue_size: int = 2, fatal_exceptions: tuple = ()):
+        self.ai_service = ai_service
+        # 这些异常（如任务软超时）不按单个视频失败处理，直接终止流水线
+        self.fatal_exceptions = fatal_exceptions
+        self.prefetch = max(prefetch, 1)
+        self.post_queue_size = max(post_queue_size, 1)
+        self.stats = {
+            "decode": StageStats("decode"),
+            "inference": StageStats("inference"),
+            "postprocess": StageStats("postprocess")
+        }
+
+    def run(self, jobs: List[Dict], on_result: Callable[[Dict, Dict, float], None],
+            on_error: Optional[Callable[[Dict, Exception], None]] = None) -> Dict:
+        """按顺序处理 jobs，返回各阶段统计
+
+        jobs: [{"video_id", "path", "fingerprint"}]
+        on_result(job, result, inference_seconds): 后处理线程中调用，负责持久化
+        on_error(job, error): 任一阶段失败时调用
+        """
+        decode_queue: "queue.Queue" = queue.Queue(maxsize=self.prefetch)
+        post_queue: "queue.Queue" = queue.Queue(maxsize=self.post_queue_size)
+        on_error = on_error or (lambda job, error: None)
+        stop_event = threading.Event()
+
+        decode_thread = threading.Thread(
+            target=self._decode_stage, args=(jobs, decode_queue, post_queue, on_error, stop_event),
+            name="pipeline-decode", daemon=True
+        )
+        post_thread = threading.Thread(
+            target=self._postprocess_stage, args=(post_queue, on_result, on_error),
+            name="pipeline-postprocess", daemon=True
+        )
+
+        wall_start = time.monotonic()
+        decode_thread.start()
+        post_thread.start()
+        try:
+            self._inference_stage(decode_queue, post_queue, on_error)
+        finally:
+            # 推理阶段异常退出时通知解码阶段停止，避免其阻塞在满队列上
+            stop_event.set()
+            while decode_thread.is_alive():
+                self._drain(decode_queue)
+                decode_thread.join(timeout=0.1)
+            post_queue.put(_DONE)
+            post_thread.join()
+
+        wall_seconds = time.monotonic() - wall_start
+        report = {
+            "wall_seconds": round(wall_seconds, 2),
+            "stages": {name: stage.to_dict(wall_seconds) for name, stage in self.stats.items()}
+        }
+        utilization = ", ".join(
+            f"{name} {stage['utilization'] * 100:.0f}%" for name, stage in report["stages"].items()
+        )
+        logger.info(f"📊 流水线完成: {len(jobs)} 个视频, 耗时 {wall_seconds:.1f}秒, 利用率: {utilization}")
+        return report
+
+    @staticmethod
+    def _drain(q: "queue.Queue"):
+        """清空队列，解除生产者阻塞"""
+        try:
+            while True:
+                q.get_nowait()
+        except queue.Empty:
+            pass
+
+    def _decode_stage(self, jobs: List[Dict], decode_queue: "queue.Queue", post_queue: "queue.Queue",
+                      on_error: Callable, stop_event: threading.Event):
+        """解码阶段：命中结果缓存的视频直接进入后处理，其余解码后交给推理阶段"""
+        from app.core.config import settings
+        from app.services.audio_cache import audio_cache
+        from app.services.transcription_cache import transcription_cache
+
+        stage = self.stats["decode"]
+        try:
+            for job in jobs:
+                if stop_event.is_set():
+                    break
+
+                started = time.monotonic()
+                try:
+                    fingerprint = job.get("fingerprint")
+                    if fingerprint and settings.TRANSCRIPTION_CACHE_ENABLED:
+                        cached = transcription_cache.get(self.ai_service._result_cache_key(fingerprint))
+                        if cached is not None:
+                            logger.info(f"⚡ 命中转录结果缓存: video_id={job['video_id']}")
+                            cached["cache_hit"] = True
+                            stage.busy_seconds += time.monotonic() - started
+                            stage.items += 1
+                            post_queue.put((job, cached, None, 0.0))
+                            continue
+
+                    audio = audio_cache.load(job["path"], fingerprint)
+                except Exception as e:
+                    stage.busy_seconds += time.monotonic() - started
+                    stage.errors += 1
+                    logger.error(f"❌ 解码失败: video_id={job['video_id']}, 错误: {e}")
+                    on_error(job, e)
+                    continue
+
+                stage.busy_seconds += time.monotonic() - started
+                stage.items += 1
+
+                waited = time.monotonic()
+                decode_queue.put((job, audio))
+                stage.wait_seconds += time.monotonic() - waited
+        finally:
+            decode_queue.put(_DONE)
+
+    def _inference_stage(self, decode_queue: "queue.Queue", post_queue: "queue.Queue", on_error: Callable):
+        """推理阶段：只运行模型，片段和语言信息交给后处理阶段"""
+        stage = self.stats["inference"]
+        while True:
+            waited = time.monotonic()
+            item = decode_queue.get()
+            stage.wait_seconds += time.monotonic() - waited
+            if item is _DONE:
+                return
+
+            job, audio = item
+            started = time.monotonic()
+            try:
+                inference_output = self.ai_service.infer_segments(audio)
+            except self.fatal_exceptions:
+                raise
+            except Exception as e:
+                stage.busy_seconds += time.monotonic() - started
+                stage.errors += 1
+                logger.error(f"❌ 推理失败: video_id={job['video_id']}, 错误: {e}")
+                on_error(job, e)
+                continue
+            finally:
+                # 释放音频映射，避免在后处理队列中滞留
+                del audio
+
+            elapsed = time.monotonic() - started
+            stage.busy_seconds += elapsed
+            stage.items += 1
+            post_queue.put((job, None, inference_output, elapsed))
+
+    def _postprocess_stage(self, post_queue: "queue.Queue", on_result: Callable, on_error: Callable):
+        """后处理阶段：生成文本结果、写入结果缓存并交给调用方持久化"""
+        from app.core.config import settings
+        from app.services.transcription_cache import transcription_cache
+
+        stage = self.stats["postprocess"]
+        while True:
+            waited = time.monotonic()
+            item = post_queue.get()
+            stage.wait_seconds += time.monotonic() - waited
+            if item is _DONE:
+                return
+
+            job, result, inference_output, inference_seconds = item
+            started = time.monotonic()
+            try:
+                if result is None:
+                    segments, language, confidence, speech_stats = inference_output
+                    result = self.ai_service._build_transcript_result(segments, language, confidence)
+                    result.update(speech_stats)
+
+                    fingerprint = job.get("fingerprint")
+                    if fingerprint and settings.TRANSCRIPTION_CACHE_ENABLED:
+                        transcription_cache.put(
+                            self.ai_service._result_cache_key(fingerprint), fingerprint,
+                            self.ai_service.model_name, self.ai_service._choose_compute_type(),
+                            "zh", self.ai_service._decode_options(), result
+                        )
+
+                on_result(job, result, inference_seconds)
+                stage.items += 1
+            except Exception as e:
+                stage.errors += 1
+                logger.error(f"❌ 后处理失败: video_id={job['video_id']}, 错误: {e}")
+                on_error(job, e)
+            finally:
+                stage.busy_seconds += time.monotonic() - started
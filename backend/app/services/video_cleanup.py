@@ -0,0 +1,42 @@
+"""
+删除视频时清理关联数据
+videos.id 是普通的 SQLite INTEGER PRIMARY KEY，删除最新的视频后该ID会被下一个视频复用，
+因此删除视频时必须在同一事务中清除所有按 video_id 关联的记录，否则新视频会继承旧视频的片段、检查点、
+统计、指纹和缩略图
+"""
+
+import logging
+from pathlib import Path
+
+from app.core.database import (
+    CascadeStats, FileContentHash, LearningRecord, ScanIndexEntry, Transcript, TranscriptPreview,
+    TranscriptQualityFlag, TranscriptSegment, TranscriptionCheckpoint, TranscriptionStats, VideoMediaInfo
+)
+from app.services.media_ingest import thumbnail_path_for
+
+logger = logging.getLogger(__name__)
+
+# 按 video_id 关联、随视频一起删除的表
+DEPENDENT_MODELS = (
+    LearningRecord, Transcript, TranscriptSegment, TranscriptionCheckpoint, TranscriptPreview,
+    TranscriptQualityFlag, TranscriptionStats, CascadeStats, VideoMediaInfo, FileContentHash
+)
+
+
+def delete_video_records(db, video_id: int):
+    """删除视频的全部关联记录并解除扫描索引的关联（不提交，由调用方和视频记录一起提交）"""
+    for model in DEPENDENT_MODELS:
+        db.query(model).filter(model.video_id == video_id).delete(synchronize_session=False)
+    # 扫描索引是文件的缓存，文件仍在监控目录中，只解除与视频的关联
+    db.query(ScanIndexEntry).filter(ScanIndexEntry.video_id == video_id).update(
+        {ScanIndexEntry.video_id: None}, synchronize_session=False
+    )
+
+
+def remove_video_files(video_id: int):
+    """删除视频的缩略图（视频记录提交删除之后调用）"""
+    thumbnail = Path(thumbnail_path_for(video_id))
+    try:
+        thumbnail.unlink(missing_ok=True)
+    except OSError as e:
+        logger.warning(f"⚠️ 删除缩略图失败: {thumbnail}, 错误: {e}")
@@ -0,0 +1,55 @@
+"""
+Worker 模型就绪状态
+每个 Celery worker 子进程预热完成后把就绪状态写入 Redis，退出时删除，
+API 进程据此汇总各 worker 的模型加载和预热情况
+"""
+
+import json
+import logging
+import os
+import socket
+import time
+from typing import Dict, List
+
+import redis
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+READINESS_KEY = "video_learning:worker_readiness"
+
+
+def _worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _client() -> redis.Redis:
+    return redis.Redis.from_url(settings.REDIS_URL, socket_timeout=2)
+
+
+def publish_worker_readiness(readiness: Dict):
+    """写入当前 worker 子进程的就绪状态"""
+    try:
+        payload = dict(readiness, worker=_worker_id(), updated_at=time.time())
+        _client().hset(READINESS_KEY, _worker_id(), json.dumps(payload, ensure_ascii=False))
+    except Exception as e:
+        logger.warning(f"⚠️ 上报worker就绪状态失败: {e}")
+
+
+def remove_worker_readiness():
+    """删除当前 worker 子进程的就绪状态（子进程退出时调用）"""
+    try:
+        _client().hdel(READINESS_KEY, _worker_id())
+    except Exception as e:
+        logger.warning(f"⚠️ 删除worker就绪状态失败: {e}")
+
+
+def load_worker_readiness() -> List[Dict]:
+    """读取所有 worker 子进程的就绪状态"""
+    try:
+        entries = _client().hgetall(READINESS_KEY)
+    except Exception as e:
+        logger.warning(f"⚠️ 读取worker就绪状态失败: {e}")
+        return []
+    return sorted((json.loads(value) for value in entries.values()), key=lambda item: item["worker"])
@@ -11,7 +11,22 @@ from datetime import datetime, timedelta
 from pathlib import Path
 from celery import current_task
 from app.celery_app import celery_app
-from app.core.database import SessionLocal, Video, Transcript
+from app.core.config import settings
+from app.core.database import (
+    SessionLocal, Video, Transcript, TranscriptPreview, TranscriptQualityFlag, TranscriptionStats, CascadeStats,
+    ReconciliationRun
+)
+from app.services.segment_store import (
+    SegmentWriter, replace_segments, patch_segments, has_segments, clear_checkpoint, get_resume_checkpoint,
+    load_segment_texts
+)
+from app.services.media_ingest import ingest_video
+from app.services.file_identity import (
+    acquire_backfill_lease, backfill_sampled_fingerprints, load_backfill_progress, release_backfill_lease,
+    renew_backfill_lease, resolve_fingerprint, save_backfill_progress
+)
+from app.services.model_selection import sync_default_model
+from app.services.reconciliation import LibraryReconciler
 
 logger = logging.getLogger(__name__)
 
@@ -26,16 +41,106 @@ def get_worker_ai_service():
         logger.info("🤖 初始化Worker进程的AI服务")
         _worker_ai_service = AITranscriptionService()
         logger.info("✅ AI服务初始化完成")
+    # 跟随 /system/models/swap 发布的默认模型（后台加载，旧模型继续服务当前任务）
+    sync_default_model(_worker_ai_service)
     return _worker_ai_service
 
+def _is_failed_result(result: dict) -> bool:
+    """AI服务在转录失败时返回占位结果而不是抛出异常"""
+    return not result or result.get("tags") == "转录失败"
+
+def _ensure_fingerprint(db, video: Video) -> str:
+    """获取视频的内容指纹，缺失时计算并回写（指纹已被其他记录占用时只用于查询缓存）"""
+    if video.file_fingerprint:
+        return video.file_fingerprint
+    
+    fingerprint, duplicate_id = resolve_fingerprint(db, video.local_path, exclude_video_id=video.id)
+    if duplicate_id:
+        logger.info(f"🔁 视频内容与已有记录相同: video_id={video.id}, 已有 video_id={duplicate_id}")
+    else:
+        video.file_fingerprint = fingerprint
+        db.commit()
+    return fingerprint
+
+def _save_transcript(db, video: Video, result: dict, processing_time: int):
+    """保存字幕记录（替换已存在的记录）并把视频标记为完成"""
+    existing_transcript = db.query(Transcript).filter(Transcript.video_id == video.id).first()
+    if existing_transcript:
+        db.delete(existing_transcript)
+        logger.info("🗑️ 删除了已存在的字幕记录")
+    
+    transcript = Transcript(
+        video_id=video.id,
+        original_text=result.get("original_text", ""),
+        cleaned_text=result.get("cleaned_text", result.get("original_text", "")),
+        summary=result.get("summary", ""),
+        tags=result.get("tags", ""),
+        language=result.get("language", "zh"),
+        confidence_score=result.get("confidence_score", 0.0),
+        processing_time=processing_time
+    )
+    db.add(transcript)
+    
+    # 非流式路径（批量/分块转录）在这里一次性保存片段
+    if result.get("segments"):
+        replace_segments(db, video.id, result["segments"])
+    
+    # 记录VAD语音占比，用于统计跳过静音节省的推理量
+    if result.get("speech_ratio") is not None:
+        stats = db.query(TranscriptionStats).filter(TranscriptionStats.video_id == video.id).first()
+        if not stats:
+            stats = TranscriptionStats(video_id=video.id)
+            db.add(stats)
+        stats.audio_seconds = result.get("audio_seconds")
+        stats.speech_seconds = result.get("speech_seconds")
+        stats.speech_ratio = result["speech_ratio"]
+    
+    # 记录转录中检测到的循环/幻觉区间，标记字幕需要人工复核
+    db.query(TranscriptQualityFlag).filter(TranscriptQualityFlag.video_id == video.id).delete()
+    for event in result.get("loop_events") or []:
+        db.add(TranscriptQualityFlag(
+            video_id=video.id,
+            kind=event["kind"],
+            start=event.get("start"),
+            end=event.get("end"),
+            detail=(event.get("detail") or "")[:200]
+        ))
+    if result.get("loop_events"):
+        logger.warning(f"🚩 字幕含 {len(result['loop_events'])} 处疑似循环/幻觉区间: video_id={video.id}")
+    
+    # 记录级联转录的草稿/复核时长，用于统计大模型实际处理的比例
+    cascade = result.get("cascade")
+    if cascade:
+        cascade_stats = db.query(CascadeStats).filter(CascadeStats.video_id == video.id).first()
+        if not cascade_stats:
+            cascade_stats = CascadeStats(video_id=video.id)
+            db.add(cascade_stats)
+        cascade_stats.draft_model = cascade.get("draft_model")
+        cascade_stats.refine_model = cascade.get("refine_model")
+        cascade_stats.audio_seconds = cascade.get("audio_seconds")
+        cascade_stats.refined_audio_seconds = cascade.get("refined_audio_seconds")
+        cascade_stats.draft_segments = cascade.get("draft_segments")
+        cascade_stats.low_confidence_segments = cascade.get("low_confidence_segments")
+        cascade_stats.draft_inference_seconds = cascade.get("draft_inference_seconds")
+        cascade_stats.refine_inference_seconds = cascade.get("refine_inference_seconds")
+    
+    # 转录已完整结束，续传检查点和预览字幕不再需要
+    clear_checkpoint(db, video.id)
+    db.query(TranscriptPreview).filter(TranscriptPreview.video_id == video.id).delete()
+    
+    video.status = "completed"
+    video.updated_at = datetime.utcnow()
+    db.commit()
+
 @celery_app.task(bind=True, max_retries=3, default_retry_delay=300)
-def process_video_task(self, video_id: int):
+def process_video_task(self, video_id: int, model_name: str = None):
     """
     处理单个视频的Celery任务
     
     Args:
         self: Celery任务实例
         video_id: 要处理的视频ID
+        model_name: 本次使用的模型，为空时使用默认模型
     
     Returns:
         dict: 处理结果
@@ -85,35 +190,57 @@ def process_video_task(self, video_id: int):
             meta={'current': 0, 'total': 100, 'status': '正在转录音频...'}
         )
         
-        # 实际转录处理
-        result = asyncio.run(ai_service.transcribe_video(video.local_path))
+        # 内容指纹同时用于结果缓存和解码音频缓存
+        fingerprint = None
+        if settings.TRANSCRIPTION_CACHE_ENABLED or settings.AUDIO_CACHE_ENABLED:
+            fingerprint = _ensure_fingerprint(db, video)
         
-        processing_time = int(time.time() - start_time)
-        logger.info(f"✅ 转录完成，耗时: {processing_time}秒")
+        # 单次导入：一次读取同时得到 PCM（写入音频缓存）、元数据和缩略图，转录时不再重新解码
+        if settings.INGEST_ENABLED:
+            ingest_video(db, video, fingerprint)
+        
+        # 续传检查点：上次崩溃或超时前已落库的片段不再重复转录
+        file_size = Path(video.local_path).stat().st_size
+        effective_model = model_name or settings.WHISPER_MODEL
+        checkpoint = get_resume_checkpoint(db, video_id, effective_model, file_size)
+        start_offset = 0.0
+        prefix_texts = []
+        if checkpoint:
+            start_offset = checkpoint.resume_offset or 0.0
+            prefix_texts = load_segment_texts(db, video_id)
+            logger.info(f"⏩ 发现续传检查点: 已完成 {len(prefix_texts)} 个片段, 从 {start_offset:.2f}秒 继续")
         
-        # 7. 删除已存在的字幕记录（如果有）
-        existing_transcript = db.query(Transcript).filter(Transcript.video_id == video_id).first()
-        if existing_transcript:
-            db.delete(existing_transcript)
-            logger.info("🗑️ 删除了已存在的字幕记录")
-        
-        # 8. 创建新的字幕记录
-        transcript = Transcript(
-            video_id=video_id,
-            original_text=result.get("original_text", ""),
-            cleaned_text=result.get("cleaned_text", result.get("original_text", "")),
-            summary=result.get("summary", ""),
-            tags=result.get("tags", ""),
-            language=result.get("language", "zh"),
-            confidence_score=result.get("confidence_score", 0.0),
-            processing_time=processing_time
+        # 实际转录处理（片段边解码边分批落库，可通过字幕流接口实时查看）
+        segment_writer = SegmentWriter(
+            video_id,
+            start_index=len(prefix_texts),
+            reset=checkpoint is None,
+            model_name=effective_model,
+            file_size=file_size
         )
-        db.add(transcript)
+        try:
+            result = asyncio.run(ai_service.transcribe_video(
+                video.local_path,
+                on_segment=segment_writer.add,
+                start_offset=start_offset,
+                prefix_texts=prefix_texts,
+                fingerprint=fingerprint,
+                model_name=model_name,
+                on_model=segment_writer.set_model_name
+            ))
+        finally:
+            # 片段未能全部落库时抛出异常进入重试，不用不完整的片段表保存字幕
+            segment_writer.close()
         
-        # 9. 更新视频状态为完成
-        video.status = "completed"
-        video.updated_at = datetime.utcnow()
-        db.commit()
+        # 转录失败（包括软超时）时保留检查点并进入重试流程
+        if _is_failed_result(result):
+            raise Exception(result.get("original_text", "转录失败"))
+        
+        processing_time = int(time.time() - start_time)
+        logger.info(f"✅ 转录完成，耗时: {processing_time}秒")
+        
+        # 7. 保存字幕记录并更新视频状态为完成
+        _save_transcript(db, video, result, processing_time)
         
         logger.info(f"🎉 视频处理完成: {video.title}")
         
@@ -170,6 +297,105 @@ def process_video_task(self, video_id: int):
     finally:
         db.close()
 
+@celery_app.task(bind=True)
+def preview_video_task(self, video_id: int, model_name: str = None):
+    """
+    快速预览任务（高优先级队列）
+    
+    只转录视频开头 PREVIEW_SECONDS 秒，保存为临时字幕（含摘要和标签），
+    随后把完整转录任务排入普通队列；预览失败不影响完整转录
+    """
+    db = SessionLocal()
+    try:
+        video = db.query(Video).filter(Video.id == video_id).first()
+        if not video or not video.local_path or not Path(video.local_path).exists():
+            logger.warning(f"⚠️ 预览跳过，视频或文件不存在: video_id={video_id}")
+            return {"status": "skipped", "video_id": video_id}
+        
+        try:
+            start_time = time.time()
+            result = get_worker_ai_service().transcribe_preview(
+                video.local_path, settings.PREVIEW_SECONDS, settings.PREVIEW_MODEL or model_name
+            )
+            
+            preview = db.query(TranscriptPreview).filter(TranscriptPreview.video_id == video_id).first()
+            if not preview:
+                preview = TranscriptPreview(video_id=video_id)
+                db.add(preview)
+            preview.preview_seconds = result.get("preview_seconds")
+            preview.original_text = result.get("original_text", "")
+            preview.summary = result.get("summary", "")
+            preview.tags = result.get("tags", "")
+            preview.language = result.get("language", "zh")
+            preview.confidence_score = result.get("confidence_score", 0.0)
+            preview.processing_time = round(time.time() - start_time, 2)
+            preview.created_at = datetime.utcnow()
+            db.commit()
+            logger.info(f"👀 预览字幕已生成: {video.title}, 前 {preview.preview_seconds}秒, 耗时 {preview.processing_time}秒")
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"⚠️ 预览转录失败，继续完整转录: video_id={video_id}, 错误: {e}")
+        
+        # 完整转录按普通优先级排队
+        task = process_video_task.delay(video_id, model_name)
+        video.task_id = task.id
+        db.commit()
+        logger.info(f"🚀 完整转录已排队: video_id={video_id}, task_id={task.id}")
+        
+        return {"status": "success", "video_id": video_id, "task_id": task.id}
+    finally:
+        db.close()
+
+@celery_app.task(bind=True)
+def transcribe_range_task(self, video_id: int, start: float, end: float, patch: bool = False, model_name: str = None):
+    """
+    时间范围转录任务：只解码并转录视频的 [start, end] 部分
+    
+    patch 为 True 时用结果替换已有字幕中对应时间范围的片段，并重建字幕全文（摘要和标签不变）
+    """
+    db = SessionLocal()
+    try:
+        video = db.query(Video).filter(Video.id == video_id).first()
+        if not video or not video.local_path or not Path(video.local_path).exists():
+            raise Exception(f"视频或文件不存在: video_id={video_id}")
+        
+        transcript = None
+        if patch:
+            # 先检查能否修补，避免白白转录；没有已保存片段时不能用局部片段重建全文
+            transcript = db.query(Transcript).filter(Transcript.video_id == video_id).first()
+            if not transcript or video.status != "completed":
+                raise Exception(f"视频没有完整字幕，无法修补: video_id={video_id}, 状态={video.status}")
+            if not has_segments(db, video_id):
+                raise Exception(f"字幕没有保存时间片段，无法修补: video_id={video_id}")
+        
+        ai_service = get_worker_ai_service()
+        start_time = time.time()
+        result = ai_service.transcribe_range(video.local_path, start, end, model_name)
+        result["processing_time"] = round(time.time() - start_time, 2)
+        logger.info(
+            f"✂️ 时间范围转录完成: video_id={video_id}, [{start:.1f}, {end:.1f}]秒, "
+            f"{len(result['segments'])} 个片段, 耗时 {result['processing_time']}秒"
+        )
+        
+        result["patched"] = False
+        if patch:
+            replaced, merged = patch_segments(db, video_id, start, end, result["segments"])
+            full_text = " ".join(segment["text"] for segment in merged)
+            transcript.original_text = full_text
+            transcript.cleaned_text = ai_service._clean_text(full_text)
+            transcript.formatted_text = ai_service._format_text_for_display(transcript.cleaned_text)
+            db.commit()
+            
+            result.update(patched=True, replaced_segments=replaced)
+            logger.info(f"🩹 已修补字幕: video_id={video_id}, 替换 {replaced} 个片段为 {len(result['segments'])} 个")
+        
+        return result
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
 @celery_app.task
 def batch_process_videos(video_ids: list):
     """
@@ -183,6 +409,48 @@ def batch_process_videos(video_ids: list):
     """
     logger.info(f"📦 开始批量处理 {len(video_ids)} 个视频")
     
+    # 启用批量推理时，按组提交共享前向计算的批量转录任务
+    if settings.BATCH_INFERENCE_ENABLED and video_ids:
+        group_size = max(settings.BATCH_INFERENCE_MAX_VIDEOS, 1)
+        results = []
+        for i in range(0, len(video_ids), group_size):
+            group = video_ids[i:i + group_size]
+            task = batch_transcribe_videos.delay(group)
+            results.extend({
+                "video_id": video_id,
+                "task_id": task.id,
+                "status": "submitted"
+            } for video_id in group)
+        
+        logger.info(f"✅ 批量推理任务提交完成，共 {len(results)} 个视频")
+        return {
+            "total": len(video_ids),
+            "submitted": len(results),
+            "failed": 0,
+            "results": results
+        }
+    
+    # 启用流水线转录时，按组提交流水线任务（解码/推理/后处理重叠执行）
+    if settings.PIPELINE_ENABLED and video_ids:
+        group_size = max(settings.PIPELINE_MAX_VIDEOS, 1)
+        results = []
+        for i in range(0, len(video_ids), group_size):
+            group = video_ids[i:i + group_size]
+            task = pipeline_transcribe_videos.delay(group)
+            results.extend({
+                "video_id": video_id,
+                "task_id": task.id,
+                "status": "submitted"
+            } for video_id in group)
+        
+        logger.info(f"✅ 流水线任务提交完成，共 {len(results)} 个视频")
+        return {
+            "total": len(video_ids),
+            "submitted": len(results),
+            "failed": 0,
+            "results": results
+        }
+    
     results = []
     for video_id in video_ids:
         try:
@@ -210,6 +478,324 @@ def batch_process_videos(video_ids: list):
         "results": results
     }
 
+@celery_app.task(bind=True)
+def batch_transcribe_videos(self, video_ids: list):
+    """
+    批量推理任务：多个短视频共享前向计算
+    
+    超过 BATCH_INFERENCE_MAX_CLIP_SECONDS 的长视频会转交给单视频任务处理
+    
+    Args:
+        video_ids: 视频ID列表
+    
+    Returns:
+        dict: 批量推理结果
+    """
+    db = SessionLocal()
+    completed = []
+    delegated = []
+    skipped = []
+    
+    try:
+        logger.info(f"📦 开始批量推理: {len(video_ids)} 个视频, task_id={self.request.id}")
+        
+        videos = db.query(Video).filter(Video.id.in_(video_ids)).all()
+        batch_videos = []
+        
+        for video in videos:
+            if not video.local_path or not Path(video.local_path).exists() or Path(video.local_path).name.startswith('._'):
+                logger.warning(f"⚠️ 视频文件不可用，跳过: video_id={video.id}, 路径: {video.local_path}")
+                video.status = "failed"
+                skipped.append(video.id)
+                continue
+            
+            # 已知时长超限的视频直接交给单视频任务
+            if video.duration and video.duration > settings.BATCH_INFERENCE_MAX_CLIP_SECONDS:
+                process_video_task.delay(video.id)
+                delegated.append(video.id)
+                continue
+            
+            video.status = "processing"
+            video.updated_at = datetime.utcnow()
+            batch_videos.append(video)
+        db.commit()
+        
+        if not batch_videos:
+            return {"status": "success", "batched": 0, "delegated": delegated, "skipped": skipped}
+        
+        ai_service = get_worker_ai_service()
+        start_time = time.time()
+        
+        self.update_state(
+            state='PROGRESS',
+            meta={'current': 0, 'total': len(batch_videos), 'status': '正在批量转录音频...'}
+        )
+        
+        fingerprints = {}
+        if settings.TRANSCRIPTION_CACHE_ENABLED:
+            fingerprints = {video.local_path: _ensure_fingerprint(db, video) for video in batch_videos}
+        
+        results = ai_service.transcribe_batch(
+            [video.local_path for video in batch_videos],
+            max_duration=settings.BATCH_INFERENCE_MAX_CLIP_SECONDS,
+            fingerprints=fingerprints
+        )
+        processing_time = int(time.time() - start_time)
+        # 批次耗时平摊到每个视频
+        per_video_time = int(processing_time / max(len(results), 1))
+        
+        for video in batch_videos:
+            result = results.get(video.local_path)
+            if _is_failed_result(result):
+                # 超长、解码失败或批量推理失败的视频转交单视频任务
+                video.status = "pending"
+                db.commit()
+                process_video_task.delay(video.id)
+                delegated.append(video.id)
+                continue
+            
+            if result.get("duration"):
+                video.duration = int(result["duration"])
+            _save_transcript(db, video, result, per_video_time)
+            completed.append(video.id)
+        
+        logger.info(
+            f"🎉 批量推理完成: 完成 {len(completed)} 个, 转交 {len(delegated)} 个, "
+            f"跳过 {len(skipped)} 个, 耗时 {processing_time}秒"
+        )
+        
+        return {
+            "status": "success",
+            "batched": len(completed),
+            "completed": completed,
+            "delegated": delegated,
+            "skipped": skipped,
+            "processing_time": processing_time
+        }
+    
+    except Exception as exc:
+        logger.error(f"❌ 批量推理失败: {exc}")
+        logger.error(f"📋 错误堆栈:\n{traceback.format_exc()}")
+        db.rollback()
+        
+        # 批量失败时，尚未处理的视频回退到逐个处理
+        handled = set(completed) | set(delegated) | set(skipped)
+        for video_id in video_ids:
+            if video_id not in handled:
+                process_video_task.delay(video_id)
+                delegated.append(video_id)
+        
+        return {"status": "failed", "error": str(exc), "completed": completed, "delegated": delegated}
+    
+    finally:
+        db.close()
+
+@celery_app.task(bind=True)
+def pipeline_transcribe_videos(self, video_ids: list):
+    """
+    流水线转录任务：解码、推理、后处理分阶段并行，模型不等待解码和数据库写入
+    
+    失败的视频转交给单视频任务（带重试和续传）
+    
+    Args:
+        video_ids: 视频ID列表
+    
+    Returns:
+        dict: 处理结果和各阶段利用率
+    """
+    from celery.exceptions import SoftTimeLimitExceeded
+    from app.services.transcription_pipeline import TranscriptionPipeline
+    
+    db = SessionLocal()
+    completed = []
+    delegated = []
+    skipped = []
+    
+    try:
+        logger.info(f"🏭 开始流水线转录: {len(video_ids)} 个视频, task_id={self.request.id}")
+        
+        videos = db.query(Video).filter(Video.id.in_(video_ids)).all()
+        jobs = []
+        for video in videos:
+            if not video.local_path or not Path(video.local_path).exists() or Path(video.local_path).name.startswith('._'):
+                logger.warning(f"⚠️ 视频文件不可用，跳过: video_id={video.id}, 路径: {video.local_path}")
+                video.status = "failed"
+                skipped.append(video.id)
+                continue
+            
+            video.status = "processing"
+            video.updated_at = datetime.utcnow()
+            jobs.append({
+                "video_id": video.id,
+                "path": video.local_path,
+                "fingerprint": _ensure_fingerprint(db, video) if settings.TRANSCRIPTION_CACHE_ENABLED else video.file_fingerprint
+            })
+        db.commit()
+        
+        if not jobs:
+            return {"status": "success", "completed": [], "delegated": delegated, "skipped": skipped}
+        
+        ai_service = get_worker_ai_service()
+        
+        def on_result(job: dict, result: dict, inference_seconds: float):
+            # 在后处理线程中执行，使用独立的数据库会话
+            session = SessionLocal()
+            try:
+                video = session.query(Video).filter(Video.id == job["video_id"]).first()
+                if not video:
+                    return
+                _save_transcript(session, video, result, int(inference_seconds))
+                completed.append(video.id)
+            finally:
+                session.close()
+        
+        def on_error(job: dict, error: Exception):
+            session = SessionLocal()
+            try:
+                video = session.query(Video).filter(Video.id == job["video_id"]).first()
+                if video:
+                    video.status = "pending"
+                    session.commit()
+                process_video_task.delay(job["video_id"])
+                delegated.append(job["video_id"])
+            finally:
+                session.close()
+        
+        pipeline = TranscriptionPipeline(
+            ai_service,
+            prefetch=settings.PIPELINE_PREFETCH,
+            post_queue_size=settings.PIPELINE_POSTPROCESS_QUEUE,
+            fatal_exceptions=(SoftTimeLimitExceeded,)
+        )
+        report = pipeline.run(jobs, on_result, on_error)
+        
+        logger.info(
+            f"🎉 流水线转录完成: 完成 {len(completed)} 个, 转交 {len(delegated)} 个, 跳过 {len(skipped)} 个"
+        )
+        
+        return {
+            "status": "success",
+            "completed": completed,
+            "delegated": delegated,
+            "skipped": skipped,
+            "pipeline": report
+        }
+    
+    except Exception as exc:
+        logger.error(f"❌ 流水线转录失败: {exc}")
+        logger.error(f"📋 错误堆栈:\n{traceback.format_exc()}")
+        db.rollback()
+        
+        # 尚未处理的视频回退到逐个处理
+        handled = set(completed) | set(delegated) | set(skipped)
+        for video_id in video_ids:
+            if video_id not in handled:
+                process_video_task.delay(video_id)
+                delegated.append(video_id)
+        
+        return {"status": "failed", "error": str(exc), "completed": completed, "delegated": delegated}
+    
+    finally:
+        db.close()
+
+@celery_app.task(bind=True)
+def reconcile_library_task(self, run_id: int):
+    """
+    文件系统/数据库对账任务
+    
+    每次执行 RECONCILE_CHUNKS_PER_TASK 块后重新提交自身续跑，大型视频库对账期间转录任务仍能穿插执行
+    
+    Args:
+        run_id: 对账记录ID
+    
+    Returns:
+        dict: 本次执行结果
+    """
+    db = SessionLocal()
+    try:
+        run = db.query(ReconciliationRun).filter(ReconciliationRun.id == run_id).first()
+        if not run or run.status in ("completed", "failed"):
+            return {"run_id": run_id, "status": run.status if run else "not_found"}
+        
+        run.status = "running"
+        run.task_id = self.request.id
+        db.commit()
+        
+        reconciler = LibraryReconciler(db, run, enqueue=lambda video_ids: batch_process_videos.delay(video_ids))
+        finished = reconciler.step(settings.RECONCILE_CHUNKS_PER_TASK)
+        if not finished:
+            reconcile_library_task.delay(run_id)
+        
+        return {"run_id": run_id, "status": run.status, "phase": run.phase}
+    
+    except Exception as e:
+        logger.error(f"❌ 对账任务失败: run_id={run_id}, 错误: {e}")
+        db.rollback()
+        run = db.query(ReconciliationRun).filter(ReconciliationRun.id == run_id).first()
+        if run:
+            run.status = "failed"
+            run.error_message = str(e)
+            run.finished_at = datetime.utcnow()
+            db.commit()
+        return {"run_id": run_id, "status": "failed", "error": str(e)}
+    
+    finally:
+        db.close()
+
+@celery_app.task
+def backfill_fingerprints_task(after_id: int = 0, lease: str = None):
+    """
+    指纹回填任务：把升级前保存的完整指纹分批改为抽样指纹，每批处理后重新提交自身续跑
+    
+    Args:
+        after_id: 从该视频ID之后继续
+        lease: 任务链持有的回填租约令牌，每批处理前续约，续约失败（租约已被其他任务链持有）时停止
+    """
+    from app.services.library_walker import scan_throttle
+    
+    lease = lease or acquire_backfill_lease()
+    if not lease or not renew_backfill_lease(lease):
+        logger.info(f"⏭️ 指纹回填已由其他任务链执行，停止当前任务链: after_id={after_id}")
+        return {"done": False, "skipped": True}
+    
+    db = SessionLocal()
+    try:
+        last_id = backfill_sampled_fingerprints(db, after_id, settings.FINGERPRINT_BACKFILL_CHUNK, scan_throttle)
+        if last_id is None:
+            save_backfill_progress("done")
+            release_backfill_lease(lease)
+            logger.info("✅ 抽样指纹回填完成")
+            return {"done": True}
+        
+        save_backfill_progress(str(last_id))
+        backfill_fingerprints_task.delay(last_id, lease)
+        return {"done": False, "last_id": last_id}
+    except Exception as e:
+        logger.error(f"❌ 指纹回填失败: after_id={after_id}, 错误: {e}")
+        db.rollback()
+        # 释放租约，下次启动时从已保存的进度继续
+        release_backfill_lease(lease)
+        return {"done": False, "error": str(e)}
+    finally:
+        db.close()
+
+def start_fingerprint_backfill() -> bool:
+    """尚未完成指纹回填且没有任务链在运行时从上次的进度继续，返回是否提交了回填任务"""
+    progress = load_backfill_progress()
+    if progress == "done":
+        return False
+    lease = acquire_backfill_lease()
+    if not lease:
+        logger.info("⏭️ 指纹回填任务链已在运行，不重复提交")
+        return False
+    try:
+        backfill_fingerprints_task.delay(int(progress) if progress else 0, lease)
+    except Exception as e:
+        logger.warning(f"⚠️ 提交指纹回填任务失败: {e}")
+        release_backfill_lease(lease)
+        return False
+    return True
+
 @celery_app.task
 def get_task_status(task_id: str):
     """
@@ -236,6 +822,8 @@ def get_task_status(task_id: str):
 def cleanup_failed_tasks():
     """
     清理失败的任务，重置为待处理状态
+    
+    视频的续传检查点会保留，重新提交后从上次落库的位置继续转录
     """
     db = SessionLocal()
     try:
@@ -0,0 +1,41 @@
+"""
+音频解码工具
+通过 ffmpeg 直接输出 16kHz 单声道 PCM，支持在解码前按时间定位（-ss），
+只解码需要的时间范围
+"""
+import logging
+import subprocess
+from typing import Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+
+def load_audio(file_path: str, start: float = 0.0, duration: Optional[float] = None,
+               sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """解码音频为 float32 单声道 PCM
+
+    Args:
+        file_path: 音视频文件路径
+        start: 起始时间（秒），在输入端定位，跳过之前的内容不解码
+        duration: 解码时长（秒），None 表示解码到结尾
+        sample_rate: 输出采样率
+
+    Returns:
+        np.ndarray: 取值范围 [-1, 1] 的 float32 数组
+    """
+    cmd = ["ffmpeg", "-nostdin", "-hide_banner", "-loglevel", "error", "-threads", "0"]
+    if start and start > 0:
+        cmd += ["-ss", f"{start:.3f}"]
+    cmd += ["-i", file_path]
+    if duration is not None:
+        cmd += ["-t", f"{max(duration, 0):.3f}"]
+    cmd += ["-vn", "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(sample_rate), "-"]
+
+    result = subprocess.run(cmd, capture_output=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg解码音频失败: {result.stderr.decode(errors='ignore').strip()}")
+
+    return np.frombuffer(result.stdout, np.int16).astype(np.float32) / 32768.0
@@ -0,0 +1,51 @@
+"""
+文件写入完成检测工具
+Linux 下优先使用 inotify 的关闭写入事件（IN_CLOSE_WRITE/IN_MOVED_TO，由文件监控处理）；
+这里提供轮询兜底时使用的辅助检查：是否仍有进程以写入方式打开文件
+"""
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+_WRITE_FLAGS = os.O_WRONLY | os.O_RDWR
+
+
+def supports_close_write(observer) -> bool:
+    """文件监控是否能产生关闭写入事件（Linux inotify）"""
+    try:
+        from watchdog.observers.inotify import InotifyObserver
+    except Exception:
+        return False
+    return isinstance(observer, InotifyObserver)
+
+
+def is_open_for_write(file_path: str) -> bool:
+    """检查是否有进程以写入方式打开了该文件
+
+    遍历 /proc/<pid>/fd，只能看到本机（本容器）内可见的进程；无法检查时返回 False
+    """
+    if not os.path.isdir("/proc"):
+        return False
+    target = os.path.realpath(file_path)
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit():
+            continue
+        fd_dir = f"/proc/{pid}/fd"
+        try:
+            fds = os.listdir(fd_dir)
+        except OSError:
+            continue
+        for fd in fds:
+            try:
+                if os.readlink(f"{fd_dir}/{fd}") != target:
+                    continue
+                with open(f"/proc/{pid}/fdinfo/{fd}") as f:
+                    for line in f:
+                        if line.startswith("flags:"):
+                            if int(line.split()[1], 8) & _WRITE_FLAGS:
+                                return True
+                            break
+            except (OSError, ValueError):
+                continue
+    return False
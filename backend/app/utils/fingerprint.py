@@ -0,0 +1,60 @@
+"""
+文件指纹工具
+抽样指纹：文件大小 + 开头/中间/结尾固定位置的数据块，成本与文件大小无关，用于去重和变化检测；
+完整指纹：全文件 SHA256，只在抽样指纹相同需要确认内容是否一致时才计算
+"""
+import hashlib
+import logging
+import os
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# 完整哈希的读取缓冲区：大块顺序读取，减少系统调用次数
+READ_BLOCK_SIZE = 8 * 1024 * 1024
+
+# 抽样指纹每个位置读取的字节数
+SAMPLE_BLOCK_SIZE = 256 * 1024
+
+def compute_file_fingerprint(file_path: str, throttle=None) -> str:
+    """计算文件内容指纹（完整 SHA256），throttle 为可选的 IoThrottle 读取限速"""
+    sha256_hash = hashlib.sha256()
+    file_path_obj = Path(file_path)
+
+    try:
+        buffer = bytearray(READ_BLOCK_SIZE)
+        view = memoryview(buffer)
+        with open(file_path_obj, "rb", buffering=0) as f:
+            if hasattr(os, "posix_fadvise"):
+                # 提示内核顺序读取，加大预读
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            while True:
+                size = f.readinto(buffer)
+                if not size:
+                    break
+                if throttle:
+                    throttle.acquire(nbytes=size)
+                sha256_hash.update(view[:size])
+        return sha256_hash.hexdigest()
+    except Exception as e:
+        logger.error(f"计算文件指纹失败: {file_path}, 错误: {e}")
+        # 如果读取失败，使用文件大小和修改时间作为后备
+        stat = file_path_obj.stat()
+        fallback_input = f"{file_path_obj.name}_{stat.st_size}_{stat.st_mtime}"
+        return hashlib.sha256(fallback_input.encode()).hexdigest()
+
+def compute_sampled_fingerprint(file_path: str, block_size: int = SAMPLE_BLOCK_SIZE, throttle=None) -> str:
+    """计算抽样指纹（文件大小 + 开头/中间/结尾三个数据块），小文件直接计算完整指纹"""
+    size = os.path.getsize(file_path)
+    if size <= block_size * 3:
+        return compute_file_fingerprint(file_path, throttle)
+
+    sha256_hash = hashlib.sha256()
+    sha256_hash.update(f"sampled-v1:{size}:".encode())
+    with open(file_path, "rb") as f:
+        for offset in (0, (size - block_size) // 2, size - block_size):
+            if throttle:
+                throttle.acquire(nbytes=block_size)
+            f.seek(offset)
+            sha256_hash.update(f.read(block_size))
+    return sha256_hash.hexdigest()
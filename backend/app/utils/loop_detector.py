@@ -0,0 +1,136 @@
+"""
+转录幻觉/循环检测
+在片段生成器上做流式检测：连续重复的片段、滑动窗口压缩比过高、连续的无语音片段。
+检测到后丢弃循环片段并停止消费生成器（停止解码），由调用方跳过坏区后重新解码剩余音频
+"""
+import re
+import zlib
+from collections import deque
+from typing import Dict, Iterator, List, Optional
+
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+
+
+def _normalize(text: str) -> str:
+    """去掉标点和空白，用于比较片段文本是否重复"""
+    return _NON_WORD.sub("", text).lower()
+
+
+def _compression_ratio(text: str) -> float:
+    data = text.encode("utf-8")
+    return len(data) / len(zlib.compress(data)) if data else 0.0
+
+
+class LoopGuard:
+    """片段循环检测器
+
+    filter() 包装片段生成器，片段在滑动窗口中延迟产出；检测到循环时丢弃窗口内的循环片段、
+    记录事件并结束迭代，stopped_at 为坏区被发现时的解码位置（秒）
+    """
+
+    def __init__(self, window: int = 8, max_repeats: int = 4, compression_ratio_threshold: float = 3.0,
+                 no_speech_streak: int = 8, no_speech_prob: float = 0.6, min_window_chars: int = 60):
+        self.window = max(window, 2)
+        self.max_repeats = max(max_repeats, 2)
+        self.compression_ratio_threshold = compression_ratio_threshold
+        self.no_speech_streak = max(no_speech_streak, 1)
+        self.no_speech_prob = no_speech_prob
+        self.min_window_chars = min_window_chars
+        self.events: List[Dict] = []
+        self.stopped_at: Optional[float] = None
+
+    def filter(self, segments, offset: float = 0.0) -> Iterator[Dict]:
+        """逐个产出通过检测的片段（字典，时间戳加上 offset）"""
+        self.stopped_at = None
+        buffer: deque = deque()
+        streak = 0
+
+        for segment in segments:
+            item = {
+                "start": round(segment.start + offset, 3),
+                "end": round(segment.end + offset, 3),
+                "text": segment.text.strip(),
+                "key": _normalize(segment.text)
+            }
+            if not item["text"]:
+                continue
+
+            if getattr(segment, "no_speech_prob", 0.0) > self.no_speech_prob:
+                streak += 1
+            else:
+                streak = 0
+
+            buffer.append(item)
+            event = self._check(buffer, streak)
+            if event:
+                self._drop_loop(buffer, event, streak)
+                self.events.append(event)
+                self.stopped_at = item["end"]
+                break
+
+            while len(buffer) > self.window:
+                yield self._strip(buffer.popleft())
+
+        while buffer:
+            yield self._strip(buffer.popleft())
+
+    def _check(self, buffer: deque, streak: int) -> Optional[Dict]:
+        """检查窗口内是否出现循环，返回事件"""
+        current = buffer[-1]
+
+        if streak >= self.no_speech_streak:
+            start = buffer[-min(streak, len(buffer))]["start"]
+            return {"kind": "no_speech", "start": start, "end": current["end"], "detail": f"连续 {streak} 个无语音片段"}
+
+        # 只认连续相同的片段：对话中不相邻的“好的”“对”等短句重复出现是正常的
+        key = current["key"]
+        if len(key) >= 2:
+            count = 0
+            for item in reversed(buffer):
+                if item["key"] != key:
+                    break
+                count += 1
+            if count >= self.max_repeats:
+                return {
+                    "kind": "repeat",
+                    "start": buffer[-count]["start"],
+                    "end": current["end"],
+                    "detail": f"连续重复 {count} 次: {key[:40]}",
+                    "count": count
+                }
+
+        if len(buffer) >= self.window:
+            text = "".join(item["text"] for item in buffer)
+            if len(text) >= self.min_window_chars:
+                ratio = _compression_ratio(text)
+                if ratio > self.compression_ratio_threshold:
+                    return {
+                        "kind": "compression",
+                        "start": buffer[0]["start"],
+                        "end": current["end"],
+                        "detail": f"窗口压缩比 {ratio:.2f}"
+                    }
+        return None
+
+    @staticmethod
+    def _drop_loop(buffer: deque, event: Dict, streak: int):
+        """丢弃窗口内的循环片段：无语音连串整段丢弃，连续重复只保留第一个，压缩比过高时重复文本只保留第一次出现"""
+        items = list(buffer)
+        if event["kind"] == "no_speech":
+            kept = items[:len(items) - min(streak, len(items))]
+        elif event["kind"] == "repeat":
+            kept = items[:len(items) - event.pop("count") + 1]
+        else:
+            seen = set()
+            kept = []
+            for item in items:
+                if item["key"] in seen:
+                    continue
+                seen.add(item["key"])
+                kept.append(item)
+        buffer.clear()
+        buffer.extend(kept)
+
+    @staticmethod
+    def _strip(item: Dict) -> Dict:
+        return {"start": item["start"], "end": item["end"], "text": item["text"]}
@@ -0,0 +1,125 @@
+"""
+基于能量的语音活动检测（VAD）
+对解码后的 PCM 做向量化的帧能量分析，得到语音区间；只把语音部分拼接后送入模型，
+再通过时间轴映射把片段时间戳还原到原视频时间轴
+"""
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+
+def _runs(mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """游程编码，返回 (起点, 长度, 取值)"""
+    change = np.flatnonzero(np.diff(mask.astype(np.int8))) + 1
+    starts = np.concatenate(([0], change))
+    lengths = np.diff(np.concatenate((starts, [mask.shape[0]])))
+    return starts, lengths, mask[starts]
+
+
+def _frame_energy_db(audio: np.ndarray, frame: int) -> np.ndarray:
+    """逐帧 RMS 能量（dBFS）"""
+    frame_count = audio.shape[0] // frame
+    frames = np.asarray(audio[:frame_count * frame], dtype=np.float32).reshape(frame_count, frame)
+    return 20 * np.log10(np.sqrt(np.mean(frames ** 2, axis=1)) + 1e-10)
+
+
+def is_silent(audio: np.ndarray, floor_db: float, sample_rate: int = SAMPLE_RATE, frame_ms: int = 30) -> bool:
+    """按绝对电平判断是否完全静音：最响的帧也低于 floor_db（dBFS）"""
+    frame = int(sample_rate * frame_ms / 1000)
+    if audio.shape[0] < frame:
+        return True
+    return float(_frame_energy_db(audio, frame).max()) < floor_db
+
+
+def detect_speech_intervals(audio: np.ndarray, sample_rate: int = SAMPLE_RATE, frame_ms: int = 30,
+                            threshold_db: Optional[float] = None, min_speech_ms: int = 250,
+                            min_silence_ms: int = 500, pad_ms: int = 200) -> List[Tuple[int, int]]:
+    """检测语音区间（单位: 采样点）
+
+    Args:
+        audio: float32 单声道 PCM
+        threshold_db: 能量阈值（dBFS），为空时按底噪自适应（第10百分位 + 12dB，且不低于 -55dB）
+        min_speech_ms: 短于该时长的语音段视为噪声丢弃
+        min_silence_ms: 短于该时长的静音段并入相邻语音（句中停顿不切开）
+        pad_ms: 每个语音区间两侧保留的余量
+    """
+    frame = int(sample_rate * frame_ms / 1000)
+    frame_count = audio.shape[0] // frame
+    if frame_count == 0:
+        return []
+
+    energy_db = _frame_energy_db(audio, frame)
+
+    if threshold_db is None:
+        threshold_db = max(float(np.percentile(energy_db, 10)) + 12.0, -55.0)
+    speech = energy_db > threshold_db
+    if not speech.any():
+        return []
+
+    # 填平过短的静音（首尾的静音保留）
+    starts, lengths, values = _runs(speech)
+    short_silence = (~values) & (lengths < max(min_silence_ms // frame_ms, 1))
+    short_silence[0] = short_silence[-1] = False
+    speech = np.repeat(values | short_silence, lengths)
+
+    # 丢弃过短的语音
+    starts, lengths, values = _runs(speech)
+    values = values & (lengths >= max(min_speech_ms // frame_ms, 1))
+    speech_starts = starts[values]
+    speech_ends = speech_starts + lengths[values]
+    if speech_starts.size == 0:
+        return []
+
+    pad = int(pad_ms / frame_ms)
+    total = audio.shape[0]
+    intervals: List[Tuple[int, int]] = []
+    for start_frame, end_frame in zip(speech_starts - pad, speech_ends + pad):
+        start = max(int(start_frame), 0) * frame
+        end = min(int(end_frame) * frame, total)
+        if intervals and start <= intervals[-1][1]:
+            intervals[-1] = (intervals[-1][0], max(intervals[-1][1], end))
+        else:
+            intervals.append((start, end))
+    return intervals
+
+
+class SpeechTimeline:
+    """拼接后音频时间轴到原始时间轴的映射"""
+
+    def __init__(self, concat_starts: np.ndarray, original_starts: np.ndarray, lengths: np.ndarray):
+        self.concat_starts = concat_starts
+        self.original_starts = original_starts
+        self.lengths = lengths
+
+    def to_original(self, seconds: float) -> float:
+        """把拼接音频中的时间点映射回原始时间（落在间隔静音中的时间点取前一区间的终点）"""
+        index = max(int(np.searchsorted(self.concat_starts, seconds, side="right")) - 1, 0)
+        within = min(max(seconds - self.concat_starts[index], 0.0), self.lengths[index])
+        return round(float(self.original_starts[index] + within), 3)
+
+
+def build_speech_audio(audio: np.ndarray, intervals: List[Tuple[int, int]], sample_rate: int = SAMPLE_RATE,
+                       gap_seconds: float = 0.3) -> Tuple[np.ndarray, SpeechTimeline]:
+    """把语音区间拼接成新的音频（区间之间插入短静音，避免跨区间粘连），返回音频和时间轴映射"""
+    gap = np.zeros(int(gap_seconds * sample_rate), dtype=np.float32)
+    pieces = []
+    concat_starts = []
+    position = 0
+    for start, end in intervals:
+        if pieces:
+            pieces.append(gap)
+            position += gap.shape[0]
+        concat_starts.append(position)
+        pieces.append(audio[start:end])
+        position += end - start
+
+    starts = np.array([start for start, _ in intervals], dtype=np.float64)
+    ends = np.array([end for _, end in intervals], dtype=np.float64)
+    timeline = SpeechTimeline(
+        np.array(concat_starts, dtype=np.float64) / sample_rate,
+        starts / sample_rate,
+        (ends - starts) / sample_rate
+    )
+    return np.concatenate(pieces).astype(np.float32, copy=False), timeline
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+目录遍历基准测试：原先的 Path.rglob('*') + is_file()/stat() 与并行 os.scandir 遍历对比
+运行方式：
+  python benchmark_walker.py                      # 生成临时测试目录（默认 200 个目录 x 50 个文件）
+  python benchmark_walker.py /data/videos         # 测试已有目录（如 NFS 挂载的视频库）
+  python benchmark_walker.py --workers 1 4 8 16 --max-iops 2000
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.utils.fs_walker import IoThrottle, walk
+
+VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mov', '.mkv', '.flv', '.wmv', '.webm', '.m4v'}
+
+
+def is_video(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() in VIDEO_EXTENSIONS
+
+
+def make_tree(root: Path, dirs: int, files_per_dir: int):
+    """生成测试目录：两层子目录，视频文件与其他文件各半"""
+    for d in range(dirs):
+        directory = root / f"group{d % 10}" / f"dir{d}"
+        directory.mkdir(parents=True, exist_ok=True)
+        for f in range(files_per_dir):
+            suffix = ".mp4" if f % 2 == 0 else ".srt"
+            (directory / f"file{f}{suffix}").write_bytes(b"x" * 16)
+
+
+def bench_rglob(root: str):
+    """原实现：rglob 列出所有路径，逐个 is_file() 和 stat()"""
+    count = 0
+    total = 0
+    for path in Path(root).rglob('*'):
+        if path.is_file() and path.suffix.lower() in VIDEO_EXTENSIONS:
+            total += path.stat().st_size
+            count += 1
+    return count, total
+
+
+def bench_walker(root: str, workers: int, throttle: IoThrottle = None):
+    count = 0
+    total = 0
+    for listing in walk(root, include=is_video, stat_files=True, workers=workers, throttle=throttle):
+        for stat in listing.files.values():
+            total += stat.st_size
+            count += 1
+    return count, total
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - started, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="目录遍历基准测试")
+    parser.add_argument("root", nargs="?", help="测试目录，不指定时生成临时目录")
+    parser.add_argument("--dirs", type=int, default=200)
+    parser.add_argument("--files", type=int, default=50)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-iops", type=int, default=0, help="额外测试一次限速遍历（每秒操作数）")
+    args = parser.parse_args()
+
+    tmp_dir = None
+    root = args.root
+    if root is None:
+        tmp_dir = tempfile.mkdtemp(prefix="walker-bench-")
+        root = tmp_dir
+        print(f"📁 生成测试目录: {root} ({args.dirs} 个目录 x {args.files} 个文件)")
+        make_tree(Path(root), args.dirs, args.files)
+
+    try:
+        print("=" * 60)
+        rows = []
+        best, (count, _) = min(timed(bench_rglob, root) for _ in range(args.repeat))
+        rows.append(("rglob + stat", best, count))
+        for workers in args.workers:
+            best, (count, _) = min(timed(bench_walker, root, workers) for _ in range(args.repeat))
+            rows.append((f"scandir x{workers}", best, count))
+        if args.max_iops:
+            throttle = IoThrottle(max_iops=args.max_iops)
+            elapsed, (count, _) = timed(bench_walker, root, max(args.workers), throttle)
+            rows.append((f"scandir 限速 {args.max_iops} IOPS", elapsed, count))
+
+        baseline = rows[0][1]
+        for name, elapsed, count in rows:
+            print(f"{name:<28} {elapsed * 1000:>10.1f} ms  {count:>8} 个视频  {baseline / elapsed:>6.2f}x")
+        print("=" * 60)
+    finally:
+        if tmp_dir:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
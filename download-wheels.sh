@@ -9,9 +9,9 @@ echo "📦 开始下载Python包到本地..."
 mkdir -p models/wheels
 
 # 下载最新版本的faster-whisper及其依赖
-echo "📥 下载faster-whisper>=1.0.3及其依赖..."
+echo "📥 下载faster-whisper>=1.1.0及其依赖..."
 python3 -m pip download \
-    "faster-whisper>=1.0.3" \
+    "faster-whisper>=1.1.0" \
     "transformers>=4.20.0" \
     "huggingface-hub>=0.15.0" \
     --dest models/wheels \